@@ -0,0 +1,13 @@
+""" Make the modules of TSTools importable without QGIS
+
+Modules are imported from the plugin package as ``src`` (e.g.,
+``src.ts_driver.prediction``), as in the API documentation. Tests of modules
+requiring dependencies that are not installed, such as GDAL or Qt, are
+skipped.
+"""
+import os
+import sys
+
+PLUGIN = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir,
+                                      'tstools'))
+sys.path.insert(0, PLUGIN)
@@ -0,0 +1,118 @@
+""" Tests for rendering plots of many points without the GUI
+"""
+import datetime as dt
+import os
+
+import numpy as np
+
+from src import settings
+from src.plots import batch
+from src.ts_driver.ts_manager import tsm
+
+N_IMAGES = 60
+
+
+class StubSeries(object):
+    """ Series of two bands of images every 16 days
+    """
+    description = 'Stub'
+    band_names = ['B1', 'B2']
+
+    def __init__(self):
+        dates = [dt.date(2000, 1, 1) + dt.timedelta(days=16 * i)
+                 for i in range(N_IMAGES)]
+        self.images = np.array(
+            [(d, d.toordinal(), d.timetuple().tm_yday) for d in dates],
+            dtype=[('date', object), ('ordinal', np.int64), ('doy', np.int32)])
+        self.data = np.zeros((2, N_IMAGES))
+        self.mask = np.ones(N_IMAGES, dtype=bool)
+
+
+class StubTimeSeries(object):
+    """ Time series driver of sine waves scaled by coordinates of a point
+
+    Only points read by `prefetch_data` may be fetched.
+    """
+    description = 'Stub Timeseries'
+    mask_values = np.array([])
+    has_results = False
+    config = {}
+    controls = {}
+    result = None
+
+    def __init__(self, location):
+        self.location = location
+        self.series = [StubSeries()]
+        self.pixel_pos = ''
+        self._prefetched = set()
+
+    def prefetch_data(self, points, crs_wkt):
+        self._prefetched = set(points)
+
+    def fetch_data(self, mx, my, crs_wkt):
+        if (mx, my) not in self._prefetched:
+            raise ValueError('Point was not read by prefetch_data')
+        t = self.series[0].images['ordinal']
+        self.series[0].data[0] = mx * 100 + 500 * np.sin(t / 58.1)
+        self.series[0].data[1] = my * 100 + 500 * np.cos(t / 58.1)
+        self.pixel_pos = 'X/Y: %s/%s' % (mx, my)
+        yield 100.0
+
+    def fetch_results(self):
+        return None
+
+    def set_results(self, result):
+        self.result = result
+
+    def update_mask(self, mask_values=None):
+        if mask_values is not None:
+            self.mask_values = np.asarray(mask_values)
+
+    def get_data(self, series, band, mask=True, indices=None):
+        X, y = self.series[series].images, self.series[series].data[band]
+        if indices is not None:
+            X, y = X[indices], y[indices]
+        return X, y
+
+    def get_prediction(self, series, band, dates=None):
+        return None
+
+    def get_breaks(self, series, band):
+        return None
+
+    def get_residual_arrays(self, series, band):
+        return None
+
+    def get_plot(self, series, band, axis, desc):
+        return []
+
+
+def test_render_points(tmpdir, monkeypatch):
+    monkeypatch.setattr(tsm, 'ts', StubTimeSeries(str(tmpdir)))
+    monkeypatch.setattr(settings, 'plot_series', np.array([0, 0]))
+    monkeypatch.setattr(settings, 'plot_band_indices', np.array([0, 1]))
+    monkeypatch.setattr(settings, 'plot_bands',
+                        np.array(['Stub - B1', 'Stub - B2']))
+    monkeypatch.setattr(settings, 'plot_symbol', [
+        {'enabled': False, 'indices': [np.arange(N_IMAGES)],
+         'markers': ['o'], 'colors': [(0, 0, 150)]}
+        for _ in range(2)
+    ])
+    monkeypatch.setitem(settings.plot, 'y_axis_1_band', np.array([1, 0],
+                                                                 dtype=bool))
+    monkeypatch.setitem(settings.plot, 'y_axis_2_band', np.array([0, 1],
+                                                                 dtype=bool))
+    monkeypatch.setitem(settings.plot, 'x_min', 2000)
+    monkeypatch.setitem(settings.plot, 'x_max', 2002)
+
+    points = [(1.0, 2.0), (3.0, 4.0), (5.0, 6.0)]
+    output = str(tmpdir.join('figures'))
+    progress = list(batch.render_points(points, '', output, processes=2,
+                                        figsize=(4, 3), dpi=50))
+
+    assert progress[-1] == 100.0
+    for i in range(len(points)):
+        for name in ('ts', 'doy', 'residual'):
+            filename = os.path.join(output, batch.FILENAME_PATTERN.format(
+                i=i, plot=name, fmt='png'))
+            assert os.path.getsize(filename) > 0
@@ -0,0 +1,82 @@
+""" Tests for readers of CCDC results saved as MATLAB files
+"""
+import os
+
+import numpy as np
+import pytest
+
+spio = pytest.importorskip('scipy.io')
+
+from src.ts_driver import ccdc_results  # noqa
+
+WIDTH = 10
+
+
+def write_row(folder, row, seed=0):
+    """ Write records of a row (1-indexed) with positions like CCDC """
+    rng = np.random.RandomState(seed + row)
+    col = rng.randint(0, WIDTH, 2 * WIDTH)
+    rec = np.zeros(col.size, dtype=[('pos', 'f8'), ('t_start', 'f8'),
+                                    ('coefs', 'f8', (8, 7))])
+    rec['pos'] = (row - 1) * WIDTH + col + 1
+    rec['t_start'] = rng.randint(730000, 735000, col.size)
+    rec['coefs'] = rng.rand(col.size, 8, 7)
+    spio.savemat(os.path.join(folder, 'record_change%i.mat' % row),
+                 {'rec_cg': rec})
+    return rec
+
+
+def expected(rec, pos):
+    """ Baseline: scan all records of row for position """
+    return np.sort(rec['t_start'][rec['pos'] == pos])
+
+
+@pytest.fixture
+def results(tmpdir):
+    folder = tmpdir.mkdir('results')
+    return str(folder), dict((row, write_row(str(folder), row))
+                             for row in (1, 2, 4))
+
+
+@pytest.mark.parametrize('converted', [False, True],
+                         ids=['rows', 'converted'])
+def test_get_matches_scan(tmpdir, results, converted):
+    folder, recs = results
+    store = str(tmpdir.join('store'))
+    if converted:
+        n = ccdc_results.convert_results(folder, store)
+        assert n == sum(rec.size for rec in recs.values())
+    reader = ccdc_results.CCDCResults(folder, store_folder=store)
+
+    for row, rec in recs.items():
+        for pos in range((row - 1) * WIDTH + 1, row * WIDTH + 1):
+            found = reader.get(row, pos)
+            np.testing.assert_array_equal(np.sort(found['t_start']),
+                                          expected(rec, pos))
+    assert (reader._store is not None) == converted
+    assert reader.get(3, 21) is None
+
+
+def test_converted_out_of_date(tmpdir, results):
+    folder, recs = results
+    store = str(tmpdir.join('store'))
+    ccdc_results.convert_results(folder, store)
+    reader = ccdc_results.CCDCResults(folder, store_folder=store)
+    reader.get(1, 1)
+
+    rec = write_row(folder, 2, seed=10)
+    filename = os.path.join(folder, 'record_change2.mat')
+    mtime = os.path.getmtime(filename) + 10
+    os.utime(filename, (mtime, mtime))
+    pos = rec['pos'][0]
+    np.testing.assert_array_equal(np.sort(reader.get(2, pos)['t_start']),
+                                  expected(rec, pos))
+    assert reader._store is None
+
+    # Converting again is picked up by the reader
+    ccdc_results.convert_results(folder, store)
+    manifest = os.path.join(store, 'ccdc_manifest.json')
+    os.utime(manifest, (mtime + 10, mtime + 10))
+    np.testing.assert_array_equal(np.sort(reader.get(2, pos)['t_start']),
+                                  expected(rec, pos))
+    assert reader._store is not None
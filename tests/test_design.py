@@ -0,0 +1,57 @@
+""" Tests for cached construction of design matrices
+"""
+import re
+
+import numpy as np
+import pytest
+
+patsy = pytest.importorskip('patsy')
+
+from src.ts_driver import design  # noqa
+
+
+@pytest.fixture
+def data():
+    x = np.arange(730000, 731000, 16)
+    return {
+        'x': x,
+        'sensor': np.where(np.arange(x.size) % 2, 'LT5', 'LE7'),
+    }
+
+
+@pytest.mark.parametrize('formula', [
+    '1 + x',
+    '1 + x + np.cos(2 * np.pi * x / 365.25)',
+    '1 + x + C(sensor)',
+])
+def test_build_design_matches_dmatrix(formula, data):
+    design_info = design.compile_design(formula, data)
+    assert design.compile_design(formula, {}) is design_info
+
+    new = dict((k, v[::3]) for k, v in data.items())
+    np.testing.assert_allclose(design.build_design(design_info, new),
+                               np.asarray(patsy.dmatrix(formula, new)))
+
+
+def test_design_matrix_cached(data):
+    X = design.design_matrix('1 + x', data, 'key')
+    assert design.design_matrix('1 + x', data, 'key') is X
+    assert not X.flags.writeable
+    np.testing.assert_allclose(X, np.asarray(patsy.dmatrix('1 + x', data)))
+
+
+def test_strip_categorical():
+    # Baseline expression of drivers
+    for formula in ('1 + x', '1 + x + C(sensor)', '1 + x - C(pr)'):
+        assert (design.strip_categorical(formula) ==
+                re.sub(r'[\+\-][\ ]+C\(.*\)', '', formula))
+
+
+def test_coef_columns_matches_loop(data):
+    formula = '1 + C(sensor) + x'
+    design_info = patsy.dmatrix(formula, data).design_info
+    names = design_info.column_name_indexes
+
+    expected = np.sort([v for k, v in names.items()
+                        if not re.match(r'C\(.*\)', k)])
+    np.testing.assert_array_equal(design.coef_columns(names), expected)
@@ -0,0 +1,60 @@
+""" Tests for reprojecting coordinates with cached transformations
+"""
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip('osgeo')
+
+from osgeo import osr  # noqa
+from src.utils import geo_utils  # noqa
+
+
+def _wkt(epsg):
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(epsg)
+    return srs.ExportToWkt()
+
+
+WGS84 = _wkt(4326)
+UTM19N = _wkt(32619)
+
+
+def test_reproject_points_same_crs(monkeypatch):
+    def fail(*args):
+        raise AssertionError('Transformation created for same CRS')
+    monkeypatch.setattr(geo_utils, 'get_transform', fail)
+
+    xs, ys = np.array([300000.0, 310000.0]), np.array([4700000.0, 4710000.0])
+    _xs, _ys = geo_utils.reproject_points(xs, ys, UTM19N, UTM19N)
+
+    np.testing.assert_array_equal(_xs, xs)
+    np.testing.assert_array_equal(_ys, ys)
+    # Copies, so callers may modify them
+    assert _xs is not xs and _ys is not ys
+    assert geo_utils.reproject_point(1.0, 2.0, UTM19N, UTM19N) == (1.0, 2.0)
+
+
+def test_reproject_points_matches_reproject_point():
+    xs = np.array([300000.0, 310000.0, 325000.0])
+    ys = np.array([4700000.0, 4710000.0, 4650000.0])
+
+    _xs, _ys = geo_utils.reproject_points(xs, ys, UTM19N, WGS84)
+
+    for x, y, _x, _y in zip(xs, ys, _xs, _ys):
+        expected = geo_utils.reproject_point(x, y, UTM19N, WGS84)
+        np.testing.assert_allclose((_x, _y), expected)
+
+
+def test_get_transform_cached_per_thread():
+    transform = geo_utils.get_transform(UTM19N, WGS84)
+    assert geo_utils.get_transform(UTM19N, WGS84) is transform
+    assert geo_utils.get_transform(WGS84, UTM19N) is not transform
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(
+        geo_utils.get_transform(UTM19N, WGS84)))
+    thread.start()
+    thread.join()
+    assert other[0] is not transform
@@ -0,0 +1,37 @@
+""" Tests for spatial index of plotted points
+"""
+import numpy as np
+import pytest
+
+from src.plots import pick_index
+
+
+def brute_force(xy, x, y, radius):
+    xy = np.asarray(xy, dtype=float)
+    dist = np.hypot(xy[:, 0] - x, xy[:, 1] - y)
+    return np.where(dist <= radius)[0]
+
+
+@pytest.fixture(params=[True, False], ids=['scipy', 'grid'])
+def has_scipy(request, monkeypatch):
+    if request.param and not pick_index.HAS_SCIPY:
+        pytest.skip('scipy is not installed')
+    monkeypatch.setattr(pick_index, 'HAS_SCIPY', request.param)
+    return request.param
+
+
+def test_query_matches_brute_force(has_scipy):
+    rng = np.random.RandomState(0)
+    xy = rng.uniform(0, 800, (2000, 2))
+    xy[::50] = np.nan  # not drawn, so cannot be picked
+    index = pick_index.PickIndex(xy, cell_size=7.0)
+
+    for x, y in rng.uniform(-10, 810, (100, 2)):
+        for radius in (0.5, 5.0, 25.0):
+            np.testing.assert_array_equal(index.query(x, y, radius),
+                                          brute_force(xy, x, y, radius))
+
+
+def test_query_empty(has_scipy):
+    index = pick_index.PickIndex(np.zeros((0, 2)))
+    assert index.query(0, 0, 10).size == 0
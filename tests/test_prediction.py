@@ -0,0 +1,139 @@
+""" Tests for vectorized predictions and residuals of segmented models
+"""
+import datetime as dt
+
+import matplotlib.dates as mdates
+import numpy as np
+import pytest
+
+from src.ts_driver import prediction
+
+N_COEF, N_BAND = 4, 3
+
+
+def make_X(x):
+    """ Intercept, slope, and annual harmonic """
+    w = 2 * np.pi / 365.25
+    x = np.asarray(x, dtype=float)
+    return np.column_stack((np.ones_like(x), x, np.cos(w * x), np.sin(w * x)))
+
+
+@pytest.fixture
+def model():
+    rng = np.random.RandomState(42)
+    # Last segment is reversed
+    start = np.array([730000, 730500, 731300])
+    end = np.array([730400, 731200, 731000])
+    brk = np.array([730450, 731250, 0])
+    coef = rng.rand(start.size, N_COEF, N_BAND)
+    return start, end, brk, coef
+
+
+def test_datenum_roundtrip():
+    ordinal = np.arange(700000, 740000, 97)
+    expected = [mdates.date2num(dt.datetime.fromordinal(int(d)))
+                for d in ordinal]
+    datenum = prediction.ordinal2datenum(ordinal)
+    np.testing.assert_allclose(datenum, expected)
+    np.testing.assert_array_equal(prediction.datenum2ordinal(datenum),
+                                  ordinal)
+
+
+def test_find_segments_matches_loop(model):
+    start, end, _, _ = model
+    first, last = np.minimum(start, end), np.maximum(start, end)
+    ordinal = np.arange(729900, 731500)
+
+    seg, inside = prediction.find_segments(first, last, ordinal)
+
+    for d, _seg, _inside in zip(ordinal, seg, inside):
+        found = [i for i in range(first.size)
+                 if first[i] <= d <= last[i]]
+        assert _inside == bool(found)
+        if found:
+            assert _seg == max(found, key=lambda i: first[i])
+
+
+def test_find_segments_empty():
+    seg, inside = prediction.find_segments([], [], [730000, 730001])
+    assert seg.shape == (2, )
+    assert not inside.any()
+
+
+def test_predict_daily_matches_loop(model):
+    start, end, _, coef = model
+    pred = prediction.predict(coef, start, end, make_X)
+
+    for band in range(N_BAND):
+        mx, my = pred.get(band)
+        assert len(mx) == start.size
+        for i_seg in range(start.size):
+            # Baseline: every day from start up to end, in either direction
+            step = -1 if end[i_seg] < start[i_seg] else 1
+            x = np.arange(start[i_seg], end[i_seg], step)
+            y = np.dot(make_X(x), coef[i_seg][:, band])
+            order = np.argsort(x)
+            np.testing.assert_array_equal(
+                prediction.datenum2ordinal(mx[i_seg]), x[order])
+            np.testing.assert_allclose(my[i_seg], y[order])
+
+
+def test_predict_dates_matches_loop(model):
+    start, end, brk, coef = model
+    rng = np.random.RandomState(0)
+    dates = np.unique(rng.randint(729900, 731400, 300))
+    # As drivers predict dates: allow reversed records, predict up to break
+    first = np.minimum(start, end)
+    last = np.maximum(np.maximum(start, end), brk)
+
+    pred = prediction.predict(coef, first, last, make_X, dates=dates)
+
+    for band in range(N_BAND):
+        mx, my = pred.get(band)
+        i = 0
+        for i_seg in range(start.size):
+            x = dates[(dates >= first[i_seg]) & (dates <= last[i_seg])]
+            if x.size == 0:
+                continue
+            np.testing.assert_array_equal(
+                prediction.datenum2ordinal(mx[i]), x)
+            np.testing.assert_allclose(
+                my[i], np.dot(make_X(x), coef[i_seg][:, band]))
+            i += 1
+        assert i == len(mx)
+
+
+def test_residuals_matches_loop(model):
+    start, end, _, coef = model
+    rng = np.random.RandomState(1)
+    ordinal = np.unique(rng.randint(729900, 731400, 200))
+    Y = rng.rand(N_BAND + 1, ordinal.size)  # extra band is not predicted
+    index = np.arange(ordinal.size) * 2
+
+    pred = prediction.predict(coef, start, end, make_X)
+    resid = prediction.residuals(pred, ordinal, Y, index=index)
+
+    # Baseline: residual of each observation on a predicted day of a segment
+    reverse = end < start
+    lo = np.minimum(start, end) + reverse
+    hi = np.maximum(start, end) + reverse
+    expected = {}
+    for j, d in enumerate(ordinal):
+        for i_seg in range(start.size):
+            if not lo[i_seg] <= d < hi[i_seg]:
+                continue
+            yhat = np.dot(make_X([d])[0], coef[i_seg])
+            expected[index[j]] = Y[:N_BAND, j] - yhat
+    assert sorted(expected) == list(resid.index)
+    for k, i in enumerate(resid.index):
+        np.testing.assert_allclose(resid.resid[:, k], expected[i])
+
+    rx, ry = resid.get(0)
+    assert sum(len(_rx) for _rx in rx) == resid.index.size
+
+
+def test_predict_results_read_only(model):
+    start, end, _, coef = model
+    pred = prediction.predict(coef, start, end, make_X)
+    with pytest.raises(ValueError):
+        pred.yhat[0, 0] = 0
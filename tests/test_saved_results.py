@@ -0,0 +1,99 @@
+""" Tests for indexed reader of YATSM results saved by row
+"""
+import os
+
+import numpy as np
+import pytest
+
+from src.ts_driver import saved_results
+
+DTYPE = [('start', 'i4'), ('end', 'i4'), ('break', 'i4'),
+         ('coef', 'f4', (4, 3)), ('px', 'u2'), ('py', 'u2')]
+
+
+def write_row(filename, row, n_col=20, seed=0):
+    rng = np.random.RandomState(seed)
+    px = rng.randint(0, n_col, 3 * n_col)
+    rec = np.zeros(px.size, dtype=DTYPE)
+    rec['px'] = px
+    rec['py'] = row
+    rec['start'] = rng.randint(730000, 735000, px.size)
+    rec['coef'] = rng.rand(px.size, 4, 3)
+    metadata = {'YATSM': {'design_matrix': '1 + x',
+                          'design': {'Intercept': 0, 'x': 1}}}
+    np.savez(filename, record=rec, metadata=metadata)
+    return rec
+
+
+def expected(rec, row, col):
+    """ Baseline: scan all records of row for pixel """
+    return rec[(rec['py'] == row) & (rec['px'] == col)]
+
+
+def assert_records_equal(found, exp):
+    assert found.size == exp.size
+    found, exp = np.sort(found, order='start'), np.sort(exp, order='start')
+    for name in exp.dtype.names:
+        np.testing.assert_array_equal(found[name], exp[name])
+
+
+@pytest.mark.parametrize('stored', [False, True], ids=['memory', 'stored'])
+def test_get_matches_scan(tmpdir, stored):
+    filename = str(tmpdir.join('yatsm_r5.npz'))
+    rec = write_row(filename, 5)
+    index_folder = str(tmpdir.join('index')) if stored else None
+    index = saved_results.SavedResultsIndex(index_folder)
+
+    for col in range(-1, 22):
+        found, metadata = index.get(filename, 5, col)
+        exp = expected(rec, 5, col)
+        assert_records_equal(found, exp)
+        assert metadata['YATSM']['design_matrix'] == '1 + x'
+
+    if stored:
+        # Another index reads conversion from disk
+        reread = saved_results.SavedResultsIndex(index_folder)
+        found, _ = reread.get(filename, 5, 3)
+        assert isinstance(found.base, np.memmap) or found.size == 0
+
+
+def test_get_missing(tmpdir):
+    index = saved_results.SavedResultsIndex(str(tmpdir))
+    assert index.get(str(tmpdir.join('yatsm_r0.npz')), 0, 0) is None
+
+
+def test_empty_row(tmpdir):
+    filename = str(tmpdir.join('yatsm_r1.npz'))
+    np.savez(filename, record=np.zeros(0, dtype=[('px', 'i8'), ('py', 'i8')]),
+             metadata={'YATSM': {'design': {}}})
+    index = saved_results.SavedResultsIndex(str(tmpdir.join('index')))
+    found, _ = index.get(filename, 1, 0)
+    assert found.size == 0
+
+
+def test_reindex_when_modified(tmpdir):
+    filename = str(tmpdir.join('yatsm_r2.npz'))
+    index = saved_results.SavedResultsIndex(str(tmpdir.join('index')))
+    write_row(filename, 2, seed=0)
+    index.get(filename, 2, 0)
+
+    rec = write_row(filename, 2, seed=1)
+    mtime = os.path.getmtime(filename) + 10
+    os.utime(filename, (mtime, mtime))
+    found, _ = index.get(filename, 2, 4)
+    assert_records_equal(found, expected(rec, 2, 4))
+
+
+def test_shared_index_folder(tmpdir):
+    # Results of two folders with the same names share one index folder
+    index = saved_results.SavedResultsIndex(str(tmpdir.join('index')))
+    recs = []
+    for i, folder in enumerate(('a', 'b')):
+        tmpdir.mkdir(folder)
+        filename = str(tmpdir.join(folder, 'yatsm_r3.npz'))
+        recs.append((filename, write_row(filename, 3, seed=i)))
+
+    for _ in range(2):
+        for filename, rec in recs:
+            found, _ = index.get(filename, 3, 7)
+            assert_records_equal(found, expected(rec, 3, 7))
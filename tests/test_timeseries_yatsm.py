@@ -0,0 +1,62 @@
+""" Tests for helpers of the YATSM CCDCesque driver
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip('osgeo')
+
+from src.ts_driver.drivers import timeseries_yatsm  # noqa
+
+
+def test_label_phenology_matches_loop():
+    rng = np.random.RandomState(0)
+    ordinal = np.sort(rng.randint(730000, 733000, 300))
+    images = np.zeros(ordinal.size, dtype=[('ordinal', 'i8'), ('doy', 'i4')])
+    images['ordinal'] = ordinal
+    images['doy'] = rng.randint(1, 366, ordinal.size)
+
+    record = np.zeros(3, dtype=[('start', 'i8'), ('end', 'i8'),
+                                ('spring_doy', 'i4'), ('autumn_doy', 'i4')])
+    record['start'] = [730100, 731000, 732900]
+    record['end'] = [730900, 732000, 732500]  # last is reversed
+    record['spring_doy'] = [100, 120, 90]
+    record['autumn_doy'] = [270, 250, 280]
+    pheno = np.full(ordinal.size, timeseries_yatsm.PHENO_SUM, dtype=np.uint8)
+
+    labeled = timeseries_yatsm.label_phenology(images, record, pheno)
+
+    # Baseline: label images of each record by comparing to its dates
+    labels = np.array(['SUM'] * ordinal.size, dtype=object)
+    for rec in record:
+        start, end = sorted((rec['start'], rec['end']))
+        idx = np.where((ordinal >= start) & (ordinal <= end))[0]
+        doy = images['doy'][idx]
+        labels[idx[doy <= rec['spring_doy']]] = 'SPR'
+        labels[idx[(doy > rec['spring_doy']) &
+                   (doy < rec['autumn_doy'])]] = 'SUM'
+        labels[idx[doy >= rec['autumn_doy']]] = 'AUT'
+    assert ([timeseries_yatsm.PHENO_LABELS[i] for i in labeled] ==
+            list(labels))
+    # Input is not modified
+    assert (pheno == timeseries_yatsm.PHENO_SUM).all()
+
+
+def test_label_phenology_empty():
+    images = np.zeros(3, dtype=[('ordinal', 'i8'), ('doy', 'i4')])
+    pheno = np.arange(3, dtype=np.uint8)
+    record = np.zeros(0, dtype=timeseries_yatsm.EMPTY_RECORD_DTYPE)
+    np.testing.assert_array_equal(
+        timeseries_yatsm.label_phenology(images, record, pheno), pheno)
+
+
+def test_parse_sweep_grid():
+    controls = timeseries_yatsm.YATSMTimeSeries.controls
+    grid = timeseries_yatsm.parse_sweep_grid(
+        'threshold=3|4.5; consecutive = 4|5; design=1 + x|1 + x + harm(x, 1)',
+        controls)
+    assert grid == {'threshold': [3.0, 4.5], 'consecutive': [4, 5],
+                    'design': ['1 + x', '1 + x + harm(x, 1)']}
+    assert timeseries_yatsm.parse_sweep_grid(' ', controls) == {}
+    for text in ('unknown=1', 'threshold', 'consecutive=a'):
+        with pytest.raises(ValueError):
+            timeseries_yatsm.parse_sweep_grid(text, controls)
@@ -0,0 +1,99 @@
+""" Tests for caching and concurrency utilities of drivers
+"""
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+import threading
+
+import pytest
+
+from src.ts_driver.ts_utils import LRUCache, iter_concurrent
+
+
+def test_lru_cache_matches_ordered_dict():
+    cache = LRUCache(maxsize=3)
+    # Baseline: OrderedDict moving items to the end when used
+    expected = OrderedDict()
+    ops = [('set', 1), ('set', 2), ('get', 1), ('set', 3), ('set', 4),
+           ('get', 2), ('get', 3), ('set', 1), ('set', 5), ('get', 4)]
+    for op, key in ops:
+        if op == 'set':
+            cache.set(key, key * 10)
+            expected.pop(key, None)
+            expected[key] = key * 10
+            while len(expected) > 3:
+                expected.popitem(last=False)
+        else:
+            value = expected.pop(key, None)
+            if value is not None:
+                expected[key] = value
+            assert cache.get(key) == value
+        assert list(cache._cache.items()) == list(expected.items())
+    assert len(cache) == 3
+    assert 5 in cache
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get(5, 'default') == 'default'
+
+
+@pytest.fixture
+def pool():
+    pool = ThreadPool(4)
+    yield pool
+    pool.terminate()
+
+
+def count(n, name):
+    for i in range(n):
+        yield name, i
+
+
+@pytest.mark.parametrize('n_gen', [1, 3])
+def test_iter_concurrent_matches_sequential(pool, n_gen):
+    generators = [count(5 + i, 'g%i' % i) for i in range(n_gen)]
+    expected = [(i, value) for i in range(n_gen)
+                for value in count(5 + i, 'g%i' % i)]
+
+    results = list(iter_concurrent(generators, pool=pool))
+
+    # Values of each generator are yielded in order
+    assert sorted(results) == sorted(expected)
+    for i in range(n_gen):
+        assert ([v for j, v in results if j == i] ==
+                [v for j, v in expected if j == i])
+
+
+def test_iter_concurrent_raises(pool):
+    closed = threading.Event()
+
+    def failing():
+        yield 0
+        raise RuntimeError('failed')
+
+    def slow():
+        try:
+            for i in range(1000):
+                yield i
+                threading.Event().wait(0.001)
+        finally:
+            closed.set()
+
+    with pytest.raises(RuntimeError):
+        list(iter_concurrent([failing(), slow()], pool=pool))
+    assert closed.wait(5)
+
+
+def test_iter_concurrent_stops_early(pool):
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield 1
+                threading.Event().wait(0.001)
+        finally:
+            closed.set()
+
+    for _ in iter_concurrent([endless(), count(1, 'a')], pool=pool):
+        break
+    assert closed.wait(5)
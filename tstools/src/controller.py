@@ -1,10 +1,10 @@
 """ Controller for TSTools that handles slots/signals communication
 """
 import copy
-from datetime import datetime as dt
 from functools import partial
 import itertools
 import logging
+import threading
 
 import matplotlib as mpl
 import numpy as np
@@ -19,7 +19,6 @@ from PyQt4 import QtCore, QtGui
 import qgis
 
 from . import config
-from . import plots
 from . import settings
 from .utils import actions
 from .logger import qgis_log
@@ -34,21 +33,49 @@ ITERABLE = (list, tuple, np.ndarray)
 # See:
 # http://stackoverflow.com/questions/23317195/pyqt-movetothread-does-not-work-when-using-partial-for-slot
 class Worker(QtCore.QObject):
+    """ Fetch data and then results from a time series driver
+
+    Work is done in two stages, each with their own signals: retrieving data
+    (`update`, `finished`, `errored`) and calculating results
+    (`results_update`, `results_finished`, `results_errored`). Results are
+    handed to the GUI thread as the object returned from
+    `ts.fetch_results`. Either stage may be canceled, after which `canceled`
+    is emitted instead.
+    """
 
     update = QtCore.pyqtSignal(float)
     finished = QtCore.pyqtSignal()
     errored = QtCore.pyqtSignal(str)
 
+    results_update = QtCore.pyqtSignal(float)
+    results_finished = QtCore.pyqtSignal(object)
+    results_errored = QtCore.pyqtSignal(str)
+
+    canceled = QtCore.pyqtSignal()
+
     def __init__(self, parent, pct_increment=10.0):
         super(Worker, self).__init__()
         parent.fetch_data.connect(self.fetch)
+        parent.fit_results.connect(self.fit)
         self.pct_increment = pct_increment
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """ Request that the worker stops as soon as it can
+
+        Called directly from the GUI thread since signals sent to this worker
+        would be queued until the current work is done. Data retrieval stops
+        before the next progress update, and results are discarded if
+        canceled while they are calculated.
+        """
+        self._cancel.set()
 
     @QtCore.pyqtSlot(object, object, str)
     def fetch(self, ts, pos, crs_wkt):
         """ Fetch a point from a time series driver, emitting progress
 
-        Progress emitted incrementally to not overwhelm network communication
+        Progress emitted incrementally to not overwhelm network communication.
+        Results are calculated once all data are fetched.
 
         Arg:
             ts (time series driver): Time series drivers (e.g., specified
@@ -63,15 +90,51 @@ class Worker(QtCore.QObject):
         pct = 0
         try:
             for percent in ts.fetch_data(pos[0], pos[1], crs_wkt):
+                if self._cancel.is_set():
+                    self.canceled.emit()
+                    return
                 if percent > pct + self.pct_increment:
                     self.update.emit(percent)
                     pct = percent
         except Exception as e:
             self.errored.emit(e.message)
+            return
         else:
             self.update.emit(100.0)
             self.finished.emit()
 
+        # Fetch results
+        self.fit(ts)
+
+    @QtCore.pyqtSlot(object)
+    def fit(self, ts):
+        """ Calculate results for the data currently held by a driver
+
+        Arg:
+            ts (time series driver): Time series drivers (e.g., specified
+                under "TSTools.drivers" entry point)
+
+        """
+        if self._cancel.is_set():
+            self.canceled.emit()
+            return
+
+        logger.info('Fetching results from QThread (id: %s)' %
+                    hex(self.thread().currentThreadId()))
+        self.results_update.emit(0.0)
+        try:
+            result = ts.fetch_results()
+        except Exception as e:
+            logger.exception('Could not fetch results')
+            self.results_errored.emit(e.message or repr(e))
+            return
+
+        if self._cancel.is_set():
+            self.canceled.emit()
+        else:
+            self.results_update.emit(100.0)
+            self.results_finished.emit(result)
+
 
 class PlotHandler(QtCore.QObject):
     """ Workaround for connecting `pick_event` signals to `twinx()` axes
@@ -81,8 +144,8 @@ class PlotHandler(QtCore.QObject):
     Args:
       canvas (matplotlib.backend_bases.FigureCanvasBase): figure canvas to
         connect
-      tolerance (float or int): tolerance for picking plot point in days
-        (default: 10)
+      tolerance (float or int): tolerance for picking plot point in pixels
+        (default: 2)
 
     """
     picked = QtCore.pyqtSignal(set)
@@ -94,58 +157,12 @@ class PlotHandler(QtCore.QObject):
         self.cid = self.canvas.mpl_connect('button_release_event', self)
 
     def __call__(self, event):
-        # Plot X/Y clicked
-        x, y = event.x, event.y
-        # Bands plotted on each axis
-        plotted = (settings.plot['y_axis_1_band'],
-                   settings.plot['y_axis_2_band'])
-
-        # Store output as a set
-        images = set()
-        for ax, _plotted in zip(event.canvas.axes, plotted):
-            # If nothing plotted on this axis, continue
-            if not np.any(_plotted):
-                continue
-
-            # Setup transform for going from data to plot coordinates
-            trans = ax.transData
-
-            # Check bands that are plotted on current axis
-            on = np.where(_plotted)[0]
-            on_series = settings.plot_series[on]
-            on_band = settings.plot_band_indices[on]
-
-            for i, j in zip(on_series, on_band):
-                # Switch based on plot type
-                if isinstance(event.canvas, plots.TSPlot):
-                    _X, _y = tsm.ts.get_data(i, j, mask=False)
-                    _x = _X['ordinal']
-                elif isinstance(event.canvas, plots.ResidualPlot):
-                    residuals = tsm.ts.get_residuals(i, j)
-                    if residuals is None:
-                        return
-                    _x = np.array([dt.toordinal(_d) for _d in
-                                   np.concatenate(residuals[0])])
-                    _y = np.concatenate(residuals[1])
-                elif isinstance(event.canvas, plots.DOYPlot):
-                    _X, _y = tsm.ts.get_data(i, j, mask=False)
-                    _x = _X['doy']
-
-                # Transform data into plot coordinates
-                trans_coords = trans.transform(np.vstack((_x, _y)).T)
-                _x, _y = trans_coords[:, 0], trans_coords[:, 1]
-
-                delta_x = np.abs(_x - x)
-                delta_y = np.abs(_y - y)
-
-                delta = np.linalg.norm(np.vstack((delta_x, delta_y)), axis=0)
-
-                clicked = np.where(delta < self.tolerance)[0]
-
-                for _clicked in clicked:
-                    # Add index of series and index of image
-                    images.add((i, _clicked))
+        """ Emit observations near the position clicked
 
+        Observations are found using the index of points plotted by the plot
+        (see `BasePlot.pick`), without requesting data from the driver again.
+        """
+        images = event.canvas.pick(event.x, event.y, self.tolerance)
         self.picked.emit(images)
 
     def disconnect(self):
@@ -163,10 +180,12 @@ class Controller(QtCore.QObject):
     controls = None
     plots = []
     working = False
+    fetched = False
     worker = None
     work_thread = None
 
     fetch_data = QtCore.pyqtSignal(object, object, str)
+    fit_results = QtCore.pyqtSignal(object)
 
     initialized = False
 
@@ -191,6 +210,7 @@ class Controller(QtCore.QObject):
             qgis_log('Loaded timeseries: {d}'.format(d=tsm.ts.description))
             self.disconnect()
             self.config_closed()
+            self.fetched = False
             self._ts_init()
             self.initialized = True
 
@@ -214,6 +234,7 @@ class Controller(QtCore.QObject):
         self.controls.image_table_row_clicked.connect(self._add_remove_image)
         self.controls.symbology_applied.connect(
             lambda: actions.apply_symbology())
+        self.controls.refit_requested.connect(self.refit_request)
 
         # Setup plots
         self._init_plots()
@@ -232,60 +253,110 @@ class Controller(QtCore.QObject):
             crs = self.iface.mapCanvas().mapSettings().destinationCrs()
             crs_wkt = crs.toWkt()
 
-            # Setup QProgressBar
-            self.progress_bar = self.iface.messageBar().createMessage(
-                'Retrieving data')
+            if not self._set_custom_controls():
+                return
 
-            self.progress = QtGui.QProgressBar()
-            self.progress.setValue(0)
-            self.progress.setMaximum(100)
-            self.progress.setAlignment(QtCore.Qt.AlignLeft |
-                                       QtCore.Qt.AlignVCenter)
-
-            self.but_cancel = QtGui.QPushButton('Cancel')
-            self.but_cancel.pressed.connect(self.plot_request_cancel)
-
-            self.progress_bar.layout().addWidget(self.progress)
-            self.progress_bar.layout().addWidget(self.but_cancel)
-
-            self.iface.messageBar().pushWidget(
-                self.progress_bar, self.iface.messageBar().INFO)
-
-            # Setup worker and thread
-            self.working = True
-
-            self.work_thread = QtCore.QThread()
-            # self.worker = Worker()
-            self.worker = Worker(self)
-            self.worker.moveToThread(self.work_thread)
-            self.worker.update.connect(self.plot_request_update)
-            self.worker.finished.connect(self.plot_request_finish)
-            self.worker.errored.connect(self.plot_request_error)
-            self.work_thread.started.connect(partial(self.plot_request_start,
-                                             tsm.ts,
-                                             (pos[0], pos[1]),
-                                             crs_wkt))
-
-            if (getattr(self.controls, 'custom_form', None) is not None and
-                    hasattr(tsm.ts, 'set_custom_controls')):
-                try:
-                    options = self.controls.custom_form.get()
-                    tsm.ts.set_custom_controls(options)
-                except BaseException as e:
-                    logger.warning(
-                        'Could not use custom controls for timeseries')
-                    qgis_log(str(e), level=logging.WARNING)
-                    self.controls.custom_form.reset()
-                    return
+            # Data are incomplete until worker finishes fetching them
+            self.fetched = False
+            self._start_worker(
+                'Retrieving data',
+                partial(self.plot_request_start,
+                        tsm.ts, (pos[0], pos[1]), crs_wkt),
+                self.plot_request_finish)
+
+    @QtCore.pyqtSlot()
+    def refit_request(self):
+        """ Recalculate results using data already fetched
+
+        Useful when only custom controls have changed since the last plot
+        request
+        """
+        if self.working:
+            qgis_log('Unable to initiate refit request: already working',
+                     logging.INFO)
+        elif not self.fetched:
+            qgis_log('Unable to refit results: no data fetched yet',
+                     logging.INFO)
+        else:
+            if not self._set_custom_controls():
+                return
+
+            self._start_worker(
+                'Calculating results',
+                partial(self.refit_request_start, tsm.ts),
+                self.refit_request_finish)
 
-            # Run thread
-            logger.info('Timeseries (id: {i})'.format(i=hex(id(tsm.ts))))
-            logger.info('Current thread: ({i})'.format(
-                i=hex(self.thread().currentThreadId())))
+    def _set_custom_controls(self):
+        """ Pass values from custom controls form to timeseries driver
 
-            self.work_thread.start()
-            logger.info('Started QThread (id: {i})'.format(
-                i=hex(self.work_thread.currentThreadId())))
+        Returns:
+            bool: True if custom controls were set, or aren't used
+
+        """
+        if (getattr(self.controls, 'custom_form', None) is not None and
+                hasattr(tsm.ts, 'set_custom_controls')):
+            try:
+                options = self.controls.custom_form.get()
+                tsm.ts.set_custom_controls(options)
+            except BaseException as e:
+                logger.warning(
+                    'Could not use custom controls for timeseries')
+                qgis_log(str(e), level=logging.WARNING)
+                self.controls.custom_form.reset()
+                return False
+        return True
+
+    def _start_worker(self, msg, started, finished):
+        """ Show progress bar and run a `Worker` in a new QThread
+
+        Args:
+            msg (str): message to display with progress bar
+            started (callable): slot called when QThread starts that signals
+                the worker to begin
+            finished (callable): slot called with results from worker
+
+        """
+        # Setup QProgressBar
+        self.progress_bar = self.iface.messageBar().createMessage(msg)
+
+        self.progress = QtGui.QProgressBar()
+        self.progress.setValue(0)
+        self.progress.setMaximum(100)
+        self.progress.setAlignment(QtCore.Qt.AlignLeft |
+                                   QtCore.Qt.AlignVCenter)
+
+        self.but_cancel = QtGui.QPushButton('Cancel')
+        self.but_cancel.pressed.connect(self.plot_request_cancel)
+
+        self.progress_bar.layout().addWidget(self.progress)
+        self.progress_bar.layout().addWidget(self.but_cancel)
+
+        self.iface.messageBar().pushWidget(
+            self.progress_bar, self.iface.messageBar().INFO)
+
+        # Setup worker and thread
+        self.working = True
+
+        self.work_thread = QtCore.QThread()
+        self.worker = Worker(self)
+        self.worker.moveToThread(self.work_thread)
+        self.worker.update.connect(self.plot_request_update)
+        self.worker.finished.connect(self.plot_request_fetched)
+        self.worker.errored.connect(self.plot_request_error)
+        self.worker.results_update.connect(self.results_request_update)
+        self.worker.results_finished.connect(finished)
+        self.worker.results_errored.connect(self.results_request_error)
+        self.worker.canceled.connect(self.plot_request_canceled)
+        self.work_thread.started.connect(started)
+
+        # Run thread
+        logger.info('Timeseries (id: {i})'.format(i=hex(id(tsm.ts))))
+        logger.info('Current thread: ({i})'.format(
+            i=hex(self.thread().currentThreadId())))
+
+        self.work_thread.start()
+        logger.info('Started QThread (id: {i})'.format(
+            i=hex(self.work_thread.currentThreadId())))
 
     @QtCore.pyqtSlot(object, tuple, str)
     def plot_request_start(self, ts, pos, crs_wkt):
@@ -294,33 +365,62 @@ class Controller(QtCore.QObject):
 
         self.fetch_data.emit(ts, pos, crs_wkt)
 
+    @QtCore.pyqtSlot(object)
+    def refit_request_start(self, ts):
+        logger.info('Fit results signal sent')
+
+        self.fit_results.emit(ts)
+
+    @QtCore.pyqtSlot()
+    def plot_request_fetched(self):
+        self.fetched = True
+
     @QtCore.pyqtSlot(float)
     def plot_request_update(self, progress):
         if self.working is True:
             self.progress.setValue(progress)
 
-    @QtCore.pyqtSlot()
-    def plot_request_finish(self):
-        # Get results in this thread since it's so prone to error
-        try:
-            tsm.ts.fetch_results()
-        except Exception as e:
-            logger.error('Could not fetch results: %s' % e.message)
-            raise
-        finally:
-            # Stop 'working'
-            self.working = False
-            self.work_thread.quit()
-
-            # Clear GUI messages
-            logger.info('Plot request finished')
-            self.iface.messageBar().clearWidgets()
+    @QtCore.pyqtSlot(float)
+    def results_request_update(self, progress):
+        if self.working is not True:
+            return
+        if progress == 0:
+            # Can't measure progress of model fitting, so show we're busy
+            self.progress_bar.setText('Calculating results')
+            self.progress.setMaximum(0)
+        else:
+            self.progress.setMaximum(100)
+            self.progress.setValue(progress)
 
-            # Update plots
-            self.update_plot()
+    @QtCore.pyqtSlot(object)
+    def plot_request_finish(self, result):
+        # Results were calculated in worker thread -- just swap them in
+        tsm.ts.set_results(result)
+        self._plot_request_stop()
 
-            # Add geometry from clicked point
-            self.plot_request_geometry()
+        # Update plots
+        self.update_plot()
+
+        # Add geometry from clicked point
+        self.plot_request_geometry()
+
+    @QtCore.pyqtSlot(object)
+    def refit_request_finish(self, result):
+        tsm.ts.set_results(result)
+        self._plot_request_stop()
+
+        self.update_plot()
+
+    @QtCore.pyqtSlot(str)
+    def results_request_error(self, txt):
+        qgis_log('Could not fetch results: %s' % txt, logging.ERROR,
+                 duration=5)
+        # Data are fine, so plot them without results
+        tsm.ts.set_results(None)
+        self._plot_request_stop(clear=False)
+
+        self.update_plot()
+        self.plot_request_geometry()
 
     @QtCore.pyqtSlot(str)
     def plot_request_error(self, txt):
@@ -332,7 +432,28 @@ class Controller(QtCore.QObject):
 
     @QtCore.pyqtSlot()
     def plot_request_cancel(self):
-        self.plot_request_finish()
+        # Wait for worker to acknowledge so it isn't running with the next
+        # request
+        if self.worker is not None:
+            self.worker.cancel()
+        self.progress_bar.setText('Canceling')
+        self.but_cancel.setEnabled(False)
+
+    @QtCore.pyqtSlot()
+    def plot_request_canceled(self):
+        self._plot_request_stop()
+        qgis_log('Canceled plot request', logging.INFO)
+
+    def _plot_request_stop(self, clear=True):
+        """ Stop "working" and clear GUI messages """
+        self.working = False
+        self.work_thread.quit()
+
+        logger.info('Plot request finished')
+        if clear:
+            self.iface.messageBar().clearWidgets()
+        else:
+            self.iface.messageBar().popWidget(self.progress_bar)
 
     def plot_request_geometry(self):
         """ Add polygon of geometry from clicked X/Y coordinate """
@@ -408,6 +529,11 @@ class Controller(QtCore.QObject):
         for i_series, i_img in idx:
             self._add_remove_image(i_series, i_img)
 
+        # Highlight observations picked -- hidden plots only remember them
+        # until they are next drawn
+        for plot in self.plots:
+            plot.highlight(idx)
+
     @QtCore.pyqtSlot(list)
     def _map_layers_added(self, layers):
         """ Performs necessary functions if added layers in timeseries
@@ -472,13 +598,22 @@ class Controller(QtCore.QObject):
         """ Add or remove image at index `i_image`
         """
         layers = qgis.core.QgsMapLayerRegistry.instance().mapLayers().values()
-        filename = tsm.ts.series[i_series].images['path'][i_image]
+        series = tsm.ts.series[i_series]
+        filename = series.images['path'][i_image]
 
         # Add image
         if filename not in [layer.source() for layer in layers]:
+            # Some Series only create images once they're needed
+            if hasattr(series, 'prepare_image'):
+                try:
+                    filename = series.prepare_image(i_image)
+                except Exception as e:
+                    qgis_log('Could not create image {i}: {e}'.format(
+                        i=series.images['id'][i_image], e=e),
+                        level=logging.ERROR, duration=5)
+                    return
             rlayer = qgis.core.QgsRasterLayer(
-                tsm.ts.series[i_series].images['path'][i_image],
-                tsm.ts.series[i_series].images['id'][i_image])
+                filename, series.images['id'][i_image])
 
             if rlayer.isValid():
                 qgis.core.QgsMapLayerRegistry.instance().addMapLayer(rlayer)
@@ -702,6 +837,17 @@ class Controller(QtCore.QObject):
             else:
                 settings.plot_dirty[i] = True
 
+    def show_plot(self, idx):
+        """ Show a plot, plotting it if it changed while hidden
+
+        Args:
+            idx (int): index of plot shown
+
+        """
+        if settings.plot_dirty[idx]:
+            settings.plot_dirty[idx] = False
+            self.plots[idx].plot()
+
 # DISCONNECT
     def disconnect(self):
         logger.info('Disconnecting controller')
@@ -731,8 +877,9 @@ class Controller(QtCore.QObject):
             self.controls.image_table_row_clicked.disconnect(
                 self._add_remove_image)
             self.controls.symbology_applied.disconnect()
+            self.controls.refit_requested.disconnect(self.refit_request)
         except Exception as e:
             logger.error('Error disconnecting signals from controls: %s' %
                          e.message)
 
-        self.initialzed = False
+        self.initialized = False
@@ -34,6 +34,7 @@ class ControlPanel(QtGui.QWidget, Ui_Controls):
     plot_options_changed = QtCore.pyqtSignal()
     image_table_row_clicked = QtCore.pyqtSignal(int, int)
     symbology_applied = QtCore.pyqtSignal()
+    refit_requested = QtCore.pyqtSignal()
 
     def __init__(self, iface):
         # Qt setup
@@ -514,6 +515,15 @@ class ControlPanel(QtGui.QWidget, Ui_Controls):
         self.custom_form = CustomForm(config)
         self.tab_options.layout().addWidget(self.custom_form)
 
+        # Recalculate results for current data without fetching data again
+        if tsm.ts.has_results:
+            self.but_refit = QtGui.QPushButton('Refit')
+            self.but_refit.setToolTip('Recalculate results for current pixel '
+                                      'using these options')
+            self.but_refit.clicked.connect(
+                lambda: self.refit_requested.emit())
+            self.tab_options.layout().addWidget(self.but_refit)
+
 # DISCONNECT SIGNALS
     def disconnect(self):
         """ Disconnect all signals
@@ -558,3 +568,9 @@ class ControlPanel(QtGui.QWidget, Ui_Controls):
             self.custom_form.deleteLater()
             self.tab_options.layout().removeWidget(self.custom_form)
             self.custom_form = None
+        self.but_refit = getattr(self, 'but_refit', None)
+        if self.but_refit:
+            self.but_refit.clicked.disconnect()
+            self.but_refit.deleteLater()
+            self.tab_options.layout().removeWidget(self.but_refit)
+            self.but_refit = None
@@ -149,10 +149,13 @@ class SymbologyControl(QtGui.QDialog, Ui_Plot_Symbology):
                 # If has metadata, add that in too
                 if (hasattr(series, 'metadata') and
                         hasattr(series, 'metadata_names')):
+                    labels = getattr(series, 'metadata_labels', {})
                     for _md, _md_str in zip(series.metadata,
                                             series.metadata_names):
                         vals = OrderedDict()
                         for uniq in np.unique(getattr(series, _md)):
+                            if _md in labels:
+                                uniq = labels[_md][uniq]
                             vals[uniq] = copy.deepcopy(idx_default_sym)
                         item[_md_str] = copy.deepcopy(vals)
 
@@ -303,6 +306,8 @@ class SymbologyControl(QtGui.QDialog, Ui_Plot_Symbology):
                     md_i = [_i for _i, name in enumerate(series.metadata_names)
                             if name == md][0]
                     dat = getattr(series, series.metadata[md_i])
+                    labels = getattr(series, 'metadata_labels', {}).get(
+                        series.metadata[md_i])
                     # For each metadata item value, find index and
                     #   assign marker and color
                     indices = []
@@ -311,6 +316,9 @@ class SymbologyControl(QtGui.QDialog, Ui_Plot_Symbology):
                     for k, val in self.md[i][j][md].iteritems():
                         # TODO: we don't always need to update index,
                         #   and this might be expensive
+                        if labels is not None:
+                            # Metadata stored as codes indexing labels
+                            k = list(labels).index(k)
                         indices.append(np.where(dat == k)[0])
                         markers.append(val['marker'])
                         colors.append(val['color'])
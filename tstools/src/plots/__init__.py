@@ -1,8 +1,20 @@
 """ Plots available in TSTools
+
+Plots shown within TSTools are Qt widgets, imported only when requested by
+:func:`get_plots`, so figures (e.g., :mod:`figure_ts`) and :mod:`batch` may be
+used without Qt.
 """
-from .plot_doy import DOYPlot
-from .plot_ts import TSPlot
-from .plot_residuals import ResidualPlot
 
-# plots = [TSPlot, DOYPlot]
-plots = [TSPlot, DOYPlot, ResidualPlot]
+
+def get_plots():
+    """ Return plots shown within TSTools, in order of their tabs
+
+    Returns:
+        list[type]: classes of plots
+
+    """
+    from .plot_doy import DOYPlot
+    from .plot_ts import TSPlot
+    from .plot_residuals import ResidualPlot
+
+    return [TSPlot, DOYPlot, ResidualPlot]
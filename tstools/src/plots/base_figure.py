@@ -0,0 +1,249 @@
+""" Base class of figures of TSTools plots, independent of any canvas
+"""
+import matplotlib as mpl
+import matplotlib.figure
+import numpy as np
+HAS_STYLE = True
+try:
+    import matplotlib.style
+except ImportError:
+    HAS_STYLE = False
+
+from .. import settings
+from ..ts_driver.ts_manager import tsm
+
+
+class BaseFigure(object):
+    """ Drawing of figures common to all plots, independent of any canvas
+
+    Artists are reused between calls to `plot` instead of clearing the axes.
+    Subclasses create or update artists using `_plot_line` and `_scatter`
+    with a key identifying each artist (e.g., axis, Series, band, and
+    symbology category) between calls to `_begin_plot` and `_end_plot`, and
+    artists not updated since `_begin_plot` are removed. The figure layout
+    is only recalculated when titles, labels, tick label widths, or the size
+    of the figure change.
+
+    A canvas must be attached to `fig` before plotting, either by
+    `BasePlot` or, when rendering without the GUI, by a non-interactive
+    canvas (see :mod:`batch`).
+    """
+    #: str: name of plot given to drivers when plotting custom information
+    plot_name = 'BasePlot'
+
+    def __str__(self):
+        return "Base figure"
+
+    def __init__(self):
+        # Location of pixel plotted
+        self.title = ''
+
+        # matplotlib
+        style = settings.plot.get('style')
+        if HAS_STYLE and style:
+            if style == 'xkcd':
+                import matplotlib.pyplot
+                mpl.pyplot.xkcd()
+            else:
+                mpl.style.use(style)
+        self.fig = mpl.figure.Figure()
+        self.axes = []
+        self.axis_1 = self.fig.add_subplot(111)
+        self.axes.append(self.axis_1)
+
+        # Reusable artists by key, and those updated in current plot
+        self._artists = {}
+        self._used = set()
+        # Artists added by drivers, replaced on every plot
+        self._custom_artists = []
+        self._n_colored = {}
+        self._layout = None
+
+        # Points plotted for each axis, Series, and image
+        self._points = []
+
+    def _register_points(self, axis, series, index, x, y):
+        """ Record points plotted for images of a Series
+
+        Args:
+            axis (mpl.axes.Axes): axis points are plotted on
+            series (int): index of Series
+            index (np.ndarray): index of image of each point
+            x (np.ndarray): X data, as plotted
+            y (np.ndarray): Y data, as plotted
+
+        """
+        index = np.asarray(index)
+        x = np.asarray(axis.convert_xunits(x), dtype=np.float)
+        y = np.asarray(axis.convert_yunits(y), dtype=np.float)
+        if not index.size == x.size == y.size:
+            return
+        self._points.append((axis, series, index, x, y))
+
+    def _image_index(self, series, index):
+        """ Return index of images returned by `get_data` for `indices`
+
+        Args:
+            series (int): index of Series
+            index (np.ndarray): indices of images requested
+
+        Returns:
+            np.ndarray: indices of images returned, given plot mask setting
+
+        """
+        mask = tsm.ts.series[series].mask
+        if settings.plot['mask'] and isinstance(mask, np.ndarray):
+            return index[np.in1d(index, np.where(mask)[0])]
+        return index
+
+    def _begin_plot(self):
+        """ Prepare to update artists, removing those added by drivers
+        """
+        self._used = set()
+        for artist in self._custom_artists:
+            try:
+                artist.remove()
+            except (ValueError, NotImplementedError):
+                pass
+        self._custom_artists = []
+        self._points = []
+        for axis in self.axes:
+            if axis.legend_ is not None:
+                axis.legend_.remove()
+                axis.legend_ = None
+        # Number of lines drawn without explicit color on each axis
+        self._n_colored = dict((axis, 0) for axis in self.axes)
+
+    def _end_plot(self, autoscale=False):
+        """ Remove artists not updated since `_begin_plot` and redraw
+
+        Args:
+            autoscale (bool): scale Y axes to the data plotted
+                (default: False)
+
+        """
+        for key in set(self._artists) - self._used:
+            self._artists.pop(key).remove()
+
+        if autoscale:
+            for axis in self.axes:
+                axis.relim()
+                axis.autoscale_view(scalex=False)
+
+        layout = self._layout_key()
+        if layout != self._layout:
+            self.fig.tight_layout()
+            self._layout = layout
+        self._draw()
+
+    def _draw(self):
+        """ Render figure after plotting
+
+        Figures without a GUI are rendered only when saved.
+        """
+        pass
+
+    def _layout_key(self):
+        """ Return description of everything the figure layout depends on
+        """
+        key = [tuple(self.fig.get_size_inches()), len(self.fig.axes)]
+        for axis in self.fig.axes:
+            ymin, ymax = axis.get_ylim()
+            key.append((axis.get_title(), axis.get_xlabel(),
+                        axis.get_ylabel(),
+                        # Width of tick labels follows number of digits
+                        len('%d' % ymin), len('%d' % ymax)))
+        return key
+
+    def _next_color(self, axis):
+        """ Return color from property cycle for a line without a color
+
+        Colors are assigned in order of drawing in each plot, as when lines
+        are drawn on a cleared axis.
+        """
+        colors = mpl.rcParams['axes.prop_cycle'].by_key().get('color',
+                                                               ['k'])
+        n = self._n_colored.get(axis, 0)
+        self._n_colored[axis] = n + 1
+        return colors[n % len(colors)]
+
+    def _plot_line(self, axis, key, x, y, **kwargs):
+        """ Plot a line on an axis, reusing the line plotted for `key`
+
+        Args:
+            axis (mpl.axes.Axes): axis to plot on
+            key (hashable): key identifying line
+            x (np.ndarray): X data
+            y (np.ndarray): Y data
+            kwargs: properties of line
+
+        Returns:
+            mpl.lines.Line2D: line
+
+        """
+        line = self._artists.get(key)
+        if line is not None and line.axes is axis:
+            line.set_data(x, y)
+            line.update(kwargs)
+        else:
+            if line is not None:
+                line.remove()
+            line, = axis.plot(x, y, **kwargs)
+            self._artists[key] = line
+        self._used.add(key)
+        return line
+
+    def _scatter(self, axis, key, x, y, c, marker, **kwargs):
+        """ Scatter plot on an axis, reusing the collection plotted for `key`
+
+        Args:
+            axis (mpl.axes.Axes): axis to plot on
+            key (hashable): key identifying collection
+            x (np.ndarray): X data
+            y (np.ndarray): Y data
+            c (np.ndarray): values mapped to colors
+            marker (str): marker of points
+            kwargs: properties of collection
+
+        Returns:
+            mpl.collections.PathCollection: collection
+
+        """
+        key = key + (marker, )
+        coll = self._artists.get(key)
+        if coll is not None and coll.axes is axis:
+            coll.set_offsets(np.column_stack((x, y)))
+            coll.set_array(np.asarray(c))
+            if 'cmap' in kwargs:
+                coll.set_cmap(kwargs['cmap'])
+            if 'norm' in kwargs:
+                coll.set_norm(kwargs['norm'])
+        else:
+            if coll is not None:
+                coll.remove()
+            coll = axis.scatter(x, y, c=c, marker=marker, **kwargs)
+            self._artists[key] = coll
+        self._used.add(key)
+        return coll
+
+    def _plot_custom(self, axis, series, band):
+        """ Plot customized plot information from the time series driver
+
+        Artists added by the driver are removed on the next plot.
+
+        Returns:
+            list: artists returned by the driver, if any
+
+        """
+        before = set(axis.get_children())
+        try:
+            return tsm.ts.get_plot(series, band, axis, self.plot_name)
+        finally:
+            self._custom_artists.extend(
+                a for a in axis.get_children() if a not in before)
+
+    def plot(self):
+        raise NotImplementedError('Subclass must implement `plot`')
+
+    def update_plot(self):
+        raise NotImplementedError('Subclass must implement `update_plot`')
@@ -2,49 +2,184 @@
 """
 import os
 
-import matplotlib as mpl
 from matplotlib.backends.backend_qt4agg \
     import FigureCanvasQTAgg as FigureCanvas
-HAS_STYLE = True
-try:
-    import matplotlib.style
-except ImportError:
-    HAS_STYLE = False
+from matplotlib.lines import Line2D
+from matplotlib.transforms import IdentityTransform
+import numpy as np
 
-from .. import settings
+from .base_figure import BaseFigure
+from .pick_index import PickIndex
 
 
 # Note: FigureCanvas is also a QWidget
-class BasePlot(FigureCanvas):
-    """ Base plot class for methods common to all subclass plots """
+class BasePlot(BaseFigure, FigureCanvas):
+    """ Base plot class for methods common to all subclass plots
+
+    Plots are drawn by a subclass of `BaseFigure` on this canvas, which is
+    shown within the GUI. Plots list the figure before `BasePlot` in their
+    bases (e.g., ``class TSPlot(TSFigure, BasePlot)``).
+
+    Highlighted observations (see `highlight`) and a crosshair following the
+    mouse are animated artists drawn in display coordinates. They are blitted
+    over a copy of the rendered figure, saved after every full draw, instead
+    of redrawing the figure.
+    """
 
     def __str__(self):
         return "Base plot"
 
     def __init__(self):
-        # Location of pixel plotted
-        self.title = ''
-
-        # matplotlib
-        style = settings.plot.get('style')
-        if HAS_STYLE and style:
-            if style == 'xkcd':
-                import matplotlib.pyplot
-                mpl.pyplot.xkcd()
-            else:
-                mpl.style.use(style)
-        self.fig = mpl.figure.Figure()
-        self.axes = []
-        self.axis_1 = self.fig.add_subplot(111)
-        self.axes.append(self.axis_1)
+        super(BasePlot, self).__init__()
+
+        # Index of points plotted in display coordinates, built when first
+        # picked after each draw
+        self._pick_index = None
+        # Blitted artists drawn over rendered figure, except when saving
+        self._background = None
+        self._printing = False
+        self._highlighted = set()
+        self._highlight = Line2D([], [], transform=IdentityTransform(),
+                                 animated=True, ls='', marker='o', ms=14,
+                                 mfc='none', mec='k', mew=2)
+        self._crosshair = [
+            Line2D([], [], transform=IdentityTransform(), animated=True,
+                   visible=False, color='0.5', lw=1, ls='--')
+            for _ in range(2)
+        ]
+        for artist in self._animated:
+            artist.set_figure(self.fig)
 
         FigureCanvas.__init__(self, self.fig)
 
         self.setAutoFillBackground(False)
         self.fig.tight_layout()
 
-    def plot(self):
-        raise NotImplementedError('Subclass must implement `plot`')
+        self.mpl_connect('draw_event', self._on_draw)
+        self.mpl_connect('motion_notify_event', self._on_motion)
+        self.mpl_connect('figure_leave_event', self._on_leave)
+
+    @property
+    def _animated(self):
+        return [self._highlight] + self._crosshair
+
+    def highlight(self, images):
+        """ Highlight observations of images, replacing previous highlights
+
+        Args:
+            images (iterable): tuples of (index of Series, index of image) to
+                highlight
+
+        """
+        self._highlighted = set(images)
+        self._update_highlight()
+        self._blit()
+
+    def pick(self, x, y, tolerance):
+        """ Return observations plotted near a position
+
+        Args:
+            x (float): X position in display coordinates
+            y (float): Y position in display coordinates
+            tolerance (float): maximum distance from position in display
+                coordinates (i.e., pixels)
+
+        Returns:
+            set: tuples of (index of Series, index of image) plotted within
+                `tolerance` of (x, y)
+
+        """
+        if self._pick_index is None:
+            xy, series, images = [np.empty((0, 2))], [], []
+            for axis, _series, index, _x, _y in self._points:
+                xy.append(axis.transData.transform(np.column_stack((_x, _y))))
+                series.append(np.repeat(_series, index.size))
+                images.append(index)
+            self._pick_series = np.concatenate(series or [[]]).astype(int)
+            self._pick_images = np.concatenate(images or [[]]).astype(int)
+            self._pick_index = PickIndex(np.concatenate(xy))
+
+        found = self._pick_index.query(x, y, tolerance)
+        return set(zip(self._pick_series[found].tolist(),
+                       self._pick_images[found].tolist()))
+
+    def _update_highlight(self):
+        """ Find display coordinates of highlighted observations
+        """
+        xy = [np.empty((0, 2))]
+        for axis, series, index, x, y in self._points:
+            images = [i for s, i in self._highlighted if s == series]
+            if not images:
+                continue
+            sel = np.in1d(index, images)
+            if sel.any():
+                xy.append(axis.transData.transform(
+                    np.column_stack((x[sel], y[sel]))))
+        xy = np.concatenate(xy)
+        self._highlight.set_data(xy[:, 0], xy[:, 1])
+
+    def _draw_animated(self):
+        for artist in self._animated:
+            self.fig.draw_artist(artist)
+
+    def _blit(self):
+        """ Draw animated artists over the saved background of the figure
+        """
+        if self._background is None or not self.isVisible():
+            return
+        self.restore_region(self._background)
+        self._draw_animated()
+        self.blit(self.fig.bbox)
+
+    def print_figure(self, *args, **kwargs):
+        """ Save figure, without highlights or crosshair
+        """
+        self._printing = True
+        try:
+            return FigureCanvas.print_figure(self, *args, **kwargs)
+        finally:
+            self._printing = False
+
+    def _on_draw(self, event):
+        """ Save rendered figure and draw animated artists over it
+        """
+        if self._printing:
+            return
+        # Display coordinates of points may have changed
+        self._pick_index = None
+        self._update_highlight()
+        self._background = self.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _on_motion(self, event):
+        """ Move crosshair to mouse position within axes
+        """
+        if event.inaxes not in self.axes:
+            self._on_leave(event)
+            return
+        bbox = event.inaxes.bbox
+        vline, hline = self._crosshair
+        vline.set_data([event.x, event.x], [bbox.y0, bbox.y1])
+        hline.set_data([bbox.x0, bbox.x1], [event.y, event.y])
+        vline.set_visible(True)
+        hline.set_visible(True)
+        self._blit()
+
+    def _on_leave(self, event):
+        """ Hide crosshair
+        """
+        if self._crosshair[0].get_visible():
+            for line in self._crosshair:
+                line.set_visible(False)
+            self._blit()
+
+    def _begin_plot(self):
+        """ Prepare to update artists, forgetting points picked
+        """
+        super(BasePlot, self)._begin_plot()
+        self._pick_index = None
 
-    def update_plot(self):
-        raise NotImplementedError('Subclass must implement `update_plot`')
+    def _draw(self):
+        """ Render figure on canvas
+        """
+        self.draw()
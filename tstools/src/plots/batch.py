@@ -0,0 +1,259 @@
+""" Render plots of many pixels without the GUI
+
+Figures of the time series, DOY, and residual plots are drawn by the same
+classes as the plots shown within TSTools (see `BaseFigure`), but on
+non-interactive Agg canvases instead of Qt widgets, so neither Qt nor QGIS
+are imported. For each point, data are fetched and results calculated by the
+current time series driver as when clicking the map, and the figures of every
+plot requested are saved, using the current plot settings and symbology.
+
+Points are distributed across a pool of processes in batches of up to
+:data:`POINTS_PER_BATCH` points. Data of all points of a batch are read at
+once by the driver's `prefetch_data` before each point is fetched. Each
+process opens its own time series driver, of the same class, location,
+configuration, and controls as the current driver, and creates its own
+figures, which are reused for every point it renders. The driver shown in the
+GUI is never used to render points.
+"""
+import logging
+import multiprocessing
+import os
+import time
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
+
+from .figure_doy import DOYFigure
+from .figure_residuals import ResidualFigure
+from .figure_ts import TSFigure
+from .. import settings
+from ..ts_driver.ts_manager import tsm
+from ..ts_driver.ts_utils import get_process_pool
+from ..utils import scale
+
+logger = logging.getLogger('tstools')
+
+#: dict: figures that can be rendered, by name
+FIGURES = {
+    'ts': TSFigure,
+    'doy': DOYFigure,
+    'residual': ResidualFigure
+}
+#: str: pattern of filenames of figures, given index of point (``i``), name
+#: of plot (``plot``), and format (``fmt``)
+FILENAME_PATTERN = 'point{i:04d}_{plot}.{fmt}'
+#: int: maximum number of points whose data are read at once
+POINTS_PER_BATCH = 16
+#: tuple: names of plot settings copied to processes rendering figures
+PLOT_SETTINGS = ('plot', 'plot_series', 'plot_band_indices', 'plot_bands',
+                 'plot_symbol')
+
+# Figures of current process, by name
+_figures = {}
+
+
+def init_figures(names, figsize=(10, 6)):
+    """ Create figures rendered by the current process
+
+    Args:
+        names (list[str]): names of figures in :data:`FIGURES`
+        figsize (tuple): width and height of figures in inches
+            (default: (10, 6))
+
+    """
+    global _figures
+    _figures = {}
+    for name in names:
+        figure = FIGURES[name]()
+        FigureCanvasAgg(figure.fig)
+        figure.fig.set_size_inches(figsize)
+        _figures[name] = figure
+
+
+def init_worker(driver, location, config, controls, plot_settings, names,
+                figsize=(10, 6)):
+    """ Open a time series driver and create figures within a process
+
+    The driver opened becomes the current driver of the process, which the
+    figures plot.
+
+    Args:
+        driver (type): class of time series driver
+        location (str): location of time series
+        config (OrderedDict): configuration of driver
+        controls (OrderedDict): controls of driver
+        plot_settings (dict): values of :data:`PLOT_SETTINGS`
+        names (list[str]): names of figures in :data:`FIGURES`
+        figsize (tuple): width and height of figures in inches
+            (default: (10, 6))
+
+    """
+    # Configuration is read when opening driver, and may not be the default
+    # within processes that are not forked
+    driver.config = config
+    ts = driver(location)
+    ts.controls = controls
+    tsm.ts = ts
+
+    for name, value in plot_settings.items():
+        setattr(settings, name, value)
+    init_figures(names, figsize=figsize)
+
+
+def render_point(job):
+    """ Fetch data and results for a point and save its figures
+
+    Args:
+        job (tuple): index of point, X and Y coordinates, CRS of coordinates
+            as WKT, list of tuples of the name and filename of each figure,
+            and resolution of figures in dots per inch
+
+    Returns:
+        tuple: index of point and number of figures saved
+
+    """
+    i, x, y, crs_wkt, filenames, dpi = job
+    ts = tsm.ts
+
+    try:
+        for _ in ts.fetch_data(x, y, crs_wkt):
+            pass
+    except Exception as e:
+        logger.error('Could not fetch data for point {i} ({x}, {y}): {e}'
+                     .format(i=i, x=x, y=y, e=e))
+        return i, 0
+    try:
+        result = ts.fetch_results()
+    except Exception:
+        logger.exception('Could not fetch results for point {i}'.format(i=i))
+        result = None
+    ts.set_results(result)
+
+    # Apply plot settings as `Controller.update_plot`
+    if not np.array_equal(ts.mask_values, settings.plot['mask_val']):
+        ts.update_mask(settings.plot['mask_val'])
+    for axis in (0, 1):
+        if settings.plot['y_axis_scale_auto'][axis]:
+            scale.calculate_scale(axis)
+
+    n = 0
+    for name, filename in filenames:
+        try:
+            figure = _figures[name]
+            figure.plot()
+            figure.fig.savefig(filename, dpi=dpi)
+        except Exception:
+            logger.exception('Could not render {p} of point {i}'.format(
+                p=name, i=i))
+        else:
+            n += 1
+    return i, n
+
+
+def render_batch(jobs):
+    """ Read data of a batch of points at once and save their figures
+
+    Args:
+        jobs (list[tuple]): jobs of :func:`render_point` of points sharing a
+            CRS
+
+    Returns:
+        tuple: number of points and number of figures saved
+
+    """
+    ts = tsm.ts
+    points = [(x, y) for _, x, y, _, _, _ in jobs]
+    try:
+        ts.prefetch_data(points, jobs[0][3])
+    except Exception:
+        logger.exception('Could not read data of points {i} to {j} at '
+                         'once'.format(i=jobs[0][0], j=jobs[-1][0]))
+
+    n = 0
+    for job in jobs:
+        n += render_point(job)[1]
+    return len(jobs), n
+
+
+def render_points(points, crs_wkt, output, plots=('ts', 'doy', 'residual'),
+                  fmt='png', processes=None, dpi=100, figsize=(10, 6)):
+    """ Render and save figures of plots for many points
+
+    Figures are saved into `output` named using :data:`FILENAME_PATTERN`.
+    The number of figures rendered per second is logged once done.
+
+    Note:
+        Processes are started using :mod:`multiprocessing` (see
+        :func:`ts_utils.get_process_pool`), which may not work within QGIS
+        on some platforms. Figures are rendered within other processes even
+        if ``processes=1``, so the current time series driver and plot
+        settings are not changed.
+
+    Args:
+        points (list[tuple]): X and Y coordinates of points
+        crs_wkt (str): CRS of coordinates as WKT
+        output (str): folder to save figures
+        plots (iterable): names of plots in :data:`FIGURES` to render
+            (default: all)
+        fmt (str): format of figures, such as "png" or "pdf"
+            (default: "png")
+        processes (int): number of processes, or None to use the number
+            of CPUs (default: None)
+        dpi (int): resolution of figures in dots per inch (default: 100)
+        figsize (tuple): width and height of figures in inches
+            (default: (10, 6))
+
+    Yields:
+        float: percent of points rendered
+
+    Raises:
+        KeyError: if `plots` contains plots that cannot be rendered
+        ValueError: if no time series driver is open
+
+    """
+    plots = list(plots)
+    unknown = set(plots) - set(FIGURES)
+    if unknown:
+        raise KeyError('Cannot render plots: {}'.format(
+            ', '.join(sorted(unknown))))
+    if tsm.ts is None:
+        raise ValueError('Cannot render plots without a time series driver')
+
+    if not os.path.isdir(output):
+        os.makedirs(output)
+
+    jobs = []
+    for i, (x, y) in enumerate(points):
+        filenames = [(name, os.path.join(output, FILENAME_PATTERN.format(
+            i=i, plot=name, fmt=fmt))) for name in plots]
+        jobs.append((i, x, y, crs_wkt, filenames, dpi))
+
+    ts = tsm.ts
+    plot_settings = dict((name, getattr(settings, name))
+                         for name in PLOT_SETTINGS)
+    initargs = (type(ts), ts.location, ts.config, ts.controls,
+                plot_settings, plots, figsize)
+
+    start = time.time()
+    n_done, n_figures = 0, 0
+    processes = min(processes or multiprocessing.cpu_count(),
+                    max(len(jobs), 1))
+    # Batches small enough to keep every process busy
+    size = min(POINTS_PER_BATCH,
+               max(int(np.ceil(len(jobs) / float(processes))), 1))
+    batches = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+    pool = get_process_pool(processes, init_worker, initargs)
+    try:
+        for n_points, n in pool.imap_unordered(render_batch, batches):
+            n_done += n_points
+            n_figures += n
+            yield n_done * 100.0 / len(jobs)
+    finally:
+        pool.terminate()
+        pool.join()
+
+    elapsed = time.time() - start
+    logger.info('Rendered {n} figures of {p} points to {o} in {t:.1f}s '
+                '({r:.2f} figures/sec)'.format(
+                    n=n_figures, p=len(jobs), o=output, t=elapsed,
+                    r=n_figures / max(elapsed, 1e-6)))
@@ -0,0 +1,148 @@
+""" Figure of model residuals for timeseries that have predictions
+"""
+import datetime as dt
+import logging
+
+import numpy as np
+
+from . import base_figure
+from .. import settings
+from ..ts_driver.ts_manager import tsm
+
+logger = logging.getLogger('tstools')
+
+
+class ResidualFigure(base_figure.BaseFigure):
+    """ Plot timeseries residuals residuals ~ date for drivers with predictions
+    """
+    plot_name = 'ResidualPlot'
+
+    def __str__(self):
+        return "Residual Plot"
+
+    def __init__(self):
+        super(ResidualFigure, self).__init__()
+        # Add second axis
+        self.axis_2 = self.axis_1.twinx()
+        self.axis_2.xaxis.set_visible(False)
+        self.axes.append(self.axis_2)
+
+        # Add 0 line
+        self.axis_1.axhline(y=0, xmin=0, xmax=1, c='k')
+        self.axis_2.axhline(y=0, xmin=0, xmax=1, c='k')
+
+    def reset(self):
+        """ Resets variables pertinent to making a plot
+
+        Useful for reconfiguring existing plot object for new timeseries
+        """
+        # Nothing to do
+        pass
+
+    def _plot_series(self, axis, idx, series, band):
+        """ Plot a residuals from a timeseries ts_driver
+
+        Args:
+            axis (mpl.axes.Axes): axis to plot
+            idx (int): index of all available plotting bands
+            series (int): index of series within timeseries driver
+            band (int): index of band within series within timeseries driver
+
+        """
+        logger.debug('Plotting Residual plot series')
+        i_axis = self.axes.index(axis)
+        # Get residuals for all segments, indexed by image
+        residuals = tsm.ts.get_residual_arrays(series, band)
+        if residuals is None:
+            return
+        resid_index, resid_values = residuals
+        images = tsm.ts.series[series].images
+        resid_dates = images['date'][resid_index]
+        resid_ordinal = images['ordinal'][resid_index]
+
+        # Iterate over symbology descriptions
+        for i_sym, (index, marker, color) in enumerate(zip(
+                settings.plot_symbol[idx]['indices'],
+                settings.plot_symbol[idx]['markers'],
+                settings.plot_symbol[idx]['colors'])):
+            if index.size == 0:
+                continue
+
+            color = [c / 255.0 for c in color]
+
+            # Find residuals inside this symbology description
+            idx = np.in1d(resid_index, index)
+            if not idx.any():
+                continue
+
+            self._register_points(axis, series, resid_index[idx],
+                                  resid_dates[idx], resid_values[idx])
+            self._plot_line(axis, ('data', i_axis, series, band, i_sym),
+                            resid_dates[idx], resid_values[idx],
+                            marker=marker, color=color, markeredgecolor=color,
+                            ls='', picker=settings.plot['picker_tol'])
+
+        if settings.plot['break']:
+            breaks = tsm.ts.get_breaks(series, band)
+            if breaks is not None:
+                bx, by = [], []
+                for _bx in breaks[0]:
+                    # Residuals are sorted by date, and masked breaks skipped
+                    idx = np.searchsorted(resid_ordinal, _bx.toordinal())
+                    if (idx == resid_ordinal.size or
+                            resid_ordinal[idx] != _bx.toordinal()):
+                        continue
+                    bx.append(_bx)
+                    by.append(resid_values[idx])
+                if bx:
+                    self._plot_line(axis, ('break', i_axis, series, band),
+                                    bx, by,
+                                    marker='o', color='r', ls='',
+                                    mec='r', mfc='none', ms=10, mew=5)
+
+        if settings.plot['custom']:
+            try:
+                self._plot_custom(axis, series, band)
+            except Exception as e:
+                logger.error('Could not plot TS driver customized plot info: '
+                             '%s' % e.message)
+
+    def plot(self):
+        """ Plot residuals
+        """
+        logger.debug('Plotting Residual plot')
+        # Reuse artists instead of clearing
+        self._begin_plot()
+
+        self.axis_1.set_title(tsm.ts.pixel_pos if tsm.ts else '')
+        self.axis_1.set_xlabel('Date')
+        self.axis_1.set_ylabel(r'Residuals ($y - \hat{y}$)')
+
+        self.axis_1.set_xlim(dt.date(settings.plot['x_min'], 1, 1),
+                             dt.date(settings.plot['x_max'], 12, 31))
+
+        # Plot -- axis 1
+        if not tsm.ts or not tsm.ts.has_results:
+            logger.debug('Not plotting residuals -- driver has no results')
+            self._end_plot(autoscale=True)
+            return
+
+        added = np.where(settings.plot['y_axis_1_band'])[0]
+        if added.size > 0:
+            for _added in added:
+                _series = settings.plot_series[_added]
+                _band = settings.plot_band_indices[_added]
+
+                self._plot_series(self.axis_1, _added, _series, _band)
+
+        added = np.where(settings.plot['y_axis_2_band'])[0]
+        if added.size > 0:
+            for _added in added:
+                _series = settings.plot_series[_added]
+                _band = settings.plot_band_indices[_added]
+
+                self._plot_series(self.axis_2, _added, _series, _band)
+
+        # Redraw, scaling residuals automatically
+        self._end_plot(autoscale=True)
+        logger.debug('Done plotting Residual plot')
@@ -0,0 +1,149 @@
+""" Figure of the timeseries plot, drawn on any canvas
+
+Plot of timeseries over all available years
+"""
+import datetime as dt
+import logging
+
+import numpy as np
+
+from . import base_figure
+from .. import settings
+from ..ts_driver.ts_manager import tsm
+
+logger = logging.getLogger('tstools')
+
+class TSFigure(base_figure.BaseFigure):
+    """ Plot timeseries data Y ~ date
+    """
+    plot_name = 'TSPlot'
+
+    def __str__(self):
+        return "Timeseries Plot"
+
+    def __init__(self):
+        super(TSFigure, self).__init__()
+
+        # Add second axis
+        self.axis_2 = self.axis_1.twinx()
+        self.axis_2.xaxis.set_visible(False)
+        self.axes.append(self.axis_2)
+
+    def reset(self):
+        """ Resets variables pertinent to making a plot
+
+        Useful for reconfiguring existing plot object for new timeseries
+        """
+        # Nothing to do
+        pass
+
+    def _plot_series(self, axis, idx, series, band):
+        """ Plot a timeseries from a timeseries ts_driver
+
+        Args:
+            axis (mpl.axes.Axes): axis to plot
+            idx (int): index of all available plotting bands
+            series (int): index of series within timeseries driver
+            band (int): index of band within series within timeseries driver
+
+        """
+        logger.debug('Plotting TS plot series')
+        i_axis = self.axes.index(axis)
+        # Iterate over symbology descriptions
+        for i_sym, (index, marker, color) in enumerate(zip(
+                settings.plot_symbol[idx]['indices'],
+                settings.plot_symbol[idx]['markers'],
+                settings.plot_symbol[idx]['colors'])):
+            # Any points falling into this category?
+            if index.size == 0:
+                continue
+            X, y = tsm.ts.get_data(series, band,
+                                   mask=settings.plot['mask'],
+                                   indices=index)
+
+            self._register_points(axis, series,
+                                  self._image_index(series, index),
+                                  X['date'], y)
+
+            color = [c / 255.0 for c in color]
+            self._plot_line(axis, ('data', i_axis, series, band, i_sym),
+                            X['date'], y,
+                            marker=marker, color=color, markeredgecolor=color,
+                            ls='',
+                            picker=settings.plot['picker_tol'])
+
+        if settings.plot['fit']:
+            predict = tsm.ts.get_prediction(series, band)
+            if predict is not None:
+                px, py = predict[0], predict[1]
+                for i_seg, (_px, _py) in enumerate(zip(px, py)):
+                    self._plot_line(axis, ('fit', i_axis, series, band, i_seg),
+                                    _px, _py, linewidth=2,
+                                    color=self._next_color(axis))
+
+        if settings.plot['break']:
+            breaks = tsm.ts.get_breaks(series, band)
+            if breaks is not None and len(breaks[0]):
+                bx, by = breaks[0], breaks[1]
+                self._plot_line(axis, ('break', i_axis, series, band),
+                                list(bx), list(by),
+                                marker='o', color='r', ls='',
+                                mec='r', mfc='none', ms=10, mew=5)
+
+        if settings.plot['custom']:
+            try:
+                self._plot_custom(axis, series, band)
+            except Exception as e:
+                logger.error('Could not plot TS driver customized plot info: '
+                             '%s' % e.message)
+
+    def plot(self):
+        """ Matplotlib plot of time series
+        """
+        logger.debug('Plotting TS plot')
+        # Reuse artists instead of clearing
+        self._begin_plot()
+
+        # Setup axes
+        self.axis_1.set_title(tsm.ts.pixel_pos if tsm.ts else '')
+        self.axis_1.set_xlabel('Date')
+        self.axis_1.set_ylabel('Value')  # TODO
+
+        self.axis_1.set_xlim(dt.date(settings.plot['x_min'], 1, 1),
+                             dt.date(settings.plot['x_max'], 12, 31))
+
+        self.axis_1.set_ylim(settings.plot['y_min'][0],
+                             settings.plot['y_max'][0])
+        self.axis_2.set_ylim(settings.plot['y_min'][1],
+                             settings.plot['y_max'][1])
+
+        # Put axis_2 y-ticks on same grid as axis_1
+        # self.axis_1.set_yticks(np.linspace(self.axis_1.get_ybound()[0],
+        #                                    self.axis_1.get_ybound()[1], 6))
+        # self.axis_2.set_yticks(np.linspace(self.axis_2.get_ybound()[0],
+        #                                    self.axis_2.get_ybound()[1], 6))
+        self.axis_2.grid('off')
+
+        # Plot -- axis 1
+        added = np.where(settings.plot['y_axis_1_band'])[0]
+        if added.size > 0:
+            for _added in added:
+                _series = settings.plot_series[_added]
+                _band = settings.plot_band_indices[_added]
+
+                self._plot_series(self.axis_1, _added, _series, _band)
+
+        added = np.where(settings.plot['y_axis_2_band'])[0]
+        if added.size > 0:
+            for _added in added:
+                _series = settings.plot_series[_added]
+                _band = settings.plot_band_indices[_added]
+
+                self._plot_series(self.axis_2, _added, _series, _band)
+
+        # Redraw
+        self._end_plot()
+        logger.debug('Done plotting TS plot')
+
+    def disconnect(self):
+        pass
@@ -0,0 +1,91 @@
+""" Spatial index of plotted points for picking points near a position
+
+Points are indexed in display coordinates once for each draw of a plot, so
+finding the points clicked is a radius query instead of a search of every
+point plotted.
+"""
+import numpy as np
+HAS_SCIPY = True
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    HAS_SCIPY = False
+
+
+class PickIndex(object):
+    """ Index of points for finding those within a radius of a position
+
+    Uses `scipy.spatial.cKDTree` if available. Otherwise points are binned
+    into a grid of square cells, sorted by cell, and only points within
+    cells overlapping the radius are compared.
+
+    Args:
+        xy (np.ndarray): positions of points (n x 2)
+        cell_size (float): size of grid cells, used if `scipy` is not
+            available (default: 10)
+
+    """
+    def __init__(self, xy, cell_size=10.0):
+        xy = np.asarray(xy, dtype=np.float).reshape(-1, 2)
+        # Points that cannot be drawn cannot be picked
+        self._valid = np.where(np.isfinite(xy).all(axis=1))[0]
+        self.xy = xy[self._valid]
+        self.cell_size = float(cell_size)
+
+        self._tree = None
+        if HAS_SCIPY:
+            if self.xy.size:
+                self._tree = cKDTree(self.xy)
+        else:
+            keys = self._keys(np.floor(self.xy / self.cell_size))
+            self._order = np.argsort(keys, kind='mergesort')
+            self._cells, self._starts = np.unique(keys[self._order],
+                                                  return_index=True)
+            self._starts = np.append(self._starts, keys.size)
+
+    @staticmethod
+    def _keys(cells):
+        """ Return one integer key for each cell column and row
+        """
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        return cells[:, 0] * (2 ** 32) + cells[:, 1]
+
+    def query(self, x, y, radius):
+        """ Return indices of points within a radius of a position
+
+        Args:
+            x (float): X position
+            y (float): Y position
+            radius (float): maximum distance from position
+
+        Returns:
+            np.ndarray: sorted indices of points within `radius` of (x, y)
+
+        """
+        if self.xy.size == 0:
+            return np.zeros(0, dtype=np.intp)
+
+        if self._tree is not None:
+            found = np.asarray(self._tree.query_ball_point((x, y), radius),
+                               dtype=np.intp)
+        else:
+            c = self.cell_size
+            cx = np.arange(np.floor((x - radius) / c),
+                           np.floor((x + radius) / c) + 1)
+            cy = np.arange(np.floor((y - radius) / c),
+                           np.floor((y + radius) / c) + 1)
+            keys = self._keys(np.array([(i, j) for i in cx for j in cy]))
+
+            i = np.searchsorted(self._cells, keys)
+            inside = i < self._cells.size
+            i, keys = i[inside], keys[inside]
+            i = i[self._cells[i] == keys]
+            if i.size == 0:
+                return np.zeros(0, dtype=np.intp)
+            found = np.concatenate([
+                self._order[self._starts[_i]:self._starts[_i + 1]]
+                for _i in i])
+            dist = np.hypot(self.xy[found, 0] - x, self.xy[found, 1] - y)
+            found = found[dist <= radius]
+
+        return np.sort(self._valid[found])
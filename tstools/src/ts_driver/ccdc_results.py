@@ -0,0 +1,380 @@
+""" Readers for CCDC results saved as MATLAB files
+
+CCDC saves the records of each row of an image into MATLAB files named
+``record_change{row}.mat`` containing a struct array, ``rec_cg``, with a
+``pos`` field giving the 1-indexed position of the pixel of each record
+(``row * width + col + 1``).
+
+Results may be converted once using :func:`convert_results` into a store of
+memory-mapped columns of every record sorted by ``pos``, such that records
+for a pixel are found by binary search. Conversion is run once, e.g. from
+the QGIS Python console, into the folder the CCDC driver reads converted
+results from (``results_index`` within its cache folder).
+
+Until results are converted, rows are found using a map of row to filename
+that is built once, and a number of recently loaded rows are kept in memory.
+Converted results are checked against the modification time of the result of
+each row read, and are reopened when converted again.
+"""
+import json
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+has_scipy = True
+try:
+    import scipy.io as spio
+except:
+    has_scipy = False
+
+from .ts_utils import LRUCache, find_files
+
+logger = logging.getLogger('tstools')
+
+#: int: version of converted results, incremented if format changes
+STORE_VERSION = 1
+#: str: pattern of CCDC result filenames
+RESULT_PATTERN = 'record_change*.mat'
+
+_MANIFEST = 'ccdc_manifest.json'
+_RE_ROW = re.compile(r'record_change(\d+)\.mat$')
+
+_results = {}
+_results_lock = threading.Lock()
+
+
+def get_ccdc_results(folder, store_folder=None, maxsize=4):
+    """ Return reader of CCDC results shared by all drivers for a folder
+
+    Args:
+        folder (str): folder containing CCDC results
+        store_folder (str): folder containing results converted using
+            :func:`convert_results`, or None if not converted
+            (default: None)
+        maxsize (int): number of unconverted rows kept in memory
+            (default: 4)
+
+    Returns:
+        CCDCResults: reader of CCDC results within `folder`
+
+    """
+    key = (os.path.abspath(folder), store_folder)
+    with _results_lock:
+        if key not in _results:
+            _results[key] = CCDCResults(folder, store_folder=store_folder,
+                                        maxsize=maxsize)
+        return _results[key]
+
+
+def find_results(folder):
+    """ Return a mapping of row (1-indexed) to CCDC result filename
+
+    Args:
+        folder (str): folder containing CCDC results
+
+    Returns:
+        dict: filename of result for each row
+
+    """
+    rows = {}
+    for filename in find_files(folder, RESULT_PATTERN):
+        match = _RE_ROW.search(os.path.basename(filename))
+        if match:
+            rows[int(match.group(1))] = filename
+    return rows
+
+
+def load_row(filename):
+    """ Load CCDC records from a result, sorted by position
+
+    Args:
+        filename (str): CCDC result for a row
+
+    Returns:
+        tuple: positions (np.ndarray) and records (np.ndarray) sorted by
+            position
+
+    """
+    rec = np.atleast_1d(spio.loadmat(filename, squeeze_me=True)['rec_cg'])
+    if rec.size == 0 or 'pos' not in (rec.dtype.names or ()):
+        return np.zeros(0, dtype=np.int64), rec[:0]
+
+    pos = rec['pos'].astype(np.int64)
+    order = np.argsort(pos, kind='mergesort')
+    return pos[order], rec[order]
+
+
+def convert_results(folder, store_folder):
+    """ Convert CCDC results into memory-mapped columns sorted by position
+
+    Each field of the `rec_cg` records is written to a file in
+    `store_folder` as a column. Fields that cannot be stored as a regular
+    numeric array are skipped.
+
+    Args:
+        folder (str): folder containing CCDC results
+        store_folder (str): folder to store converted results
+
+    Returns:
+        int: number of records converted
+
+    Raises:
+        ValueError: if records of a row do not match the fields of previous
+            rows, or positions of rows overlap
+
+    """
+    if not os.path.isdir(store_folder):
+        os.makedirs(store_folder)
+    manifest_path = os.path.join(store_folder, _MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    rows = find_results(folder)
+    sources = {}
+    fields, files = None, {}
+    count, last_pos = 0, 0
+
+    try:
+        for row in sorted(rows):
+            filename = rows[row]
+            sources[filename] = os.path.getmtime(filename)
+            pos, rec = load_row(filename)
+            if pos.size == 0:
+                continue
+            if pos[0] <= last_pos:
+                raise ValueError('Positions of records in {} overlap '
+                                 'previous rows'.format(filename))
+            last_pos = pos[-1]
+
+            columns = {'pos': pos}
+            for name in rec.dtype.names:
+                if name == 'pos':
+                    continue
+                try:
+                    column = np.array(list(rec[name]))
+                except ValueError:
+                    continue
+                if column.dtype.kind in 'biuf':
+                    columns[name] = column
+
+            if fields is None:
+                fields = dict((name, (column.dtype.str, column.shape[1:]))
+                              for name, column in columns.items())
+                for name in fields:
+                    files[name] = open(
+                        os.path.join(store_folder, name + '.dat'), 'wb')
+                skipped = set(rec.dtype.names) - set(fields)
+                if skipped:
+                    logger.warning('Not converting irregular CCDC fields: '
+                                   '{}'.format(', '.join(sorted(skipped))))
+
+            for name, (dtype, shape) in fields.items():
+                column = columns.get(name)
+                if column is None or column.shape[1:] != shape:
+                    raise ValueError('Field "{f}" in {fn} does not match '
+                                     'previous rows'.format(f=name,
+                                                            fn=filename))
+                column.astype(dtype).tofile(files[name])
+            count += pos.size
+    finally:
+        for f in files.values():
+            f.close()
+
+    manifest = {
+        'version': STORE_VERSION,
+        'count': count,
+        'fields': dict((name, [dtype, list(shape)])
+                       for name, (dtype, shape) in (fields or {}).items()),
+        'sources': sources
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    logger.info('Converted {n} CCDC records from {r} rows'.format(
+        n=count, r=len(rows)))
+    return count
+
+
+class CCDCResultsStore(object):
+    """ CCDC results converted into memory-mapped columns sorted by position
+
+    Args:
+        store_folder (str): folder containing converted results
+        manifest (dict): description of converted results
+        mtime (float): modification time of manifest when opened
+
+    """
+    def __init__(self, store_folder, manifest, mtime):
+        count = manifest['count']
+        self.mtime = mtime
+        self.sources = dict((os.path.abspath(filename), _mtime)
+                            for filename, _mtime
+                            in manifest['sources'].items())
+        self.fields = manifest['fields']
+        self.columns = {}
+        for name, (dtype, shape) in self.fields.items():
+            if count == 0:
+                self.columns[name] = np.zeros((0, ) + tuple(shape),
+                                              dtype=dtype)
+                continue
+            self.columns[name] = np.memmap(
+                os.path.join(store_folder, name + '.dat'),
+                dtype=dtype, mode='r', shape=(count, ) + tuple(shape))
+        self.dtype = np.dtype([(str(name), dtype, tuple(shape))
+                               for name, (dtype, shape)
+                               in sorted(self.fields.items())])
+
+    @classmethod
+    def open(cls, store_folder):
+        """ Open converted results if they are current
+
+        Args:
+            store_folder (str): folder containing converted results
+
+        Returns:
+            CCDCResultsStore: converted results, or None if results have not
+                been converted or are out of date
+
+        """
+        manifest_path = os.path.join(store_folder, _MANIFEST)
+        if not os.path.exists(manifest_path):
+            return
+        mtime = os.path.getmtime(manifest_path)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != STORE_VERSION:
+            return
+        store = cls(store_folder, manifest, mtime)
+        for filename in store.sources:
+            if not store.is_current(filename):
+                logger.warning('Converted CCDC results in {} are out of date'
+                               .format(store_folder))
+                return
+        return store
+
+    def is_current(self, filename):
+        """ Return if a CCDC result is unchanged since it was converted
+
+        Args:
+            filename (str): CCDC result for a row
+
+        Returns:
+            bool: True if `filename` was converted and has not been modified
+                or removed since
+
+        """
+        try:
+            mtime = os.path.getmtime(filename)
+        except OSError:
+            return False
+        return self.sources.get(os.path.abspath(filename)) == mtime
+
+    def get(self, pos):
+        """ Return records for a position
+
+        Args:
+            pos (int): position of pixel
+
+        Returns:
+            np.ndarray: records for pixel, which may be empty
+
+        """
+        if 'pos' not in self.columns:
+            return np.empty(0, dtype=self.dtype)
+        _pos = self.columns['pos']
+        i = np.searchsorted(_pos, pos, side='left')
+        j = np.searchsorted(_pos, pos, side='right')
+
+        rec = np.empty(j - i, dtype=self.dtype)
+        for name, column in self.columns.items():
+            rec[name] = column[i:j]
+        return rec
+
+
+class CCDCResults(object):
+    """ Reader of CCDC results, converted or not
+
+    Args:
+        folder (str): folder containing CCDC results
+        store_folder (str): folder containing results converted using
+            :func:`convert_results`, or None if not converted
+            (default: None)
+        maxsize (int): number of unconverted rows kept in memory
+            (default: 4)
+
+    """
+    def __init__(self, folder, store_folder=None, maxsize=4):
+        self.folder = folder
+        self.store_folder = store_folder
+        self._store = None
+        self._store_mtime = None
+        self._rows = None
+        self._rows_mtime = None
+        self._loaded = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, row, pos):
+        """ Return CCDC records for a pixel
+
+        Args:
+            row (int): row of pixel (1-indexed, as in result filenames)
+            pos (int): position of pixel
+
+        Returns:
+            np.ndarray: records for pixel, or None if there is no result for
+                the row
+
+        """
+        with self._lock:
+            filename = self._find_row(row)
+            store = self._open_store()
+            if store is not None and filename is not None:
+                if store.is_current(filename):
+                    return store.get(pos)
+                logger.warning('Converted CCDC results in {} are out of date'
+                               .format(self.store_folder))
+                self._store = None
+
+            if filename is None:
+                return
+            mtime = os.path.getmtime(filename)
+            loaded = self._loaded.get(filename)
+            if loaded is None or loaded[0] != mtime:
+                loaded = (mtime, ) + load_row(filename)
+                self._loaded.set(filename, loaded)
+
+        _, _pos, rec = loaded
+        i = np.searchsorted(_pos, pos, side='left')
+        j = np.searchsorted(_pos, pos, side='right')
+        return rec[i:j]
+
+    def _open_store(self):
+        """ Return converted results, opening them once they exist and again
+        when they are converted again
+        """
+        if not self.store_folder:
+            return
+        try:
+            mtime = os.path.getmtime(os.path.join(self.store_folder,
+                                                  _MANIFEST))
+        except OSError:
+            mtime = None
+        if mtime != self._store_mtime:
+            self._store_mtime = mtime
+            self._store = (CCDCResultsStore.open(self.store_folder)
+                           if mtime is not None else None)
+        return self._store
+
+    def _find_row(self, row):
+        """ Return filename of result for a row, rebuilding map if needed
+        """
+        if not os.path.isdir(self.folder):
+            return
+        mtime = os.path.getmtime(self.folder)
+        if self._rows is None or (row not in self._rows and
+                                  mtime != self._rows_mtime):
+            self._rows = find_results(self.folder)
+            self._rows_mtime = mtime
+        return self._rows.get(row)
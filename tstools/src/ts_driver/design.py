@@ -0,0 +1,120 @@
+""" Cached construction of `patsy` design matrices
+
+Parsing a `patsy` formula is much more expensive than evaluating it, so
+formulas are compiled once into a `patsy.DesignInfo` and reused to build
+design matrices for any data using `patsy.build_design_matrices`.
+"""
+import logging
+import re
+
+import numpy as np
+import patsy
+
+from .ts_utils import LRUCache
+
+logger = logging.getLogger('tstools')
+
+# Compiled designs, by formula
+_design_infos = {}
+# Full design matrices, by formula and description of data
+_design_matrices = LRUCache(maxsize=8)
+# Columns of non-categorical coefficients, by design information
+_coef_columns = {}
+
+_RE_CATEGORICAL_TERM = re.compile(r'[\+\-][\ ]+C\(.*\)')
+_RE_CATEGORICAL_NAME = re.compile(r'C\(.*\)')
+
+
+def strip_categorical(design):
+    """ Return a design formula without any categorical terms
+
+    Args:
+        design (str): `patsy` design formula (e.g., "1 + x + C(sensor)")
+
+    Returns:
+        str: design formula without categorical terms (e.g., "1 + x")
+
+    """
+    return _RE_CATEGORICAL_TERM.sub('', design)
+
+
+def compile_design(design, data):
+    """ Return a compiled `patsy.DesignInfo` for a design formula
+
+    Note:
+        A formula is only compiled, using `data`, the first time it is seen.
+        Variables in `data` should therefore not change the meaning of the
+        design (e.g., levels of categorical variables).
+
+    Args:
+        design (str): `patsy` design formula
+        data (dict): variables referenced in `design`, used to compile
+            `design` the first time it is seen
+
+    Returns:
+        patsy.DesignInfo: compiled design
+
+    """
+    design_info = _design_infos.get(design)
+    if design_info is None:
+        logger.debug('Compiling design: {0}'.format(design))
+        design_info = patsy.dmatrix(design, data).design_info
+        _design_infos[design] = design_info
+    return design_info
+
+
+def build_design(design_info, data):
+    """ Build a design matrix from a compiled design
+
+    Args:
+        design_info (patsy.DesignInfo): compiled design
+        data (dict): variables referenced in design
+
+    Returns:
+        np.ndarray: design matrix (n x p)
+
+    """
+    return np.asarray(patsy.build_design_matrices([design_info], data)[0])
+
+
+def design_matrix(design, data, key):
+    """ Return full design matrix for some data, cached by `(design, key)`
+
+    Args:
+        design (str): `patsy` design formula
+        data (dict): variables referenced in `design`
+        key (hashable): description of `data` (e.g., a hash of the images
+            within a Series)
+
+    Returns:
+        patsy.DesignMatrix: read-only design matrix
+
+    """
+    X = _design_matrices.get((design, key))
+    if X is None:
+        logger.debug('Building design matrix: {0}'.format(design))
+        X = patsy.dmatrix(design, data)
+        X.flags.writeable = False
+        _design_matrices.set((design, key), X)
+    return X
+
+
+def coef_columns(design_info):
+    """ Return sorted indices of non-categorical design columns
+
+    Args:
+        design_info (dict): design column names mapped to column indices
+
+    Returns:
+        np.ndarray: sorted indices of columns that are not categorical
+
+    """
+    key = tuple(sorted(design_info.items()))
+    columns = _coef_columns.get(key)
+    if columns is None:
+        columns = np.sort(np.asarray(
+            [v for k, v in design_info.items()
+             if not _RE_CATEGORICAL_NAME.match(k)]))
+        columns.flags.writeable = False
+        _coef_columns[key] = columns
+    return columns
@@ -0,0 +1,172 @@
+""" Persisted index of NetCDF files used by the AGDC driver
+
+Opening every NetCDF file of an archive to find its variables, timestamps,
+and geotransform is slow. Instead, this information is saved into a JSON
+sidecar file next to the data the first time it is needed, and only files
+that are new or have changed since, according to their modification time,
+are opened again.
+"""
+import json
+import logging
+import os
+
+import numpy as np
+
+has_deps = True
+try:
+    import xarray as xr
+except ImportError:
+    has_deps = False
+
+logger = logging.getLogger('tstools')
+
+#: int: version of index, incremented if format changes
+INDEX_VERSION = 1
+#: str: filename of index within driver location
+INDEX_FILENAME = 'tstools_agdc_index.json'
+
+
+def index_file(filename, variables):
+    """ Describe a NetCDF file for the index
+
+    Args:
+        filename (str): NetCDF file
+        variables (list[str]): data variables of interest
+
+    Returns:
+        dict: description of file, including its modification time
+            ("mtime"), timestamps as seconds since the UNIX epoch ("times"),
+            variables found ("variables"), geotransform ("geotransform"),
+            CRS ("crs_wkt"), and size ("width" and "height")
+
+    """
+    ds = xr.open_dataset(filename, decode_cf=True)
+    try:
+        times = (ds['time'].values.astype('datetime64[s]')
+                 .astype(np.int64).tolist())
+        return {
+            'path': filename,
+            'mtime': os.path.getmtime(filename),
+            'times': times,
+            'variables': [v for v in variables if v in ds.data_vars],
+            'geotransform': [float(v) for v in
+                             ds.crs.attrs['GeoTransform']],
+            'crs_wkt': ds.crs.attrs['crs_wkt'],
+            'width': int(ds.longitude.size),
+            'height': int(ds.latitude.size)
+        }
+    finally:
+        ds.close()
+
+
+def build_index(filenames, variables, previous=None):
+    """ Build an index of NetCDF files, reusing unchanged file descriptions
+
+    Args:
+        filenames (list[str]): NetCDF files
+        variables (list[str]): data variables of interest
+        previous (dict): previous index to reuse descriptions of files that
+            have not changed, or None (default: None)
+
+    Returns:
+        dict: index of files, sorted by their first timestamp, with the offset
+            of each file's timestamps within all timestamps ("offset")
+
+    Raises:
+        ValueError: if files do not share the same geotransform, CRS, and
+            size
+
+    """
+    known = {}
+    if previous and previous.get('variables') == list(variables):
+        known = dict((f['path'], f) for f in previous['files'])
+
+    files = []
+    for filename in filenames:
+        described = known.get(filename)
+        if (described is None or
+                described['mtime'] != os.path.getmtime(filename)):
+            logger.debug('Indexing {}'.format(filename))
+            described = index_file(filename, variables)
+        files.append(described)
+    files.sort(key=lambda f: (f['times'][:1], f['path']))
+
+    offset = 0
+    for f in files:
+        f['offset'] = offset
+        offset += len(f['times'])
+
+    index = {
+        'version': INDEX_VERSION,
+        'variables': list(variables),
+        'files': files
+    }
+    if files:
+        for key in ('geotransform', 'crs_wkt', 'width', 'height'):
+            values = set(json.dumps(f[key]) for f in files)
+            if len(values) > 1:
+                raise ValueError('All NetCDF files must have the same '
+                                 '{}'.format(key))
+            index[key] = files[0][key]
+
+    return index
+
+
+def is_current(index, filenames, variables):
+    """ Return True if index describes current versions of all files
+
+    Args:
+        index (dict): index of files
+        filenames (list[str]): NetCDF files
+        variables (list[str]): data variables of interest
+
+    Returns:
+        bool: True if index is current
+
+    """
+    if (index.get('version') != INDEX_VERSION or
+            index.get('variables') != list(variables)):
+        return False
+    mtimes = dict((f['path'], f['mtime']) for f in index['files'])
+    if set(mtimes) != set(filenames):
+        return False
+    return all(os.path.getmtime(f) == mtimes[f] for f in filenames)
+
+
+def open_index(location, filenames, variables):
+    """ Return index of NetCDF files, building or updating it as needed
+
+    Args:
+        location (str): folder containing files, where index is saved
+        filenames (list[str]): NetCDF files
+        variables (list[str]): data variables of interest
+
+    Returns:
+        dict: index of files
+
+    """
+    path = os.path.join(location, INDEX_FILENAME)
+
+    index = None
+    if os.path.isfile(path):
+        try:
+            with open(path) as fid:
+                index = json.load(fid)
+        except (IOError, ValueError) as e:
+            logger.warning('Could not read AGDC index {f}: {e}'.format(
+                f=path, e=e))
+        else:
+            if is_current(index, filenames, variables):
+                return index
+
+    logger.info('Updating index of {n} NetCDF files in {f}'.format(
+        n=len(filenames), f=location))
+    index = build_index(filenames, variables, previous=index)
+    try:
+        with open(path, 'w') as fid:
+            json.dump(index, fid)
+    except IOError as e:
+        logger.warning('Could not save AGDC index {f}: {e}'.format(
+            f=path, e=e))
+
+    return index
@@ -6,9 +6,7 @@ https://github.com/ceholden/tilezilla/blob/master/tilezilla/stores/vrt.py
 """
 from collections import defaultdict
 import os
-import xml.etree.ElementTree as ET
 from xml.etree.ElementTree import ElementTree, Element, SubElement
-from xml.dom import minidom
 
 from osgeo import gdal, gdal_array
 
@@ -59,10 +57,7 @@ class VRT(object):
         Args:
             path (str): Save VRT to this filename
         """
-        xmlstr = (minidom.parseString(ET.tostring(self.root))
-                  .toprettyxml(indent='    '))
-        with open(path, 'w') as fid:
-            fid.write(xmlstr)
+        ElementTree(self.root).write(path)
 
     def _add_crs(self, ds):
         crs = SubElement(self.root, 'SRS')
@@ -1,10 +1,12 @@
 """ Module for AGDCSeries dataset container class
 """
-from collections import defaultdict
 import datetime as dt
+import hashlib
+import json
 import logging
 import os
 import tempfile
+import time
 
 import numpy as np
 from osgeo import gdal
@@ -16,41 +18,39 @@ try:
 except ImportError:
     has_deps = False
 
+from ._index import build_index
 from ._vrt import VRT
+from ...ts_utils import LRUCache
 
 logger = logging.getLogger('tstools')
 
 
-def filter_subdatasets_by_band(files, bands):
-    """ Return a collection of subdatasets per file containing all band SDS
+class AGDCSeries(object):
+    """ A Series of NetCDF files described by an index of the AGDC driver
 
-    This should be replaced by calls to AGDC database
-    """
-    out = defaultdict(list)
-    for f in files:
-        ds = gdal.Open(f)
-        for sds, desc in ds.GetSubDatasets():
-            band_name = sds.split(':')[-1].strip()
-            if band_name in bands:
-                out[band_name].append(sds)
-    return out
-
-
-def collect_bands_across_datasets(datasets, bands):
-    """ Collect references to (dataset, bidx) for all obs for all bands
-    """
-    out = defaultdict(list)
-    for b in bands:
-        for ds in datasets[b]:
-            _ds = gdal.Open(ds)
-            for bidx in range(_ds.RasterCount):
-                _b = _ds.GetRasterBand(bidx + 1)
-                timestamp = int(_b.GetMetadata()['NETCDF_DIM_time'])
-                out[timestamp].append((_ds, bidx + 1))
-    return out
+    Images are VRTs, one per timestamp, pointing at the subdataset of each
+    variable within the NetCDF file of the timestamp. Each NetCDF file is
+    opened on its own when first read, and its timestamps are placed within
+    the data of the Series using their offset from the index, so files are
+    never combined into one dataset. VRTs are only written
+    when an image is first needed (see :meth:`prepare_image`) and are named
+    by a hash of their sources, so they are reused across sessions until
+    their NetCDF file changes.
 
+    Args:
+        filenames (list[str]): NetCDF files
+        ncvars (list[str]): data variables to read as bands
+        chunk_size (int): size of spatial chunks to read (default: 500)
+        index (dict): index of NetCDF files, or None to build one
+            (default: None)
+        vrt_folder (str): folder to write VRTs into, or None to use a folder
+            within the temporary directory (default: None)
+        config (dict): attributes to set on Series (default: None)
+
+    """
+    #: int: version of VRTs written, incremented if their content changes
+    vrt_version = 1
 
-class AGDCSeries(object):
     description = 'Data Cube Time Series'
     images = np.empty(
         0,
@@ -68,62 +68,231 @@ class AGDCSeries(object):
     symbology_hint_indices = [3, 2, 1]
     symbology_hint_minmax = [0, 10000]
 
-    def __init__(self, filenames, ncvars, config=None):
+    def __init__(self, filenames, ncvars, chunk_size=500, index=None,
+                 vrt_folder=None, config=None):
         if config:
             self.__dict__.update(config)
-        self.filenames = filenames
         self.band_names = ncvars
+        self.chunk_size = chunk_size
 
-        # Read in NetCDF4 files as multiple dataset
-        # TODO chunks
-        self.ds = xr.open_mfdataset(
-            filenames,
-            chunks={'latitude': 500, 'longitude': 500},
-            concat_dim='time')
+        # Describe files from index, so they're opened only when needed
+        self.index = index or build_index(filenames, ncvars)
+        self.filenames = [f['path'] for f in self.index['files']]
+        # Datasets of each file, opened when first read
+        self._datasets = {}
+        # Lazily indexed variables for chunks of pixels, by chunk row/column
+        self._chunks = LRUCache(maxsize=16)
 
-        # Create VRTs
-        self._init_vrts()
+        self.vrt_folder = self._init_vrt_folder(vrt_folder)
 
         # Setup series
-        self._init_attributes(self.ds)
+        self._init_attributes()
+
+    def open_file(self, i_file):
+        """ Return dataset of a NetCDF file, opening it when first used
+
+        Args:
+            i_file (int): index of file within index of Series
+
+        Returns:
+            xr.Dataset: dataset of file
+
+        """
+        ds = self._datasets.get(i_file)
+        if ds is None:
+            logger.debug('Opening {}'.format(self.filenames[i_file]))
+            ds = xr.open_dataset(
+                self.filenames[i_file],
+                chunks={'latitude': self.chunk_size,
+                        'longitude': self.chunk_size})
+            self._datasets[i_file] = ds
+        return ds
 
     def fetch_data(self, mx, my, crs_wkt, **kwargs):
         """ Read data for a gixen X/Y coordinate in a given CRS
         """
         pass
 
-    def _init_vrts(self):
-        """ Creates temporary VRTs for use in plugin
+    def read_pixel(self, px, py):
+        """ Read all variables of a pixel, indexed by row and column
+
+        The variables of each file for the chunk of pixels containing the
+        pixel are indexed lazily once and cached, so reading another pixel
+        within the chunk only adds a selection to already built graphs.
+
+        Args:
+            px (int): column of pixel
+            py (int): row of pixel
+
+        Returns:
+            np.ndarray: data for all variables sorted by date
+                (n_variable x n_image)
+
+        Raises:
+            IndexError: raise IndexError if pixel is outside of dataset
+
+        """
+        if px < 0 or py < 0 or px >= self.width or py >= self.height:
+            raise IndexError('Coordinate specific outside of dataset: '
+                             '%i/%i' % (px, py))
+        size = self.chunk_size
+        key = (py // size, px // size)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            window = dict(
+                latitude=slice(key[0] * size, (key[0] + 1) * size),
+                longitude=slice(key[1] * size, (key[1] + 1) * size))
+            chunk = self._select(lambda ds: ds.isel(**window))
+            self._chunks.set(key, chunk)
+
+        return self._read(chunk, lambda da: da.isel(latitude=py % size,
+                                                    longitude=px % size))
+
+    def read_nearest(self, mx, my):
+        """ Read all variables of the pixel nearest a coordinate
+
+        Args:
+            mx (float): map X location, in CRS of Series
+            my (float): map Y location, in CRS of Series
+
+        Returns:
+            np.ndarray: data for all variables sorted by date
+                (n_variable x n_image)
+
+        """
+        selected = self._select(lambda ds: ds.sel(latitude=my, longitude=mx,
+                                                  method='nearest'))
+        return self._read(selected, lambda da: da)
+
+    def _select(self, select):
+        """ Lazily select from the variables of every file
+
+        Args:
+            select (callable): function selecting from a dataset
+
+        Returns:
+            list[tuple]: for each file, slice of its timestamps within data,
+                index of its variables within `band_names`, and the lazily
+                selected variables (xr.DataArray)
+
         """
-        self.tmpdir = tempfile.mkdtemp(prefix='TSTools', suffix='AGDC')
-
-        subdatasets = filter_subdatasets_by_band(self.filenames,
-                                                 self.band_names)
-        sds_bidx = collect_bands_across_datasets(subdatasets,
-                                                 self.band_names)
-        # Iterate over all timestamps, creating VRTs
-        logger.info('Creating VRTs to use with AGDC')
-        for k in sds_bidx:
-            vrt = VRT(*zip(*sds_bidx[k]))
-            vrt.write(os.path.join(self.tmpdir, str(k) + '.vrt'))
-
-    def _init_attributes(self, ds):
-        self.n = ds.time.size
+        selected = []
+        for i_file, f in enumerate(self.index['files']):
+            variables = [v for v in self.band_names if v in f['variables']]
+            if not variables:
+                continue
+            ds = self.open_file(i_file)
+            _slice = slice(f['offset'], f['offset'] + len(f['times']))
+            selected.append((_slice,
+                             [self.band_names.index(v) for v in variables],
+                             select(ds[variables]).to_array()))
+        return selected
+
+    def _read(self, selected, select):
+        """ Read a pixel of lazily selected variables into data sorted by date
+
+        Args:
+            selected (list[tuple]): variables selected from files (see
+                :meth:`_select`)
+            select (callable): function selecting a pixel from a
+                ``xr.DataArray``
+
+        Returns:
+            np.ndarray: data for all variables sorted by date
+                (n_variable x n_image), NaN where a file lacks a variable
+
+        """
+        data = np.full((len(self.band_names), self.n), np.nan)
+        for _slice, i_vars, da in selected:
+            data[np.ix_(i_vars, np.arange(_slice.start, _slice.stop))] = (
+                select(da).transpose('variable', 'time').values)
+        return data[:, self._sort_idx]
+
+    def prepare_image(self, i_image):
+        """ Return path to an image, writing its VRT if it doesn't exist yet
+
+        Args:
+            i_image (int): index of image
+
+        Returns:
+            str: path to VRT of image
+
+        """
+        path = self.images['path'][i_image]
+        if os.path.exists(path):
+            return path
+
+        # Each band of a subdataset is a timestamp within its file
+        f, bidx = self._sources[i_image]
+        datasets = [gdal.Open('NETCDF:"{f}":{v}'.format(f=f['path'], v=var))
+                    for var in self.band_names if var in f['variables']]
+        vrt = VRT(datasets, [bidx + 1] * len(datasets))
+
+        # Write under temporary name so partially written VRTs aren't used
+        tmp_path = '{p}.{pid}.tmp'.format(p=path, pid=os.getpid())
+        vrt.write(tmp_path)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+            if not os.path.exists(path):
+                raise
+        logger.debug('Created VRT {}'.format(path))
+
+        return path
+
+    def _init_vrt_folder(self, vrt_folder):
+        """ Return folder for VRTs, using a temporary one if not writable
+        """
+        tmp_folder = os.path.join(tempfile.gettempdir(), 'TSTools_AGDC_VRT')
+        for folder in (vrt_folder, tmp_folder):
+            if not folder:
+                continue
+            try:
+                if not os.path.isdir(folder):
+                    os.makedirs(folder)
+            except OSError as e:
+                logger.warning('Cannot create VRT folder {f}: {e}'.format(
+                    f=folder, e=e))
+                continue
+            if os.access(folder, os.W_OK):
+                return folder
+        return tempfile.mkdtemp(prefix='TSTools', suffix='AGDC')
+
+    def _vrt_path(self, f, bidx, timestamp):
+        """ Return path of VRT for a timestamp, named by hash of its sources
+        """
+        variables = [v for v in self.band_names if v in f['variables']]
+        key = json.dumps([self.vrt_version, f['path'], f['mtime'],
+                          variables, bidx])
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.vrt_folder,
+                            '{t}_{h}.vrt'.format(t=timestamp, h=digest[:16]))
+
+    def _init_attributes(self):
+        # Timestamps in order of files within dataset, with their source
+        sources = [(f, bidx) for f in self.index['files']
+                   for bidx in range(len(f['times']))]
+        times = np.array([f['times'][bidx] for f, bidx in sources],
+                         dtype=np.int64)
+        self.n = times.size
         if self.n == 0:
             raise Exception('Cannot initialize a Series of 0 images')
-        self.gt = ds.crs.attrs['GeoTransform']
-        self.crs = ds.crs.attrs['crs_wkt']
+        self.gt = self.index['geotransform']
+        self.crs = self.index['crs_wkt']
+        self.width = self.index['width']
+        self.height = self.index['height']
 
         _images = np.empty(self.n, dtype=self.images.dtype)
-        dtime = self.ds['time'].to_index().date
-        for i, (_tstamp, _dtime) in enumerate(zip(self.ds['time'], dtime)):
-            unix_tstamp = _tstamp.data.astype(np.int64) // 10**9
+        for i, unix_tstamp in enumerate(times):
+            _tstamp = np.datetime64(int(unix_tstamp) * 10**9, 'ns')
+            _dtime = dt.datetime.utcfromtimestamp(unix_tstamp).date()
             # TODO: 'filename' is inaccessible w/o API
-            _images[i]['filename'] = str(_tstamp.data)
-            _images[i]['path'] = os.path.join(self.tmpdir,
-                                              str(unix_tstamp) + '.vrt')
+            _images[i]['filename'] = str(_tstamp)
+            _images[i]['path'] = self._vrt_path(sources[i][0], sources[i][1],
+                                                unix_tstamp)
             # TODO: 'id' is inaccessible w/o API
-            _images[i]['id'] = str(_tstamp.data)
+            _images[i]['id'] = str(_tstamp)
             _images[i]['date'] = _dtime
             _images[i]['ordinal'] = _dtime.toordinal()
             _images[i]['doy'] = int(_dtime.strftime('%j'))
@@ -132,3 +301,61 @@ class AGDCSeries(object):
         _images = _images[sort_idx]
 
         self.images = _images.copy()
+        # Data are read in order of dataset, so keep order of images
+        self._sort_idx = sort_idx
+        self._sources = [sources[i] for i in sort_idx]
+        self.data = np.zeros((len(self.band_names), self.n))
+        self.mask = np.ones(self.n, dtype=np.bool)
+        # Index of unmasked images, updated with mask by driver
+        self.mask_index = np.arange(self.n)
+
+
+def benchmark_point_query(series, pixels):
+    """ Time reading pixels by point query and from files opened as one dataset
+
+    Point queries are compared against the reader used before point query
+    mode, which opened all NetCDF files as one dataset using
+    ``xr.open_mfdataset`` and selected the coordinate nearest the center of
+    each pixel. Files already opened by the Series are not opened again.
+
+    Args:
+        series (AGDCSeries): Series to read from
+        pixels (iterable): column and row of pixels to read
+
+    Returns:
+        dict: seconds taken to read all pixels by point query ("point"), to
+            open all files as one dataset ("mfdataset_open"), and to read all
+            pixels from that dataset ("mfdataset")
+
+    """
+    gt = series.gt
+    times = {'point': 0.0, 'mfdataset_open': 0.0, 'mfdataset': 0.0}
+    for px, py in pixels:
+        start = time.time()
+        series.read_pixel(px, py)
+        times['point'] += time.time() - start
+
+    start = time.time()
+    ds = xr.open_mfdataset(series.filenames,
+                           chunks={'latitude': 500, 'longitude': 500},
+                           concat_dim='time')
+    times['mfdataset_open'] = time.time() - start
+    try:
+        for px, py in pixels:
+            # Center of pixel
+            mx = gt[0] + (px + 0.5) * gt[1]
+            my = gt[3] + (py + 0.5) * gt[5]
+            start = time.time()
+            (ds[series.band_names]
+             .sel(latitude=my, longitude=mx, method='nearest')
+             .load().to_array())
+            times['mfdataset'] += time.time() - start
+    finally:
+        ds.close()
+
+    logger.info('Read {n} pixels by point query in {p:.3f}s, and from files '
+                'opened as one dataset in {m:.3f}s after opening them in '
+                '{o:.3f}s'.format(n=len(pixels), p=times['point'],
+                                  m=times['mfdataset'],
+                                  o=times['mfdataset_open']))
+    return times
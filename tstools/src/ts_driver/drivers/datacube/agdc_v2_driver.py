@@ -1,9 +1,11 @@
 """ Driver for AGDC v2
 """
 from collections import OrderedDict
+import os
 
 import numpy as np
 
+from ._index import open_index
 from .agdc_series import AGDCSeries
 from ...ts_utils import ConfigItem, find_files
 from ...timeseries import AbstractTimeSeriesDriver
@@ -37,10 +39,15 @@ class AGDCTimeSeriesDriver(AbstractTimeSeriesDriver):
     location = None
     config = OrderedDict((
         ('nc_pattern', ConfigItem('NetCDF pattern', 'L*.nc')),
-        ('vars', ConfigItem('Data Variables', BANDS))
+        ('vars', ConfigItem('Data Variables', BANDS)),
+        ('point_query', ConfigItem('Point query mode', True)),
+        ('chunk_size', ConfigItem('Spatial chunk size', 32)),
+        ('vrt_folder', ConfigItem('VRT folder', 'vrt')),
+        ('mask_var', ConfigItem('Mask variable', 'cfmask'))
     ))
     series = []
     mask_values = np.array([2, 3, 4, 255])
+    mask_version = 0
     pixel_pos = ''
     has_results = False
 
@@ -51,39 +58,118 @@ class AGDCTimeSeriesDriver(AbstractTimeSeriesDriver):
         super(AGDCTimeSeriesDriver, self).__init__(location, config=config)
 
         ncdfs = find_files(self.location, self.config['nc_pattern'].value)
+        index = open_index(self.location, ncdfs, self.config['vars'].value)
 
+        # Small spatial chunks make reading one pixel cheaper
+        chunk_size = (self.config['chunk_size'].value
+                      if self.config['point_query'].value else 500)
+        vrt_folder = os.path.join(self.location,
+                                  self.config['vrt_folder'].value)
         self.series = [
-            AGDCSeries(ncdfs, self.config['vars'].value)
+            AGDCSeries(ncdfs, self.config['vars'].value,
+                       chunk_size=chunk_size, index=index,
+                       vrt_folder=vrt_folder)
         ]
-        self.da = None
 
     def fetch_data(self, mx, my, crs_wkt):
-        for series in self.series:
-            # TODO: I think xarray can handle this...
+        """ Read data for a given x, y coordinate in a given CRS
+
+        The mask variable, if it is one of the data variables, is read in the
+        same load as the bands and used to update the mask of each Series.
+
+        Args:
+          mx (float): map X location
+          my (float): map Y location
+          crs_wkt (str): Well Known Text (Wkt) Coordinate reference system
+            string describing (x, y)
+
+        Yields:
+          float: current retrieval progress (0 to 100)
+
+        Raises:
+          IndexError: raise IndexError if map coordinates are outside of
+            dataset
+
+        """
+        rowcol = []
+        for i, series in enumerate(self.series):
             _mx, _my = geo_utils.reproject_point(mx, my, crs_wkt, series.crs)
             _px, _py = geo_utils.point2pixel(_mx, _my, series.gt)
 
-            self.pixel_pos = 'Row/Col: {}/{}'.format(_py, _px)
+            rowcol.append('{}/{}'.format(_py, _px))
 
             # Actually do the read...
-            self.da = (series.ds[series.band_names]
-                        .sel(latitude=_my, longitude=_mx, method='nearest')
-                        .load().to_array())
-            self.px, self.py = _px, _py
-        yield 100.0
+            if self.config['point_query'].value:
+                series.data = series.read_pixel(_px, _py)
+            else:
+                series.data = series.read_nearest(_mx, _my)
+            if i == 0:
+                self.px, self.py = _px, _py
+            yield (i + 1) / float(len(self.series)) * 100.0
 
-    def get_data(self, series, band, mask=True, indices=None):
-        if self.da is None:
-            return (self.series[series].images,
-                    np.zeros(self.series[series].images.shape[0]))
-        # TODO: not masking as of yet...
-        x = self.series[series].images
-        y = self.da.data.take(band, axis=0)
+        self.pixel_pos = 'Row/Col: ' + '; '.join(rowcol)
 
-        return x, y
+        # Update mask
+        self.update_mask()
 
-    def update_mask(sefl, mask_values=None):
-        pass
+    def get_data(self, series, band, mask=True, indices=None):
+        """ Return data for a given band
+
+        Args:
+          series (int): index of Series containing data
+          band (int or np.ndarray): index of band (int) or indices of bands
+            (np.ndarray) to return
+          mask (bool, optional): return data masked or left unmasked, if
+            supported by driver implementation
+          indices (None or np.ndarray, optional): np.ndarray indices to subset
+            data in conjunction with mask, if needed, or None for no indexing
+
+        Returns:
+          tuple: two NumPy arrays containing images (X) and data (y)
+
+        """
+        _series = self.series[series]
+        X = _series.images
+        y = _series.data.take(band, axis=0)
+
+        if mask is True:
+            mask = _series.mask
+        if isinstance(indices, np.ndarray):
+            if isinstance(mask, np.ndarray):
+                mask = indices[np.in1d(indices, _series.mask_index)]
+            else:
+                mask = indices
+        elif mask is _series.mask:
+            # Index of clear images is cached when mask is updated
+            mask = _series.mask_index
+        elif isinstance(mask, np.ndarray):
+            mask = np.where(mask)[0]
+
+        if mask is not False:
+            X = X.take(mask, axis=0)
+            y = y.take(mask, axis=0)
+
+        return X, y
+
+    def update_mask(self, mask_values=None):
+        """ Update data mask. Optionally also update mask values
+
+        Args:
+          mask_values (iterable, optional): values to mask
+
+        """
+        if mask_values is not None:
+            self.mask_values = np.asarray(mask_values).copy()
+
+        mask_var = self.config['mask_var'].value
+        for series in self.series:
+            if mask_var not in series.band_names:
+                continue
+            mask_band = series.band_names.index(mask_var)
+            series.mask = np.in1d(series.data[mask_band, :],
+                                  self.mask_values, invert=True)
+            series.mask_index = np.where(series.mask)[0]
+        self.mask_version += 1
 
     def get_geometry(self):
         geom = geo_utils.pixel_geometry(self.series[0].gt, self.px, self.py)
@@ -5,15 +5,12 @@ import logging
 import os
 
 import numpy as np
-has_scipy = True
-try:
-    import scipy.io as spio
-except:
-    has_scipy = False
 
 from . import timeseries_stacked  # noqa
-from ..ts_utils import ConfigItem, find_files  # noqa
-from ... import settings  # noqa
+from ..ccdc_results import get_ccdc_results, has_scipy
+from ..mixins.segmented import SegmentedResidualsMixin
+from ..prediction import predict
+from ..ts_utils import ConfigItem, LRUCache
 
 logger = logging.getLogger('tstools')
 
@@ -30,20 +27,41 @@ def ml2ordinal(d):
     return (dt.datetime.fromordinal(d) - dt.timedelta(days=366)).toordinal()
 
 
-class CCDCTimeSeries(timeseries_stacked.StackedTimeSeries):
+def make_X(x):
+    """ Return CCDC design matrix for ordinal dates
+
+    Args:
+        x (np.ndarray): ordinal dates
+
+    Return:
+        np.ndarray: design matrix (n x 8) of intercept, slope, and three
+            harmonics
+    """
+    w = 2 * np.pi / 365.25
+    return np.column_stack((np.ones_like(x),
+                            x,
+                            np.cos(w * x), np.sin(w * x),
+                            np.cos(2 * w * x), np.sin(2 * w * x),
+                            np.cos(3 * w * x), np.sin(3 * w * x)))
+
+
+class CCDCTimeSeries(SegmentedResidualsMixin,
+                      timeseries_stacked.StackedTimeSeries):
     """ Reader for CCDC pre-calculated results for a 'stacked' timeseries
 
     This driver requires the following Python packages in addition to basic
     TSTools package dependencies:
 
     * `scipy`: http://www.scipy.org/scipylib/index.html
+
+    Results may be converted once into an indexed store using
+    :func:`ts_driver.ccdc_results.convert_results` with an output folder of
+    ``results_index`` within the cache folder for faster lookups.
     """
 
     description = 'CCDC Results Reader'
     has_results = True
 
-    ccdc_results = None
-
     # Driver configuration
     config = timeseries_stacked.StackedTimeSeries.config.copy()
     config['results_folder'] = ConfigItem('Results folder', 'TSFitMap')
@@ -53,28 +71,49 @@ class CCDCTimeSeries(timeseries_stacked.StackedTimeSeries):
             raise ImportError('Cannot import "scipy" module required to read '
                               'CCDC results files')
         super(CCDCTimeSeries, self).__init__(location, config=config)
+        # Predictions and residuals for current results
+        self._predictions = LRUCache(maxsize=8)
+        self._residuals = LRUCache(maxsize=4)
 
     def fetch_results(self):
         """ Read results for current pixel
+
+        Returns:
+            np.ndarray: CCDC `rec_cg` records for the current pixel, or None
+                if no results could be found
+
         """
         path = os.path.join(self.location, self.config['results_folder'].value)
+        store_folder = None
+        if self.config['cache_folder'].value:
+            store_folder = os.path.join(self.location,
+                                        self.config['cache_folder'].value,
+                                        'results_index')
         row = self.series[0].py + 1
+        pos = self.series[0].py * self.series[0].width + self.series[0].px + 1
 
-        result = find_files(path, 'record_change%s.mat' % row)
-        if not result:
+        ccdc_results = get_ccdc_results(path, store_folder).get(row, pos)
+        if ccdc_results is None:
             logger.error('Could not find result for row %s' % row)
             return
-
-        ccdc_results = spio.loadmat(result[0], squeeze_me=True)['rec_cg']
-        pos = self.series[0].py * self.series[0].width + self.series[0].px + 1
-
-        pos_search = np.where(ccdc_results['pos'] == pos)[0]
-
-        if pos_search.size == 0:
+        if ccdc_results.size == 0:
             logger.error('Could not find result for row %s col %s' %
                          (row, self.series[0].px + 1))
             return
-        self.ccdc_results = ccdc_results[pos_search]
+        ccdc_results.flags.writeable = False
+
+        return ccdc_results
+
+    def set_results(self, result):
+        """ Store results returned from `fetch_results`
+
+        Args:
+            result (np.ndarray): CCDC records returned from `fetch_results`
+
+        """
+        super(CCDCTimeSeries, self).set_results(result)
+        self._predictions.clear()
+        self._residuals.clear()
 
     def get_prediction(self, series, band, dates=None):
         """ Return prediction for a given band
@@ -82,59 +121,25 @@ class CCDCTimeSeries(timeseries_stacked.StackedTimeSeries):
         Args:
           series (int): index of Series used for prediction
           band (int): index of band to return
-          dates (iterable): list or np.ndarray of ordinal dates to predict; if
-            None, predicts for every date within timeseries (default: None)
+          dates (iterable): sorted np.ndarray of ordinal dates to predict;
+            if None, predicts for every date within timeseries
+            (default: None)
 
         Returns:
           iterable: sequence of tuples (1D NumPy arrays, x and y) containing
-            predictions
+            predictions, with dates as matplotlib dates
 
         """
         if series > 0:
             return
-        if self.ccdc_results is None or len(self.ccdc_results) == 0:
+        if self.result is None or len(self.result) == 0:
             return
 
-        if band >= self.ccdc_results['coefs'][0].shape[1]:
+        if band >= self.result['coefs'][0].shape[1]:
             logger.debug('Not results for band %i' % band)
             return
 
-        def make_X(x):
-            w = 2 * np.pi / 365.25
-            return np.vstack((np.ones_like(x),
-                              x,
-                              np.cos(w * x), np.sin(w * x),
-                              np.cos(2 * w * x), np.sin(2 * w * x),
-                              np.cos(3 * w * x), np.sin(3 * w * x)))
-
-        mx, my = [], []
-        for rec in self.ccdc_results:
-            if rec['t_end'] < rec['t_start']:
-                i_step = -1
-            else:
-                i_step = 1
-
-            start = ml2ordinal(rec['t_start'])
-            if dates is not None:
-                end = ml2ordinal(max(rec['t_break'], rec['t_end']))
-                _mx = dates[np.where((dates >= start) & (dates <= end))[0]]
-            else:
-                end = ml2ordinal(rec['t_end'])
-                _mx = np.arange(start, end, i_step)
-
-            # Coefficients used for prediction
-            _coef = rec['coefs'][:, band]
-            _mX = make_X(_mx)
-
-            _my = np.dot(_coef, _mX[:_coef.size, :])
-            # Transform ordinal back to datetime for plotting
-            _mx = np.array([dt.datetime.fromordinal(int(_x))
-                            for _x in _mx])
-
-            mx.append(_mx)
-            my.append(_my)
-
-        return mx, my
+        return self._predict(dates).get(band)
 
     def get_breaks(self, series, band):
         """ Return break points for a given band
@@ -148,7 +153,7 @@ class CCDCTimeSeries(timeseries_stacked.StackedTimeSeries):
             break points
 
         """
-        if self.ccdc_results is None:
+        if self.result is None:
             return
 
         # Setup output
@@ -157,8 +162,8 @@ class CCDCTimeSeries(timeseries_stacked.StackedTimeSeries):
 
         n_obs = self.series[series].data.shape[1]
 
-        if len(self.ccdc_results) > 0:
-            for rec in self.ccdc_results:
+        if len(self.result) > 0:
+            for rec in self.result:
                 if rec['t_break'] != 0:
                     _bx = dt.datetime.fromordinal(ml2ordinal(rec['t_break']))
                     index = np.where(self.series[series].images['date'] ==
@@ -171,34 +176,33 @@ class CCDCTimeSeries(timeseries_stacked.StackedTimeSeries):
 
         return bx, by
 
-    def get_residuals(self, series, band):
-        """ Return model residuals (y - predicted yhat) for a given band
+    def _predict(self, dates=None):
+        """ Return predictions for all segments and bands, cached by dates
 
         Args:
-          series (int): index of Series for residuals
-          band (int): index of band to return
+            dates (np.ndarray): sorted ordinal dates to predict; if None,
+                predicts for every date within each segment
 
         Returns:
-          iterable: sequence of tuples (1D NumPy arrays, x and y) containing
-            residual dates and values
+            Prediction: predictions for all segments and bands
 
         """
-        if self.ccdc_results is None:
-            return
-
-        rx, ry = [], []
-
-        X, y = self.get_data(series, band, mask=settings.plot['mask'])
-        date, yhat = self.get_prediction(series, band, dates=X['ordinal'])
-
-        for _date, _yhat in zip(date, yhat):
-            idx = np.in1d(X['date'], _date)
-            if idx.size == 0:
-                logger.warning('Could not plot residuals for a model')
-                continue
-            resid = y[idx] - _yhat
-
-            rx.append(_date)
-            ry.append(resid)
-
-        return rx, ry
+        key = None if dates is None else np.asarray(dates).tostring()
+        prediction = self._predictions.get(key)
+        if prediction is None:
+            rec = self.result
+            t_start = np.array([ml2ordinal(int(d)) for d in rec['t_start']])
+            t_end = np.array([ml2ordinal(int(d)) for d in rec['t_end']])
+            start, end = t_start, t_end
+            if dates is not None:
+                # Allow for reversed records, and predict up to break
+                t_break = np.array([ml2ordinal(int(d)) if d else 0
+                                    for d in rec['t_break']])
+                start, end = (np.minimum(t_start, t_end),
+                              np.maximum(np.maximum(t_start, t_end),
+                                         t_break))
+
+            prediction = predict(np.array(list(rec['coefs'])),
+                                 start, end, make_X, dates=dates)
+            self._predictions.set(key, prediction)
+        return prediction
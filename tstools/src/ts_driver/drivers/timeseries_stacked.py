@@ -6,7 +6,8 @@ import os
 
 import numpy as np
 
-from ..ts_utils import find_files, ConfigItem
+from ..ts_utils import find_files, get_io_pool, iter_concurrent, ConfigItem
+from ..reader import PixelReads
 from ..series import Series
 from ..timeseries import AbstractTimeSeriesDriver
 from ...utils import geo_utils
@@ -23,12 +24,14 @@ class StackedTimeSeries(AbstractTimeSeriesDriver):
     https://github.com/ceholden/landsat_stack
 
     This timeseries driver has only one Series that does not have extra
-    metadata.
+    metadata. The ``mask_version`` attribute is incremented each time the
+    mask is updated so derived products may be cached against it.
     """
     description = 'Layer Stacked Timeseries'
     location = None
     series = []
     mask_values = np.array([2, 3, 4, 255])
+    mask_version = 0
     _pixel_pos = ''
     has_results = False
 
@@ -42,6 +45,8 @@ class StackedTimeSeries(AbstractTimeSeriesDriver):
     ))
 
     _read_cache, _write_cache = False, False
+    # Pixels read by `prefetch_data`
+    _prefetched = None
 
     def __init__(self, location, config=None):
         super(StackedTimeSeries, self).__init__(location, config=config)
@@ -78,6 +83,12 @@ class StackedTimeSeries(AbstractTimeSeriesDriver):
     def fetch_data(self, mx, my, crs_wkt):
         """ Read data for a given x, y coordinate in a given CRS
 
+        Each Series is read concurrently within the thread pool shared by
+        drivers (see :func:`ts_utils.get_io_pool`). The pixel is located once
+        for all Series on the same grid, and an image read by more than one
+        Series is read once. Pixels read by `prefetch_data` are not read
+        again.
+
         Args:
           mx (float): map X location
           my (float): map Y location
@@ -95,23 +106,35 @@ class StackedTimeSeries(AbstractTimeSeriesDriver):
         cache_folder = os.path.join(self.location,
                                     self.config['cache_folder'].value)
 
-        i = 0
         n = sum([len(series.images) for series in self.series])
 
-        descs, rowcol = [], []
+        reads = self._prefetched or PixelReads()
+        pixels = {}
+        descs, rowcol, fetches = [], [], []
         for j, series in enumerate(self.series):
-            _mx, _my = geo_utils.reproject_point(mx, my, crs_wkt, series.crs)
-            _px, _py = geo_utils.point2pixel(_mx, _my, series.gt)
+            grid = (tuple(series.gt), series.crs, series.width, series.height)
+            if grid not in pixels:
+                _mx, _my = geo_utils.reproject_point(mx, my, crs_wkt,
+                                                     series.crs)
+                pixels[grid] = geo_utils.point2pixel(_mx, _my, series.gt)
+            _px, _py = pixels[grid]
 
             descs.append(series.description)
             rowcol.append('%i/%i' % (_py, _px))
 
-            for _i in series.fetch_data(mx, my, crs_wkt,
-                                        cache_folder=cache_folder,
-                                        read_cache=self._read_cache,
-                                        write_cache=self._write_cache):
-                i += 1
-                yield i / float(n) * 100.0
+            fetches.append(series.fetch_data(mx, my, crs_wkt,
+                                             cache_folder=cache_folder,
+                                             read_cache=self._read_cache,
+                                             write_cache=self._write_cache,
+                                             pixel=(_px, _py),
+                                             reads=reads))
+
+        # Series are on separate files, so read them concurrently. Each
+        # Series yields the number of its images read so far
+        progress = [0.0] * len(fetches)
+        for j, _i in iter_concurrent(fetches):
+            progress[j] = _i
+            yield sum(progress) / float(n) * 100.0
 
         # Collapse pixel position if same row/column
         pos = []
@@ -127,6 +150,45 @@ class StackedTimeSeries(AbstractTimeSeriesDriver):
         # Update mask
         self.update_mask()
 
+    def prefetch_data(self, points, crs_wkt):
+        """ Read pixels of many points from each image at once
+
+        Points are reprojected at once for each grid shared by Series, and
+        each image is opened once to read the pixels of all points within
+        it. Images are read concurrently within the thread pool shared by
+        drivers. `fetch_data` of these points reads from the pixels already
+        read, until `prefetch_data` is called again.
+
+        Args:
+          points (list[tuple]): X and Y coordinates of points
+          crs_wkt (str): Well Known Text (Wkt) Coordinate reference system
+            string describing points
+
+        """
+        reads = PixelReads()
+        self._prefetched = reads
+        if not len(points):
+            return
+        mx, my = np.asarray(points, dtype=np.float64).T
+
+        pixels, files = {}, {}
+        for series in self.series:
+            grid = (tuple(series.gt), series.crs, series.width, series.height)
+            if grid not in pixels:
+                _mx, _my = geo_utils.reproject_points(mx, my, crs_wkt,
+                                                      series.crs)
+                _pixels = [geo_utils.point2pixel(_x, _y, series.gt)
+                           for _x, _y in zip(_mx, _my)]
+                pixels[grid] = set(
+                    (px, py) for px, py in _pixels
+                    if 0 <= px < series.width and 0 <= py < series.height)
+            for path in series.images['path']:
+                files.setdefault(path, set()).update(pixels[grid])
+
+        get_io_pool().map(lambda item: reads.prefetch(item[0],
+                                                      sorted(item[1])),
+                          files.items())
+
     def fetch_results(self):
         """ Read or calculate results for current pixel """
         pass
@@ -147,6 +209,7 @@ class StackedTimeSeries(AbstractTimeSeriesDriver):
                 continue
             series.mask = np.in1d(series.data[mask_band - 1, :],
                                   self.mask_values, invert=True)
+        self.mask_version += 1
 
     def get_data(self, series, band, mask=True, indices=None):
         """ Return data for a given band
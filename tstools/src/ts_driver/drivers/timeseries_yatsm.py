@@ -1,22 +1,24 @@
 """ A basic timeseries driver for running YATSM on stacked timeseries
 """
-from collections import OrderedDict
+from collections import deque, namedtuple, OrderedDict
 from datetime import datetime as dt
 import itertools
 import logging
+import multiprocessing
 import os
-import re
 
 import matplotlib as mpl
 import numpy as np
-import patsy
-import sklearn
-import sklearn.externals.joblib as jl
 
 from . import timeseries_stacked
-from ..ts_utils import ConfigItem, find_files, parse_landsat_MTL
-from ... import settings
-from ...logger import qgis_log
+from ..design import (build_design, coef_columns, compile_design,
+                      design_matrix, strip_categorical)
+from ..mixins.segmented import SegmentedResidualsMixin
+from ..prediction import find_segments, predict
+from ..reader import read_block_GDAL
+from ..saved_results import get_results_index
+from ..ts_utils import (ConfigItem, LRUCache, find_files, get_process_pool,
+                        parse_landsat_MTL)
 
 logger = logging.getLogger('tstools')
 
@@ -25,12 +27,11 @@ logger = logging.getLogger('tstools')
 has_yatsm = False
 has_yatsm_pheno = False
 try:
-    import yatsm
     from yatsm.algorithms import CCDCesque, postprocess
     from yatsm._cyprep import get_valid_mask
     from yatsm.regression.transforms import harm  # noqa
     from yatsm.utils import get_output_name
-    from ..mixins.yatsm_ccdcesque import version_kwargs
+    from ..mixins.yatsm_ccdcesque import get_estimator, version_kwargs
 except ImportError as e:
     has_yatsm_msg = ('Could not import YATSM because it could not '
                      'import a dependency ({})'.format(e))
@@ -49,7 +50,245 @@ else:
         has_yatsm_pheno = True
 
 
-class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
+#: tuple: labels of phenology metadata codes
+PHENO_LABELS = ('SPR', 'SUM', 'AUT')
+PHENO_SPR, PHENO_SUM, PHENO_AUT = [np.uint8(i) for i in range(3)]
+#: list: data type of records saved for rows without any fitted pixels
+EMPTY_RECORD_DTYPE = [('px', np.int64), ('py', np.int64)]
+
+
+def label_phenology(images, record, pheno):
+    """ Label images as spring, summer, or autumn using record phenology
+
+    Images within a segment are labeled as spring (SPR) on or before the
+    segment's spring day of year, autumn (AUT) on or after its autumn day
+    of year, and summer (SUM) in between. Images outside of any segment
+    keep their label.
+
+    Args:
+        images (np.ndarray): Series images with "ordinal" and "doy"
+        record (np.ndarray): YATSM record with "spring_doy" and "autumn_doy"
+        pheno (np.ndarray): current phenology codes of images
+
+    Returns:
+        np.ndarray: phenology codes of images, indexing `PHENO_LABELS`
+
+    """
+    pheno = pheno.copy()
+    if record.size == 0:
+        return pheno
+
+    # Allow for reversed records
+    start = np.minimum(record['start'], record['end'])
+    end = np.maximum(record['start'], record['end'])
+    seg, inside = find_segments(start, end, images['ordinal'])
+
+    doy = images['doy']
+    code = np.where(doy >= record['autumn_doy'][seg], PHENO_AUT,
+                    np.where(doy <= record['spring_doy'][seg],
+                             PHENO_SPR, PHENO_SUM))
+    pheno[inside] = code[inside]
+
+    return pheno
+
+
+def fit_ccdcesque(X, Y, dates, options):
+    """ Fit CCDCesque to the data of one pixel
+
+    Args:
+        X (np.ndarray): design matrix (n_image x n_coef)
+        Y (np.ndarray): data for all bands, including the mask band
+            (n_band x n_image)
+        dates (np.ndarray): ordinal dates of images (n_image)
+        options (dict): masking and model options, as returned from
+            :meth:`YATSMTimeSeries._fit_options`
+
+    Returns:
+        CCDCesque: fitted model
+
+    """
+    i_mask = options['mask_band'] - 1
+    mask = Y[i_mask, :]
+    Y_data = np.delete(Y, i_mask, axis=0)
+
+    # Mask out masked values
+    clear = np.in1d(mask, options['mask_values'], invert=True)
+    valid = get_valid_mask(Y_data,
+                           options['min_values'],
+                           options['max_values']).astype(np.bool)
+    clear *= valid
+
+    kwargs = dict(options['ccdcesque'])
+    kwargs['estimator'] = get_estimator(options['regression_type'])
+    model = CCDCesque(**version_kwargs(kwargs))
+
+    if options['reverse']:
+        model.fit(np.flipud(X[clear, :]),
+                  np.fliplr(Y_data[:, clear]),
+                  dates[clear][::-1])
+    else:
+        model.fit(X[clear, :], Y_data[:, clear], dates[clear])
+
+    if options['commit_test']:
+        model.record = postprocess.commission_test(model,
+                                                   options['commit_alpha'])
+
+    return model
+
+
+def fit_row(job):
+    """ Fit CCDCesque to pixels of a row and save results like YATSM
+
+    Results are saved into a NumPy ``.npz`` file containing the ``record``
+    of all pixels and ``metadata`` describing the design matrix, such that
+    they may be read as saved results. A file is saved even if no pixel of
+    the row could be fit, so the row is not fit again unless overwritten.
+
+    Args:
+        job (tuple): row (int), columns (np.ndarray), design matrix
+            (np.ndarray), data (n_band x n_image x n_column), ordinal dates,
+            fit options (dict), output filename (str), and metadata (dict)
+
+    Returns:
+        tuple: row and number of records saved
+
+    """
+    row, cols, X, Y, dates, options, filename, metadata = job
+
+    records = []
+    for i, col in enumerate(cols):
+        try:
+            model = fit_ccdcesque(X, Y[..., i], dates, options)
+        except Exception as e:
+            logger.debug('Could not fit row {r} column {c}: {e}'.format(
+                r=row, c=col, e=e))
+            continue
+        if model.record is None or model.record.size == 0:
+            continue
+        rec = model.record.copy()
+        rec['px'] = col
+        rec['py'] = row
+        records.append(rec)
+
+    if records:
+        record = np.concatenate(records)
+    else:
+        record = np.zeros(0, dtype=EMPTY_RECORD_DTYPE)
+    np.savez(filename, record=record, metadata=metadata)
+
+    return row, record.size
+
+
+def sweep_fit(job):
+    """ Fit CCDCesque to the data of a pixel for a parameter sweep
+
+    Args:
+        job (tuple): design matrix (np.ndarray), data (n_band x n_image),
+            ordinal dates, and fit options (dict)
+
+    Returns:
+        np.ndarray: record of fit, or None if model could not be fit
+
+    """
+    X, Y, dates, options = job
+    try:
+        return fit_ccdcesque(X, Y, dates, options).record
+    except Exception as e:
+        logger.warning('Could not fit sweep combination: {}'.format(e))
+
+
+def format_sweep(sweep_results):
+    """ Return a compact table of break dates and RMSE of sweep results
+
+    Args:
+        sweep_results (list[SweepResult]): results of a parameter sweep
+
+    Returns:
+        str: table with one line per combination
+
+    """
+    lines = []
+    for sr in sweep_results:
+        params = ', '.join('%s=%s' % (k, v) for k, v in
+                           sorted(sr.params.items()))
+        if sr.result is None:
+            lines.append('{p}: could not fit'.format(p=params))
+            continue
+        if len(sr.rmse) == 0:
+            lines.append('{p}: 0 segments'.format(p=params))
+            continue
+        breaks = ' '.join(dt.fromordinal(int(b)).strftime('%Y-%m-%d')
+                          for b in sr.breaks) or '-'
+        lines.append('{p}: {n} segments; breaks: {b}; mean RMSE: {r}'.format(
+            p=params, n=len(sr.rmse), b=breaks,
+            r=' '.join('%.2f' % v for v in np.mean(sr.rmse, axis=0))))
+    return '\n'.join(lines)
+
+
+def parse_sweep_grid(text, controls):
+    """ Parse a grid of control values for a parameter sweep
+
+    Grids are written as control names and their values separated by ``=``,
+    with values separated by ``|`` and controls separated by ``;`` (e.g.,
+    ``threshold=3|4; consecutive=4|5``). Values are converted to the type
+    of the current value of each control.
+
+    Args:
+        text (str): grid of control values, which may be empty
+        controls (OrderedDict): controls of driver
+
+    Returns:
+        dict: values to fit for each control named
+
+    Raises:
+        ValueError: if `text` cannot be parsed or names unknown controls
+
+    """
+    grid = {}
+    for item in text.split(';'):
+        if not item.strip():
+            continue
+        name, sep, values = item.partition('=')
+        name = name.strip()
+        if not sep or name not in controls:
+            raise ValueError('Cannot parse sweep grid item "{}"'.format(
+                item.strip()))
+        _type = type(controls[name].value)
+        try:
+            grid[name] = [_type(value.strip()) for value in values.split('|')
+                          if value.strip()]
+        except ValueError:
+            raise ValueError('Cannot parse values of "{n}" in sweep grid '
+                             '("{v}")'.format(n=name, v=values.strip()))
+    return grid
+
+
+#: namedtuple: summary of a fit for one combination of a parameter sweep,
+#:  as returned from :meth:`YATSMTimeSeries.sweep`
+SweepResult = namedtuple('SweepResult', [
+    'params',  # dict: control values of combination
+    'breaks',  # np.ndarray: ordinal dates of breaks
+    'rmse',  # np.ndarray: RMSE of each segment and band
+    'result',  # YATSMResult or None: results of fit
+    'prediction'  # Prediction or None: predictions of all segments and bands
+])
+
+
+#: namedtuple: immutable results for the currently queried pixel, as returned
+#:  from :meth:`YATSMTimeSeries.fetch_results`
+YATSMResult = namedtuple('YATSMResult', [
+    'record',  # np.ndarray: YATSM model record
+    'design',  # str: design used to fit `record`
+    'design_info',  # dict: design column names to `coef` indices
+    'coef_name',  # str: name of coefficients within `record` to predict with
+    'multitemp_screened',  # np.ndarray or None: screening metadata
+    'pheno',  # np.ndarray or None: phenology metadata
+    'sweep'  # list[SweepResult] or None: parameter sweep of pixel
+])
+
+
+class YATSMTimeSeries(SegmentedResidualsMixin,
+                       timeseries_stacked.StackedTimeSeries):
     """ Timeseries driver for CCDCesque algorithm implemented in YATSM
 
     Requires a working installation of YATSM. For more information, visit
@@ -67,6 +306,9 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
     mask_values = np.array([2, 3, 4, 255])
     has_results = True
 
+    #: tuple: controls that may be varied in :meth:`sweep`
+    sweep_controls = ('threshold', 'consecutive', 'min_obs', 'design')
+
     # Driver configuration
     config = OrderedDict((
         ('stack_pattern', ConfigItem('Stack pattern', 'L*stack')),
@@ -102,6 +344,7 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
         ('robust_results', ConfigItem('Robust results', False)),
         ('commit_test', ConfigItem('Commission test', False)),
         ('commit_alpha', ConfigItem('Commission test alpha', 0.10)),
+        ('sweep_grid', ConfigItem('Sweep grid', '')),
     ))
 
     def __init__(self, location, config=None):
@@ -114,12 +357,13 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
 
         # Find extra metadata
         self._init_metadata()
-
-        # Setup YATSM
-        self.yatsm_model = None
-        self.X = None
-        self.Y = None
-        self.coef_name = 'coef'
+        # Identify images used to build and cache design matrices
+        self._design_key = hash(tuple(self.series[0].images['id']))
+        # Predictions and residuals for current results
+        self._predictions = LRUCache(maxsize=8)
+        self._residuals = LRUCache(maxsize=4)
+        # Fits of last parameter sweep
+        self.sweep_results = ()
 
         # Setup min/max values
         desc, _min_values = self.config['min_values']
@@ -146,39 +390,67 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
                     msg = 'Could not set {k} to {v} (current: {c})'.format(
                         k=attr, v=val, c=current_val)
                     raise ValueError(msg)
+        # Check sweep grid before it is used to fetch results
+        grid = parse_sweep_grid(self.controls['sweep_grid'].value,
+                                self.controls)
+        unknown = set(grid) - set(self.sweep_controls)
+        if unknown:
+            raise ValueError('Cannot sweep controls: {}'.format(
+                ', '.join(sorted(unknown))))
 
     def fetch_results(self):
-        """ Read or calculate results for current pixel """
+        """ Read or calculate results for current pixel
+
+        Returns:
+            YATSMResult: results for the current pixel, or None if no results
+                could be found
+
+        """
         if self.controls['calculate_live'].value:
-            self._fetch_results_live()
+            result = self._fetch_results_live()
         else:
-            self._fetch_results_saved()
+            result = self._fetch_results_saved()
+        if result is None:
+            return
 
-        # Update multitemporal screening metadata
-        if self.yatsm_model:
-            if (self.controls['calculate_live'] and
-                    hasattr(self.yatsm_model, 'X')):
-                self.series[0].multitemp_screened = \
-                    np.in1d(self.X[:, 1], self.yatsm_model.X[:, 1],
-                            invert=True).astype(np.uint8)
-            if self.config['calc_pheno'].value:
-                for rec in self.yatsm_model.record:
-                    # Find dates in record
-                    idx = np.where(
-                        (self.series[0].images['ordinal'] >= rec['start']) &
-                        (self.series[0].images['ordinal'] <= rec['end']))[0]
-                    # Put observations into SPR/SUM/AUT
-                    _spr = np.where(self.series[0].images['doy'][idx] <=
-                                    rec['spring_doy'])[0]
-                    _sum = np.where((self.series[0].images['doy'][idx] >
-                                     rec['spring_doy']) &
-                                    (self.series[0].images['doy'][idx] <
-                                     rec['autumn_doy']))[0]
-                    _aut = np.where(self.series[0].images['doy'][idx] >=
-                                    rec['autumn_doy'])[0]
-                    self.series[0].pheno[idx[_spr]] = 'SPR'
-                    self.series[0].pheno[idx[_sum]] = 'SUM'
-                    self.series[0].pheno[idx[_aut]] = 'AUT'
+        # Update phenology metadata
+        if self.config['calc_pheno'].value:
+            pheno = label_phenology(self.series[0].images, result.record,
+                                    self.series[0].pheno)
+            result = result._replace(pheno=pheno)
+
+        # Sweep controls of "Sweep grid" across a pool of processes
+        grid = parse_sweep_grid(self.controls['sweep_grid'].value,
+                                self.controls)
+        if grid:
+            result = result._replace(sweep=self._sweep(grid))
+
+        # Results are shared with the GUI thread -- don't let them change
+        for arr in (result.record, result.multitemp_screened, result.pheno):
+            if isinstance(arr, np.ndarray):
+                arr.flags.writeable = False
+
+        return result
+
+    def set_results(self, result):
+        """ Store results and update metadata derived from them
+
+        Args:
+            result (YATSMResult): results returned from `fetch_results`
+
+        """
+        super(YATSMTimeSeries, self).set_results(result)
+        self._predictions.clear()
+        self._residuals.clear()
+        self.sweep_results = ()
+        if result is None:
+            return
+        if result.sweep is not None:
+            self.sweep_results = result.sweep
+        if result.multitemp_screened is not None:
+            self.series[0].multitemp_screened = result.multitemp_screened
+        if result.pheno is not None:
+            self.series[0].pheno = result.pheno
 
     def get_prediction(self, series, band, dates=None):
         """ Return prediction for a given band
@@ -186,66 +458,25 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
         Args:
           series (int): index of Series used for prediction
           band (int): index of band to return
-          dates (iterable): list or np.ndarray of ordinal dates to predict; if
-            None, predicts for every date within timeseries (default: None)
+          dates (iterable): sorted np.ndarray of ordinal dates to predict;
+            if None, predicts for every date within timeseries
+            (default: None)
 
         Returns:
           iterable: sequence of tuples (1D NumPy arrays, x and y) containing
-            predictions
+            predictions, with dates as matplotlib dates
 
         """
         if series > 0:
             return
-        if self.yatsm_model is None or len(self.yatsm_model.record) == 0:
+        result = self.result
+        if result is None or len(result.record) == 0:
             return
-        if band >= self.yatsm_model.record[self.coef_name].shape[2]:
+        if band >= result.record[result.coef_name].shape[2]:
             logger.debug('Not results for band %i' % band)
             return
 
-        # Setup output
-        mx = []
-        my = []
-
-        # Don't predict with any categorical information
-        eqn = (self.controls['design'].value
-               if self.controls['calculate_live'].value
-               else self._design)
-        design = re.sub(r'[\+\-][\ ]+C\(.*\)', '', eqn)
-        coef_columns = []
-        for k, v in self._design_info.iteritems():
-            if not re.match('C\(.*\)', k):
-                coef_columns.append(v)
-        coef_columns = np.sort(np.asarray(coef_columns))
-
-        for rec in self.yatsm_model.record:
-            # Check for reverse
-            if rec['end'] < rec['start']:
-                i_step = -1
-            else:
-                i_step = 1
-            # Date range to predict
-            if dates is not None:
-                end = max(rec['break'], rec['end'])
-                _mx = dates[np.where((dates >= rec['start']) &
-                                     (dates <= end))[0]]
-            else:
-                _mx = np.arange(rec['start'], rec['end'], i_step)
-
-            if _mx.size == 0:
-                continue
-            # Coefficients to use for prediction
-            _coef = rec[self.coef_name][coef_columns, band]
-            # Setup design matrix
-            _mX = patsy.dmatrix(design, {'x': _mx}).T
-            # Predict
-            _my = np.dot(_coef, _mX)
-            # Transform ordinal back to datetime for plotting
-            _mx = np.array([dt.fromordinal(int(_x)) for _x in _mx])
-
-            mx.append(_mx)
-            my.append(_my)
-
-        return mx, my
+        return self._predict(dates).get(band)
 
     def get_breaks(self, series, band):
         """ Return break points for a given band
@@ -259,14 +490,14 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
             break points
 
         """
-        if self.yatsm_model is None:
+        if self.result is None:
             return
         # Setup output
         bx = []
         by = []
 
-        if len(self.yatsm_model.record) > 0:
-            for rec in self.yatsm_model.record:
+        if len(self.result.record) > 0:
+            for rec in self.result.record:
                 if rec['break'] != 0:
                     _bx = dt.fromordinal(int(rec['break']))
                     index = np.where(self.series[series].images['date'] ==
@@ -280,37 +511,6 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
 
         return bx, by
 
-    def get_residuals(self, series, band):
-        """ Return model residuals (y - predicted yhat) for a given band
-
-        Args:
-          series (int): index of Series for residuals
-          band (int): index of band to return
-
-        Returns:
-          iterable: sequence of tuples (1D NumPy arrays, x and y) containing
-            residual dates and values
-
-        """
-        if self.yatsm_model is None:
-            return
-        rx, ry = [], []
-
-        X, y = self.get_data(series, band, mask=settings.plot['mask'])
-        predict = self.get_prediction(series, band, dates=X['ordinal'])
-        if predict is None:
-            return
-        date, yhat = predict
-
-        for _date, _yhat in zip(date, yhat):
-            idx = np.in1d(X['date'], _date)
-            resid = y[idx] - _yhat
-
-            rx.append(_date)
-            ry.append(resid)
-
-        return rx, ry
-
     def get_plot(self, series, band, axis, desc):
         """ Plot some information on an axis for a plot of some description
 
@@ -326,24 +526,32 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
 
         """
         artists = []
+        if self.result is None:
+            return artists
         if desc == 'TSPlot':
-            for rec in self.yatsm_model.record:
-                _x = (rec['start'] + rec['end']) / 2.0
-                _x, _y = self.get_prediction(series, band,
-                                             dates=np.array([_x]))
-                _x = _x[0][0]
-                _y = _y[0][0] + 250
+            artists.extend(self._plot_sweep(band, axis))
+            if self.get_prediction(series, band) is None:
+                return artists
+            # Label middle day of each segment from the cached daily
+            # prediction instead of predicting each midpoint on its own
+            prediction = self._predict()
+            for rec, _slice in zip(self.result.record, prediction.slices):
+                if _slice.start == _slice.stop:
+                    continue
+                i = (_slice.start + _slice.stop) // 2
+                _x = prediction.datenum[i]
+                _y = prediction.yhat[i, band] + 250
                 axis.text(_x, _y, 'RMSE: %.3f' % rec['rmse'][band],
                           fontsize=18,
                           horizontalalignment='center')
         elif desc == 'DOYPlot':
-            has_dates = all([r in self.yatsm_model.record.dtype.names
+            has_dates = all([r in self.result.record.dtype.names
                              for r in ('spring_doy', 'autumn_doy')])
             if self.config['calc_pheno'].value and has_dates:
                 colors = mpl.cm.Set1(np.linspace(0, 1, 9))[:, :-1]
 
                 color_cycle = itertools.cycle(colors)
-                for i, rec in enumerate(self.yatsm_model.record):
+                for i, rec in enumerate(self.result.record):
                     col = [c for c in color_cycle.next()]
                     artists.append(
                         axis.axvline(rec['spring_doy'], label='Model %i' % i,
@@ -354,10 +562,352 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
 
         return artists
 
+    def _plot_sweep(self, band, axis):
+        """ Plot predictions of each parameter sweep combination
+
+        Args:
+          band (int): index of band to plot
+          axis (matplotlib.axes._subplots.Axes): a matplotlib axis to plot on
+
+        Returns:
+          list: artists to include in legend
+
+        """
+        artists = []
+        colors = itertools.cycle(mpl.cm.Set1(np.linspace(0, 1, 9))[:, :-1])
+        for sweep_result in self.sweep_results:
+            col = next(colors)
+            prediction = sweep_result.prediction
+            if prediction is None:
+                continue
+            label = ', '.join('%s=%s' % (k, v) for k, v in
+                              sorted(sweep_result.params.items()))
+            for i, (_x, _y) in enumerate(zip(*prediction.get(band))):
+                line, = axis.plot(_x, _y, c=col, lw=1, ls='--',
+                                  label=label if i == 0 else '_nolegend_')
+                if i == 0:
+                    artists.append(line)
+        return artists
+
 # RESULTS HELPER METHODS
+    def _predict(self, dates=None):
+        """ Return predictions for all segments and bands, cached by dates
+
+        Args:
+            dates (np.ndarray): sorted ordinal dates to predict; if None,
+                predicts for every date within each segment
+
+        Returns:
+            Prediction: predictions for all segments and bands
+
+        """
+        key = None if dates is None else np.asarray(dates).tostring()
+        prediction = self._predictions.get(key)
+        if prediction is None:
+            prediction = self._predict_result(self.result, dates=dates)
+            self._predictions.set(key, prediction)
+        return prediction
+
+    def _predict_result(self, result, dates=None):
+        """ Return predictions for all segments and bands of a result
+
+        Args:
+            result (YATSMResult): results to predict with
+            dates (np.ndarray): sorted ordinal dates to predict; if None,
+                predicts for every date within each segment
+
+        Returns:
+            Prediction: predictions for all segments and bands
+
+        """
+        # Don't predict with any categorical information
+        design_info = compile_design(
+            strip_categorical(result.design),
+            {'x': self.series[0].images['ordinal']})
+        columns = coef_columns(result.design_info)
+
+        start, end = result.record['start'], result.record['end']
+        if dates is not None:
+            # Allow for reversed records, and predict up to break
+            start, end = (np.minimum(start, end),
+                          np.maximum(np.maximum(start, end),
+                                     result.record['break']))
+
+        return predict(result.record[result.coef_name][:, columns, :],
+                       start, end,
+                       lambda x: build_design(design_info, {'x': x}),
+                       dates=dates)
+
+    def sweep(self, grid, processes=None):
+        """ Fit every combination of a grid of control values to this pixel
+
+        Data already retrieved for the current pixel are fit with each
+        combination of values, in parallel across a pool of processes. All
+        other options are taken from the current controls. Fits are kept
+        and drawn as an overlay on the time series plot when plotting custom
+        driver information, until results are next set. Grids may also be
+        given in the "Sweep grid" control (see :func:`parse_sweep_grid`),
+        which is swept whenever results are fetched.
+
+        Note:
+            Processes are started using :func:`get_process_pool`, which may
+            not work within QGIS on some platforms. Combinations are fit
+            within the current process if processes cannot be started, or
+            if ``processes=1``.
+
+        Args:
+            grid (dict): values to fit for one or more controls listed in
+                `sweep_controls` (e.g., ``{'threshold': [3.0, 4.0]}``)
+            processes (int): number of processes, or None to use the number
+                of CPUs (default: None)
+
+        Returns:
+            list[SweepResult]: summary of fit for each combination
+
+        Raises:
+            KeyError: if `grid` contains controls that cannot be swept
+
+        """
+        self.sweep_results = self._sweep(grid, processes=processes)
+        return self.sweep_results
+
+    def _sweep(self, grid, processes=None):
+        """ Return fits of every combination of a grid of control values
+
+        See :meth:`sweep` for arguments.
+        """
+        unknown = set(grid) - set(self.sweep_controls)
+        if unknown:
+            raise KeyError('Cannot sweep controls: {}'.format(
+                ', '.join(sorted(unknown))))
+
+        names = [name for name in self.sweep_controls if name in grid]
+        combinations = [dict(zip(names, values)) for values in
+                        itertools.product(*[grid[name] for name in names])]
+
+        data = {'x': self.series[0].images['ordinal'],
+                'sensor': self.series[0].sensor,
+                'pr': self.series[0].pathrow}
+        Y = self.series[0].data.astype(np.int16)
+        dates = np.asarray(self.series[0].images['ordinal'])
+
+        jobs, designs = [], []
+        for params in combinations:
+            design = params.get('design', self.controls['design'].value)
+            X = design_matrix(design, data, self._design_key)
+            designs.append((design, X.design_info.column_name_indexes))
+
+            options = self._fit_options()
+            for name in names:
+                if name != 'design':
+                    options['ccdcesque'][name] = params[name]
+            jobs.append((np.asarray(X), Y, dates, options))
+
+        records = None
+        if processes != 1 and len(jobs) > 1:
+            processes = min(processes or multiprocessing.cpu_count(),
+                            len(jobs))
+            try:
+                pool = get_process_pool(processes)
+            except Exception as e:
+                logger.warning('Could not start processes for parameter '
+                               'sweep -- fitting within this process: '
+                               '{}'.format(e))
+            else:
+                try:
+                    records = pool.map(sweep_fit, jobs)
+                finally:
+                    pool.terminate()
+                    pool.join()
+        if records is None:
+            records = [sweep_fit(job) for job in jobs]
+
+        sweep_results = []
+        for params, (design, design_info), record in zip(
+                combinations, designs, records):
+            if record is None:
+                sweep_results.append(SweepResult(
+                    params, np.zeros(0, dtype=np.int64), np.zeros((0, 0)),
+                    None, None))
+                continue
+            record.flags.writeable = False
+            result = YATSMResult(record=record,
+                                 design=design,
+                                 design_info=design_info,
+                                 coef_name='coef',
+                                 multitemp_screened=None,
+                                 pheno=None,
+                                 sweep=None)
+            # Predicted once, instead of every time the plot is drawn
+            prediction = (self._predict_result(result) if record.size
+                          else None)
+            sweep_results.append(SweepResult(
+                params, record['break'][record['break'] != 0],
+                record['rmse'], result, prediction))
+
+        logger.info('Parameter sweep for pixel {px}:\n{table}'.format(
+            px=self.pixel_pos, table=format_sweep(sweep_results)))
+        return sweep_results
+
+    def run_region(self, window, processes=None, block_rows=10,
+                   output=None, overwrite=False):
+        """ Run CCDCesque over a window of pixels, saving results by row
+
+        Data are read from the bands of the series in each image, in blocks
+        of consecutive rows without saved results, and the fits of each row
+        are distributed across a pool of processes. Results use the same
+        layout and names as those read from the results folder when not
+        calculating live. Closing the generator, as done by the GUI when
+        cancelled, stops reading and terminates the pool.
+
+        Note:
+            Processes are started using :mod:`multiprocessing`, which may not
+            work within QGIS on some platforms. Use ``processes=1`` to fit
+            within the current process.
+
+        Args:
+            window (tuple): starting column, starting row, number of columns,
+                and number of rows of pixels to fit
+            processes (int): number of processes, or None to use the number
+                of CPUs (default: None)
+            block_rows (int): number of rows read from images at once
+                (default: 10)
+            output (str): folder to save results, or None to use the results
+                folder (default: None)
+            overwrite (bool): overwrite existing results (default: False)
+
+        Yields:
+            float: percent of rows completed, also yielded as each image of
+                a block is read
+
+        Raises:
+            IndexError: raise IndexError if window is outside of dataset
+
+        """
+        series = self.series[0]
+        x, y, nx, ny = window
+        if (x < 0 or y < 0 or nx < 1 or ny < 1 or
+                x + nx > series.width or y + ny > series.height):
+            raise IndexError('Window specified outside of dataset: '
+                             '{}'.format(window))
+
+        data_cfg = {
+            'output': output or os.path.join(
+                self.location, self.config['results_folder'].value),
+            'output_prefix': (self.config['results_pattern'].value
+                              .replace('*', ''))
+        }
+        if not os.path.isdir(data_cfg['output']):
+            os.makedirs(data_cfg['output'])
+
+        design = self.controls['design'].value
+        X = design_matrix(design,
+                          {'x': series.images['ordinal'],
+                           'sensor': series.sensor,
+                           'pr': series.pathrow},
+                          self._design_key)
+        metadata = {
+            'YATSM': {
+                'design_matrix': design,
+                'design': X.design_info.column_name_indexes
+            }
+        }
+        X = np.asarray(X)
+        dates = np.asarray(series.images['ordinal'])
+        options = self._fit_options()
+        cols = np.arange(x, x + nx)
+
+        rows = []
+        for row in range(y, y + ny):
+            filename = get_output_name(data_cfg, row)
+            if overwrite or not os.path.exists(filename):
+                rows.append((row, filename))
+            else:
+                logger.debug('Skipping existing result {}'.format(filename))
+
+        # Blocks of consecutive rows, so rows with results are not read
+        blocks = []
+        for row, filename in rows:
+            if (blocks and len(blocks[-1]) < block_rows and
+                    blocks[-1][-1][0] == row - 1):
+                blocks[-1].append((row, filename))
+            else:
+                blocks.append([(row, filename)])
+        bands = range(1, series.count + 1)
+        n_rows = max(len(rows), 1)
+
+        processes = processes or multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(processes) if processes > 1 else None
+        n_done, n_records = 0, 0
+        pending = deque()
+        try:
+            for block in blocks:
+                y0 = block[0][0]
+                Y = np.empty((series.count, series.n, len(block), nx),
+                             dtype=np.int16)
+                for i_img, path in enumerate(series.images['path']):
+                    read_block_GDAL(path, bands, x, y0, nx, len(block),
+                                    out=Y[:, i_img, ...])
+                    yield n_done * 100.0 / n_rows
+
+                for row, filename in block:
+                    job = (row, cols, X, Y[:, :, row - y0, :], dates,
+                           options, filename, metadata)
+                    if pool is None:
+                        n_done += 1
+                        n_records += fit_row(job)[1]
+                        yield n_done * 100.0 / n_rows
+                        continue
+                    pending.append(pool.apply_async(fit_row, (job, )))
+                    # Limit rows read ahead of fitting to bound memory use
+                    while pending and (pending[0].ready() or
+                                       len(pending) > 2 * processes):
+                        n_done += 1
+                        n_records += pending.popleft().get()[1]
+                        yield n_done * 100.0 / n_rows
+            while pending:
+                n_done += 1
+                n_records += pending.popleft().get()[1]
+                yield n_done * 100.0 / n_rows
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        logger.info('Saved {n} records for {r} rows to {o}'.format(
+            n=n_records, r=len(rows), o=data_cfg['output']))
+
+    def _fit_options(self):
+        """ Return options for fitting CCDCesque from controls and config
+
+        Returns:
+            dict: picklable options for :func:`fit_ccdcesque`
+
+        """
+        return {
+            'mask_band': self.config['mask_band'].value[0],
+            'mask_values': self.mask_values,
+            'min_values': self.config['min_values'].value,
+            'max_values': self.config['max_values'].value,
+            'regression_type': self.controls['regression_type'].value,
+            'reverse': self.controls['reverse'].value,
+            'commit_test': self.controls['commit_test'].value,
+            'commit_alpha': self.controls['commit_alpha'].value,
+            'ccdcesque': dict(
+                test_indices=self.controls['test_indices'].value,
+                consecutive=self.controls['consecutive'].value,
+                threshold=self.controls['threshold'].value,
+                min_obs=self.controls['min_obs'].value,
+                min_rmse=(None if self.controls['enable_min_rmse'].value else
+                          self.controls['min_rmse'].value),
+                screening_crit=self.controls['screen_crit'].value,
+                remove_noise=self.controls['remove_noise'].value,
+                dynamic_rmse=self.controls['dynamic_rmse'].value,
+            )
+        }
+
     def _fetch_results_saved(self):
         """ Read YATSM results and return """
-        self.yatsm_model = MockResult()
         row, col = self.series[0].py, self.series[0].px
 
         data_cfg = {
@@ -369,119 +919,77 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
         result_filename = get_output_name(data_cfg, row)
         logger.info('Attempting to open: {f}'.format(f=result_filename))
 
-        if not os.path.isfile(result_filename):
-            qgis_log('Could not find result for row {r} ({fn})'.format(
+        index_folder = None
+        if self.config['cache_folder'].value:
+            index_folder = os.path.join(self.location,
+                                        self.config['cache_folder'].value,
+                                        'results_index')
+        index = get_results_index(data_cfg['output'], index_folder)
+
+        saved = index.get(result_filename, row, col)
+        if saved is None:
+            # Not in GUI thread, so don't use `qgis_log`
+            logger.warning('Could not find result for row {r} ({fn})'.format(
                 r=row, fn=result_filename))
             return
+        rec, metadata = saved
 
-        z = np.load(result_filename)
-        if 'record' not in z.files:
-            raise KeyError('Cannot find "record" within saved result ({})'
-                           .format(result_filename))
-        if 'metadata' not in z.files:
-            raise KeyError('Cannot find "metadata" within saved result ({})'
-                           .format(result_filename))
-        metadata = z['metadata'].item()
-        if 'design' not in metadata['YATSM']:
-            raise KeyError('Cannot find "design" within saved result metadata '
-                           '({})'.format(result_filename))
-        self._design = metadata['YATSM']['design_matrix']
-        self._design_info = metadata['YATSM']['design']
-
-        rec = z['record']
-        idx = np.where((rec['px'] == col) & (rec['py'] == row))[0]
-        self.yatsm_model.record = rec[idx]
+        return YATSMResult(record=rec,
+                           design=metadata['YATSM']['design_matrix'],
+                           design_info=metadata['YATSM']['design'],
+                           coef_name='coef',
+                           multitemp_screened=None,
+                           pheno=None,
+                           sweep=None)
 
     def _fetch_results_live(self):
         """ Run YATSM and get results """
         logger.debug('Calculating YATSM results on the fly')
         # Setup design matrix, Y, and dates
-        self.X = patsy.dmatrix(self.controls['design'].value,
-                               {'x': self.series[0].images['ordinal'],
-                                'sensor': self.series[0].sensor,
-                                'pr': self.series[0].pathrow})
-        self._design_info = self.X.design_info.column_name_indexes
-        self.Y = self.series[0].data.astype(np.int16)
-        self.dates = np.asarray(self.series[0].images['ordinal'])
-
-        mask = self.Y[self.config['mask_band'].value[0] - 1, :]
-        Y_data = np.delete(self.Y, self.config['mask_band'].value[0] - 1,
-                           axis=0)
-
-        # Mask out masked values
-        clear = np.in1d(mask, self.mask_values, invert=True)
-        valid = get_valid_mask(Y_data,
-                               self.config['min_values'].value,
-                               self.config['max_values'].value).astype(np.bool)
-        clear *= valid
-
-        # Setup parameters
-        estimator = sklearn.linear_model.Lasso(alpha=20)
-        reg = self.controls['regression_type'].value
-        if hasattr(yatsm.regression, 'packaged'):
-            if reg in yatsm.regression.packaged.packaged_regressions:
-                reg_fn = yatsm.regression.packaged.find_packaged_regressor(reg)
-                try:
-                    estimator = jl.load(reg_fn)
-                except:
-                    logger.error('Cannot load regressor: %s' % reg)
-                else:
-                    logger.debug('Loaded regressor %s from %s' % (reg, reg_fn))
-            else:
-                logger.error('Cannot use unknown regression %s' % reg)
-        else:
-            logger.warning(
-                'Using failsafe Lasso(lambda=20) from scikit-learn. '
-                'Upgrade to yatsm>=0.5.1 to access more regressors.')
-
-        kwargs = dict(
-            estimator=estimator,
-            test_indices=self.controls['test_indices'].value,
-            consecutive=self.controls['consecutive'].value,
-            threshold=self.controls['threshold'].value,
-            min_obs=self.controls['min_obs'].value,
-            min_rmse=(None if self.controls['enable_min_rmse'].value else
-                      self.controls['min_rmse'].value),
-            screening_crit=self.controls['screen_crit'].value,
-            remove_noise=self.controls['remove_noise'].value,
-            dynamic_rmse=self.controls['dynamic_rmse'].value,
-        )
-
-        self.yatsm_model = CCDCesque(**version_kwargs(kwargs))
+        design = self.controls['design'].value
+        X = design_matrix(design,
+                          {'x': self.series[0].images['ordinal'],
+                           'sensor': self.series[0].sensor,
+                           'pr': self.series[0].pathrow},
+                          self._design_key)
+        Y = self.series[0].data.astype(np.int16)
+        dates = np.asarray(self.series[0].images['ordinal'])
+
         # Don't want to have DEBUG logging when we run YATSM
         log_level = logger.level
         logger.setLevel(logging.INFO)
 
-        if self.controls['reverse'].value:
-            self.yatsm_model.fit(
-                np.flipud(self.X[clear, :]),
-                np.fliplr(Y_data[:, clear]),
-                self.dates[clear][::-1])
-        else:
-            self.yatsm_model.fit(
-                self.X[clear, :],
-                Y_data[:, clear],
-                self.dates[clear])
-
-        if self.controls['commit_test'].value:
-            self.yatsm_model.record = postprocess.commission_test(
-                self.yatsm_model, self.controls['commit_alpha'].value)
+        yatsm_model = fit_ccdcesque(X, Y, dates, self._fit_options())
 
         # if self.controls['robust_results'].value:
-        #     self.coef_name = 'robust_coef'
-        #     self.yatsm_model.record = postprocess.refit_record(
-        #         self.yatsm_model, 'robust'
+        #     coef_name = 'robust_coef'
+        #     yatsm_model.record = postprocess.refit_record(
+        #         yatsm_model, 'robust'
         # else:
-        #     self.coef_name = 'coef'
+        #     coef_name = 'coef'
 
         if self.config['calc_pheno'].value:
             # TODO: parameterize band indices & scale factor
             ltm = pheno.LongTermMeanPhenology()
-            self.yatsm_model.record = ltm.fit(self.yatsm_model)
+            yatsm_model.record = ltm.fit(yatsm_model)
 
         # Restore log level
         logger.setLevel(log_level)
 
+        # Update multitemporal screening metadata
+        multitemp_screened = None
+        if hasattr(yatsm_model, 'X'):
+            multitemp_screened = np.in1d(X[:, 1], yatsm_model.X[:, 1],
+                                         invert=True).astype(np.uint8)
+
+        return YATSMResult(record=yatsm_model.record,
+                           design=design,
+                           design_info=X.design_info.column_name_indexes,
+                           coef_name='coef',
+                           multitemp_screened=multitemp_screened,
+                           pheno=None,
+                           sweep=None)
+
 # SETUP
     def _init_metadata(self):
         """ Setup metadata for series """
@@ -544,11 +1052,9 @@ class YATSMTimeSeries(timeseries_stacked.StackedTimeSeries):
             self.series[0].metadata.append('pheno')
             self.series[0].metadata_names.append('Phenology')
             self.series[0].metadata_table.append(False)
+            self.series[0].metadata_labels = {'pheno': PHENO_LABELS}
             # Initialize almost all as summer (SUM); first two as SPR/AUT
-            self.series[0].pheno = np.repeat('SUM', self.series[0].n)
-            self.series[0].pheno[0] = 'SPR'
-            self.series[0].pheno[1] = 'AUT'
-
+            self.series[0].pheno = np.repeat(PHENO_SUM, self.series[0].n)
+            self.series[0].pheno[0] = PHENO_SPR
+            self.series[0].pheno[1] = PHENO_AUT
 
-class MockResult(object):
-    record = []
@@ -24,6 +24,7 @@ class YATSMMetTimeSeries(YATSMTimeSeries):
     config['met_date_sep'] = ConfigItem('Met filename separator', '_')
     config['met_date_sepno'] = ConfigItem('Met date index', 4)
     config['met_date_format'] = ConfigItem('Met date format', '%Y%m')
+    config['met_stacked'] = ConfigItem('Met types stacked as bands', False)
 
     def __init__(self, location, config=None):
         super(YATSMMetTimeSeries, self).__init__(location, config=config)
@@ -35,11 +36,22 @@ class YATSMMetTimeSeries(YATSMTimeSeries):
             'tmax': [-30, 35]
         }
 
-        for met_type in self.config['met_types'].value:
-            logger.debug('Finding met data: %s' % met_type)
-            images = find_files(
-                os.path.join(self.config['met_location'].value, met_type),
-                self.config['met_pattern'].value)
+        # Met types may be stacked as bands of one image, in order of
+        # "Met types", so one read serves all of their Series
+        stacked = self.config['met_stacked'].value
+        if stacked:
+            logger.debug('Finding stacked met data')
+            stacked_images = find_files(self.config['met_location'].value,
+                                        self.config['met_pattern'].value)
+
+        for i_met, met_type in enumerate(self.config['met_types'].value):
+            if stacked:
+                images = stacked_images
+            else:
+                logger.debug('Finding met data: %s' % met_type)
+                images = find_files(
+                    os.path.join(self.config['met_location'].value, met_type),
+                    self.config['met_pattern'].value)
 
             # Get date index from file
             img = os.path.splitext(os.path.basename(images[0]))[0]
@@ -68,7 +80,8 @@ class YATSMMetTimeSeries(YATSMTimeSeries):
                     'symbology_hint_indices': [0],
                     'cache_prefix': 'met_%s_' % met_type,
                     'cache_suffix': '.npy'
-                }
+                },
+                bands=[i_met] if stacked else None
             )
             if met_type in min_max_symbology:
                 series.symbology_hint_minmax = min_max_symbology[met_type]
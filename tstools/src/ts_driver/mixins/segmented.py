@@ -0,0 +1,89 @@
+""" Mixin providing cached residuals for drivers of segmented models
+"""
+import numpy as np
+
+from ..prediction import residuals
+from ... import settings
+
+
+class SegmentedResidualsMixin(object):
+    """ Residuals of segmented model predictions for all bands at once
+
+    Residuals are calculated for every band using predictions on the dates
+    of all images and memoized for each Series, plot mask setting, and
+    version of the mask (see `StackedTimeSeries.mask_version`).
+
+    Drivers using this mixin must implement `get_prediction` and
+    `_predict(dates)`, returning a `Prediction` of all segments and bands,
+    and must store a `LRUCache` as `self._residuals` that is cleared
+    whenever results change (e.g., in `set_results`).
+    """
+
+    def get_residuals(self, series, band):
+        """ Return model residuals (y - predicted yhat) for a given band
+
+        Args:
+          series (int): index of Series for residuals
+          band (int): index of band to return
+
+        Returns:
+          iterable: sequence of tuples (1D NumPy arrays, x and y) containing
+            residual dates, as matplotlib dates, and values
+
+        """
+        _residuals = self._get_residuals(series, band)
+        if _residuals is None:
+            return
+        return _residuals.get(band)
+
+    def get_residual_arrays(self, series, band):
+        """ Return model residuals for a band from cached arrays
+
+        Args:
+          series (int): index of Series for residuals
+          band (int): index of band to return
+
+        Returns:
+          tuple: two 1D NumPy arrays containing the index of the image of
+            each residual and residual values, or None if no residuals
+
+        """
+        _residuals = self._get_residuals(series, band)
+        if _residuals is None:
+            return
+        return _residuals.index, _residuals.resid[band]
+
+    def _get_residuals(self, series, band):
+        """ Return residuals for all bands, cached by mask and mask version
+
+        Args:
+          series (int): index of Series for residuals
+          band (int): index of band requested, used to check for results
+
+        Returns:
+          Residuals: residuals for all bands, or None if no results
+
+        """
+        images = self.series[series].images
+        if self.get_prediction(series, band,
+                               dates=images['ordinal']) is None:
+            return
+
+        mask = self.series[series].mask
+        masked = bool(settings.plot['mask']) and isinstance(mask, np.ndarray)
+        key = (series, masked, self.mask_version)
+
+        _residuals = self._residuals.get(key)
+        if _residuals is None:
+            if masked:
+                index = np.where(mask)[0]
+            else:
+                index = np.arange(images.shape[0])
+            # Prediction grid is all images, so no mask invalidates it
+            prediction = self._predict(images['ordinal'])
+            _residuals = residuals(prediction,
+                                   images['ordinal'][index],
+                                   self.series[series].data[:, index],
+                                   index=index)
+            self._residuals.set(key, _residuals)
+        return _residuals
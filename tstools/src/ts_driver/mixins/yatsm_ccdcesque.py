@@ -1,9 +1,23 @@
 """ Mixin and functions for running CCDCesque through YATSM
 """
+import copy
 import inspect
+import logging
+import threading
+import time
 
+import sklearn.linear_model
+from sklearn.base import clone
+import sklearn.externals.joblib as jl
+import yatsm.regression
 from yatsm.algorithms import CCDCesque
 
+logger = logging.getLogger('tstools')
+
+# Estimators loaded from packaged regressions, by name
+_estimators = {}
+_estimators_lock = threading.Lock()
+
 
 # Hack for goof up in API previous to v0.6.0
 def version_kwargs(d):
@@ -28,3 +42,55 @@ def version_kwargs(d):
     else:
         raise KeyError('Neither "lm" nor "estimator" are keys in '
                        'CCDCesque.__init__')
+
+
+def get_estimator(name):
+    """ Return an unfitted copy of a packaged YATSM regression estimator
+
+    Packaged estimators are loaded from disk once per process, when first
+    requested, and clones are handed out to each fit. If the estimator
+    cannot be loaded, scikit-learn's ``Lasso(alpha=20)`` is used.
+
+    Args:
+        name (str): name of packaged regression (e.g., "sklearn_Lasso20")
+
+    Returns:
+        object: unfitted estimator
+
+    """
+    with _estimators_lock:
+        if name not in _estimators:
+            _estimators[name] = _load_estimator(name)
+        estimator = _estimators[name]
+
+    if estimator is None:
+        return sklearn.linear_model.Lasso(alpha=20)
+    try:
+        return clone(estimator)
+    except Exception:
+        # Not all estimators implement the scikit-learn `get_params` API
+        return copy.deepcopy(estimator)
+
+
+def _load_estimator(name):
+    """ Load a packaged YATSM regression estimator, or None if not possible
+    """
+    if not hasattr(yatsm.regression, 'packaged'):
+        logger.warning(
+            'Using failsafe Lasso(lambda=20) from scikit-learn. '
+            'Upgrade to yatsm>=0.5.1 to access more regressors.')
+        return
+    if name not in yatsm.regression.packaged.packaged_regressions:
+        logger.error('Cannot use unknown regression %s' % name)
+        return
+
+    reg_fn = yatsm.regression.packaged.find_packaged_regressor(name)
+    start = time.time()
+    try:
+        estimator = jl.load(reg_fn)
+    except:
+        logger.error('Cannot load regressor: %s' % name)
+        return
+    logger.debug('Loaded regressor %s from %s in %.3fs' %
+                 (name, reg_fn, time.time() - start))
+    return estimator
@@ -0,0 +1,280 @@
+""" Vectorized predictions from segmented time series models
+
+Models like CCDC or YATSM's CCDCesque describe a time series as a sequence of
+segments, each with coefficients for every band. Instead of predicting one
+segment and one band at a time, the design matrix of all dates is built at
+once and each segment predicts all bands on its own slice of dates using one
+matrix product.
+
+Dates of predictions and residuals are returned as matplotlib dates (floating
+point numbers of days), which every version of matplotlib can plot.
+"""
+import datetime as dt
+
+import matplotlib.dates as mdates
+import numpy as np
+
+#: int: ordinal date of the UNIX epoch (1970-01-01)
+EPOCH_ORDINAL = 719163
+
+
+def _datenum_epoch():
+    """ Return matplotlib date of the UNIX epoch, which depends on version
+    """
+    return mdates.date2num(dt.datetime(1970, 1, 1))
+
+
+def ordinal2datenum(ordinal):
+    """ Convert ordinal dates to matplotlib dates
+
+    Args:
+        ordinal (np.ndarray): ordinal dates (e.g., from `date.toordinal`)
+
+    Returns:
+        np.ndarray: matplotlib dates
+
+    """
+    return ((np.asarray(ordinal, dtype=np.float) - EPOCH_ORDINAL) +
+            _datenum_epoch())
+
+
+def datenum2ordinal(datenum):
+    """ Convert matplotlib dates to ordinal dates, dropping time of day
+
+    Args:
+        datenum (np.ndarray): matplotlib dates
+
+    Returns:
+        np.ndarray: ordinal dates
+
+    """
+    days = np.floor(np.asarray(datenum) - _datenum_epoch())
+    return days.astype(np.int64) + EPOCH_ORDINAL
+
+
+def find_segments(start, end, ordinal):
+    """ Find the segment containing each date by binary search
+
+    Each date is assigned to the latest starting segment that begins on or
+    before it, if the date is not after the end of that segment.
+
+    Args:
+        start (np.ndarray): first ordinal date of each segment (n_segment)
+        end (np.ndarray): last ordinal date of each segment (n_segment)
+        ordinal (np.ndarray): ordinal dates (n)
+
+    Returns:
+        tuple: index of segment of each date (np.ndarray) and whether each
+            date is inside its segment (np.ndarray)
+
+    """
+    start, end = np.asarray(start), np.asarray(end)
+    ordinal = np.asarray(ordinal)
+    if start.size == 0:
+        return (np.zeros(ordinal.shape, dtype=np.intp),
+                np.zeros(ordinal.shape, dtype=np.bool))
+
+    order = np.argsort(start, kind='mergesort')
+    seg = np.searchsorted(start[order], ordinal, side='right') - 1
+    inside = seg >= 0
+    seg = order[np.clip(seg, 0, None)]
+    inside &= ordinal <= end[seg]
+
+    return seg, inside
+
+
+class Prediction(object):
+    """ Predictions for all segments and bands
+
+    Predictions of each segment are stored one after another, sorted by date
+    within each segment.
+
+    Args:
+        ordinal (np.ndarray): ordinal dates of predictions of all segments
+            (n)
+        yhat (np.ndarray): predictions of all bands (n x n_band)
+        slices (list[slice]): slice of predictions of each segment
+        start (np.ndarray): first ordinal date of each segment (n_segment)
+        end (np.ndarray): last ordinal date of each segment (n_segment)
+
+    Attributes:
+        datenum (np.ndarray): dates of predictions as matplotlib dates (n)
+
+    """
+    def __init__(self, ordinal, yhat, slices, start, end):
+        self.ordinal = ordinal
+        self.datenum = ordinal2datenum(ordinal)
+        self.yhat = yhat
+        self.slices = slices
+        self.start = start
+        self.end = end
+        for arr in (self.ordinal, self.datenum, self.yhat):
+            arr.flags.writeable = False
+
+    def get(self, band):
+        """ Return predictions of each segment for a band
+
+        Segments without any dates are skipped.
+
+        Args:
+            band (int): index of band
+
+        Returns:
+            tuple: two lists of 1D arrays (x and y) containing dates as
+                matplotlib dates and predictions for each segment
+
+        """
+        mx, my = [], []
+        for _slice in self.slices:
+            if _slice.start == _slice.stop:
+                continue
+            mx.append(self.datenum[_slice])
+            my.append(self.yhat[_slice, band])
+        return mx, my
+
+
+def predict(coef, start, end, make_X, dates=None):
+    """ Predict all bands of each segment of a model on its own dates
+
+    Args:
+        coef (np.ndarray): coefficients for each segment
+            (n_segment x n_coef x n_band)
+        start (np.ndarray): starting ordinal date of each segment
+            (n_segment)
+        end (np.ndarray): ending ordinal date of each segment (n_segment)
+        make_X (callable): function returning design matrix
+            (n_date x n_coef, or more columns) for an array of ordinal dates
+        dates (np.ndarray): sorted ordinal dates to predict, where each
+            segment predicts dates between its start and end, inclusive; if
+            None, predicts for every day from the start of each segment up
+            to, but not including, its end (default: None)
+
+    Returns:
+        Prediction: predictions of all segments and bands
+
+    """
+    coef = np.asarray(coef, dtype=np.float)
+    start, end = np.asarray(start), np.asarray(end)
+    n_seg, n_coef, n_band = coef.shape
+    first, last = np.minimum(start, end), np.maximum(start, end)
+
+    if dates is None:
+        # Days of segment, excluding its end (or, if reversed, its start)
+        reverse = end < start
+        grids = [np.arange(_first, _last)
+                 for _first, _last in zip(first + reverse, last + reverse)]
+        sizes = np.array([grid.size for grid in grids], dtype=np.intp)
+        ordinal = np.concatenate(grids or [np.zeros(0)])
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        slices = [slice(i, j) for i, j in zip(offsets[:-1], offsets[1:])]
+        X = make_X(ordinal)[:, :n_coef] if ordinal.size else None
+        rows = slices
+    else:
+        # Dates are sorted, so each segment is a contiguous slice of them
+        dates = np.asarray(dates)
+        i_start = np.searchsorted(dates, first, side='left')
+        i_end = np.searchsorted(dates, last, side='right')
+        rows = [slice(i, max(i, j)) for i, j in zip(i_start, i_end)]
+        sizes = np.array([_slice.stop - _slice.start for _slice in rows],
+                         dtype=np.intp)
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        slices = [slice(i, j) for i, j in zip(offsets[:-1], offsets[1:])]
+        ordinal = np.concatenate([dates[_slice] for _slice in rows] or
+                                 [np.zeros(0)])
+        X = make_X(dates)[:, :n_coef] if dates.size else None
+
+    yhat = np.empty((ordinal.size, n_band))
+    for i_seg, (_row, _slice) in enumerate(zip(rows, slices)):
+        if _slice.start == _slice.stop:
+            continue
+        # (n_date x n_coef) . (n_coef x n_band) for dates of segment only
+        yhat[_slice] = np.dot(X[_row], coef[i_seg])
+
+    return Prediction(ordinal.astype(np.int64), yhat, slices, first, last)
+
+
+class Residuals(object):
+    """ Model residuals for all bands of observations within any segment
+
+    Args:
+        index (np.ndarray): index of image of each residual (n)
+        ordinal (np.ndarray): ordinal date of each residual, sorted (n)
+        segment (np.ndarray): index of segment of each residual (n)
+        resid (np.ndarray): residuals for each band (n_band x n)
+
+    Attributes:
+        datenum (np.ndarray): date of each residual as matplotlib date (n)
+
+    """
+    def __init__(self, index, ordinal, segment, resid):
+        self.index = index
+        self.ordinal = ordinal
+        self.datenum = ordinal2datenum(ordinal)
+        self.segment = segment
+        self.resid = resid
+        for arr in (self.index, self.ordinal, self.datenum, self.segment,
+                    self.resid):
+            arr.flags.writeable = False
+
+    def get(self, band):
+        """ Return residuals of each segment for a band
+
+        Args:
+            band (int): index of band
+
+        Returns:
+            tuple: two lists of 1D arrays (x and y) containing dates as
+                matplotlib dates and residuals for each segment
+
+        """
+        rx, ry = [], []
+        for seg in np.unique(self.segment):
+            idx = np.where(self.segment == seg)[0]
+            rx.append(self.datenum[idx])
+            ry.append(self.resid[band, idx])
+        return rx, ry
+
+
+def residuals(prediction, ordinal, Y, index=None):
+    """ Calculate residuals for all bands by joining observations on date
+
+    Each observation is assigned to a segment using :func:`find_segments`
+    and to its prediction by a binary search of the dates of that segment.
+
+    Args:
+        prediction (Prediction): predictions of segments containing every
+            date in `ordinal` within each segment
+        ordinal (np.ndarray): sorted ordinal dates of observations (n)
+        Y (np.ndarray): observations (n_band x n); only the bands predicted
+            are used
+        index (np.ndarray): index of image of each observation, or None if
+            observations are all images (default: None)
+
+    Returns:
+        Residuals: residuals for observations within any segment
+
+    """
+    ordinal = np.asarray(ordinal)
+    if index is None:
+        index = np.arange(ordinal.size)
+    index = np.asarray(index)
+    n_band = prediction.yhat.shape[1]
+
+    seg, inside = find_segments(prediction.start, prediction.end, ordinal)
+
+    # Find prediction for each observation within dates of its segment
+    i_pred = np.zeros(ordinal.size, dtype=np.intp)
+    found = np.zeros(ordinal.size, dtype=np.bool)
+    for _seg in np.unique(seg[inside]):
+        sel = np.where(inside & (seg == _seg))[0]
+        _slice = prediction.slices[_seg]
+        grid = prediction.ordinal[_slice]
+        if grid.size == 0:
+            continue
+        i = np.clip(np.searchsorted(grid, ordinal[sel]), 0, grid.size - 1)
+        found[sel] = grid[i] == ordinal[sel]
+        i_pred[sel] = i + _slice.start
+
+    resid = (np.asarray(Y)[:n_band, found] - prediction.yhat[i_pred[found]].T)
+
+    return Residuals(index[found], ordinal[found], seg[found], resid)
@@ -1,12 +1,20 @@
 """ Functions and classes useful for reading remote sensing imagery in GDAL
 """
 import logging
+import os
+import threading
+import xml.etree.ElementTree as ET
 
 import numpy as np
 from osgeo import gdal, gdal_array
 
+from .ts_utils import LRUCache
+
 logger = logging.getLogger('tstools')
 
+# Sources of VRT bands, by VRT filename and modification time
+_vrt_sources = LRUCache(maxsize=4096)
+
 gdal.AllRegister()
 gdal.UseExceptions()
 
@@ -32,3 +40,250 @@ def read_pixel_GDAL(filename, x, y):
         dat[i] = ds.GetRasterBand(i + 1).ReadAsArray(x, y, 1, 1)
 
     return dat
+
+
+def read_pixels_GDAL(filename, pixels):
+    """ Reads in many pixels of data from an image, opening it once
+
+    Args:
+      filename (str): filename to read from
+      pixels (list[tuple]): column and row of each pixel
+
+    Returns:
+      np.ndarray: 2D array (npixel x nband) containing the pixel data
+
+    """
+    ds = gdal.Open(filename, gdal.GA_ReadOnly)
+    dtype = gdal_array.GDALTypeCodeToNumericTypeCode(
+        ds.GetRasterBand(1).DataType)
+
+    dat = np.empty((len(pixels), ds.RasterCount), dtype=dtype)
+    for i in range(ds.RasterCount):
+        band = ds.GetRasterBand(i + 1)
+        for j, (x, y) in enumerate(pixels):
+            dat[j, i] = band.ReadAsArray(x, y, 1, 1)
+
+    return dat
+
+
+def read_block_GDAL(filename, bands, x, y, nx, ny, out=None):
+    """ Reads in a block of data from some bands of an image using GDAL
+
+    Args:
+      filename (str): filename to read from
+      bands (list[int]): bands to read (1-indexed)
+      x (int): starting column
+      y (int): starting row
+      nx (int): number of columns
+      ny (int): number of rows
+      out (np.ndarray): array (len(bands) x ny x nx) to read into, or None
+        to allocate an array of the image's data type (default: None)
+
+    Returns:
+      np.ndarray: 3D array (len(bands) x ny x nx) containing the block of
+        data
+
+    """
+    ds = gdal.Open(filename, gdal.GA_ReadOnly)
+    if out is None:
+        dtype = gdal_array.GDALTypeCodeToNumericTypeCode(
+            ds.GetRasterBand(1).DataType)
+        out = np.empty((len(bands), ny, nx), dtype=dtype)
+
+    for i, band in enumerate(bands):
+        out[i, ...] = ds.GetRasterBand(band).ReadAsArray(x, y, nx, ny)
+
+    return out
+
+
+def read_band_pixel_GDAL(filename, band, x, y):
+    """ Reads in a pixel of one band from an image using GDAL
+
+    Args:
+      filename (str): filename to read from
+      band (int): band to read (1-indexed)
+      x (int): column
+      y (int): row
+
+    Returns:
+      np.ndarray: 1D array (1) containing the pixel data
+
+    """
+    ds = gdal.Open(filename, gdal.GA_ReadOnly)
+    return ds.GetRasterBand(band).ReadAsArray(x, y, 1, 1).ravel()
+
+
+def get_vrt_sources(filename):
+    """ Return the file and band each band of a VRT copies its pixels from
+
+    Only bands copying pixels from one band of another file without any
+    offset, resampling, or scaling (a single full size ``SimpleSource``) are
+    resolved, so that reading a pixel of the source band is the same as
+    reading the pixel from the VRT. Sources are checked against the files
+    GDAL resolves for the VRT (``GetFileList``), and must have the same size
+    and geotransform as the VRT, since a source without ``SrcRect`` and
+    ``DstRect`` is otherwise resampled to the size of the VRT.
+
+    Args:
+      filename (str): filename of image, which may not be a VRT
+
+    Returns:
+      list: source filename and band (1-indexed) of each band of the VRT, or
+        None for bands that are not simple copies; None if `filename` is not
+        a VRT
+
+    """
+    if not filename.lower().endswith('.vrt'):
+        return None
+    key = (filename, os.path.getmtime(filename))
+    if key in _vrt_sources:
+        return _vrt_sources.get(key)
+
+    ds = gdal.Open(filename, gdal.GA_ReadOnly)
+    xml = ds.GetMetadata('xml:VRT')
+    if not xml:
+        _vrt_sources.set(key, None)
+        return None
+    size = (str(ds.RasterXSize), str(ds.RasterYSize))
+    grid = (ds.RasterXSize, ds.RasterYSize, ds.GetGeoTransform())
+    files = set(os.path.normpath(f) for f in (ds.GetFileList() or []))
+    src_grids = {}
+    root = ET.fromstring(xml[0])
+
+    sources = []
+    for band in root.findall('VRTRasterBand'):
+        sources.append(None)
+        children = [c for c in band if c.tag.endswith('Source')]
+        if (band.get('subClass') or len(children) != 1 or
+                children[0].tag != 'SimpleSource'):
+            continue
+        source = children[0]
+        src_rect, dst_rect = source.find('SrcRect'), source.find('DstRect')
+        if src_rect is not None or dst_rect is not None:
+            if src_rect is None or dst_rect is None:
+                continue
+            rects = [(r.get('xOff'), r.get('yOff'), r.get('xSize'),
+                      r.get('ySize')) for r in (src_rect, dst_rect)]
+            if rects[0] != rects[1] or rects[0] != ('0', '0') + size:
+                continue
+
+        path = source.find('SourceFilename')
+        if path is None or not path.text:
+            continue
+        src = path.text
+        if path.get('relativeToVRT') == '1':
+            src = os.path.join(os.path.dirname(filename), src)
+        src = os.path.normpath(src)
+        if src not in files:
+            continue
+        src_band = source.find('SourceBand')
+        src_band = int(src_band.text if src_band is not None else 1)
+
+        if src not in src_grids:
+            try:
+                src_ds = gdal.Open(src, gdal.GA_ReadOnly)
+            except RuntimeError:
+                src_grids[src] = None
+            else:
+                src_grids[src] = (src_ds.RasterXSize, src_ds.RasterYSize,
+                                  src_ds.GetGeoTransform(),
+                                  src_ds.RasterCount)
+                src_ds = None
+        src_grid = src_grids[src]
+        if (src_grid is None or src_grid[:3] != grid or
+                not 1 <= src_band <= src_grid[3]):
+            continue
+        sources[-1] = (src, src_band)
+
+    _vrt_sources.set(key, sources)
+    return sources
+
+
+class PixelReads(object):
+    """ Pixels read from images during one fetch, shared between Series
+
+    Series reading the same image for the same pixel, e.g., Series of
+    different bands of one multi-band image, are served by one read. Bands
+    of VRTs that copy another file (see :func:`get_vrt_sources`) are read
+    from that file, so a file read directly by one Series and through a VRT
+    by another is also read once. Safe to use from the threads that Series
+    are fetched within.
+
+    Pixels of many points may be read ahead of their fetches using
+    `prefetch`, so each image is opened once for all of them.
+    """
+    def __init__(self):
+        self._reads = {}
+        self._lock = threading.Lock()
+
+    def read(self, filename, x, y):
+        """ Return all bands of a pixel, reading it if not yet read
+
+        Args:
+          filename (str): filename to read from
+          x (int): column
+          y (int): row
+
+        Returns:
+          np.ndarray: 1D array (nband) containing the pixel data, which may
+            be shared and should not be modified
+
+        """
+        sources = get_vrt_sources(filename)
+        if not sources or not any(sources):
+            return self._read((filename, x, y), read_pixel_GDAL,
+                              filename, x, y)
+
+        dat = []
+        for i, source in enumerate(sources):
+            if source is None:
+                dat.append(self._read((filename, x, y, i + 1),
+                                      read_band_pixel_GDAL,
+                                      filename, i + 1, x, y)[0])
+            else:
+                src, src_band = source
+                dat.append(self._read((src, x, y), read_pixel_GDAL,
+                                      src, x, y)[src_band - 1])
+        return np.array(dat)
+
+    def prefetch(self, filename, pixels):
+        """ Read many pixels of an image at once, for later calls to `read`
+
+        Pixels of VRTs that copy bands of other files are read from those
+        files. Bands not copied from another file are read by `read`.
+
+        Args:
+          filename (str): filename to read from
+          pixels (list[tuple]): column and row of each pixel
+
+        """
+        sources = get_vrt_sources(filename)
+        if sources and any(sources):
+            filenames = set(source[0] for source in sources if source)
+        else:
+            filenames = [filename]
+
+        for _filename in filenames:
+            with self._lock:
+                todo = [(x, y) for x, y in pixels
+                        if (_filename, x, y) not in self._reads]
+            if not todo:
+                continue
+            dat = read_pixels_GDAL(_filename, todo)
+            with self._lock:
+                for (x, y), _dat in zip(todo, dat):
+                    self._reads.setdefault((_filename, x, y),
+                                           [threading.Lock(), _dat])
+
+    def _read(self, key, func, *args):
+        """ Return result of a read, calling `func` once for each `key`
+        """
+        with self._lock:
+            entry = self._reads.get(key)
+            if entry is None:
+                entry = self._reads[key] = [threading.Lock(), None]
+        # Other Series wait for a read already in progress
+        with entry[0]:
+            if entry[1] is None:
+                entry[1] = func(*args)
+        return entry[1]
@@ -0,0 +1,247 @@
+""" Indexed reader for YATSM results saved by row
+
+YATSM saves the results for each row of an image into a NumPy ``.npz`` file
+(e.g., ``yatsm_r0.npz``) containing a structured array of records,
+``record``, and a dictionary of ``metadata``. Reading the results of one
+pixel would otherwise require loading and scanning the entire file.
+
+Instead, each row file is converted once into a memory-mappable ``.npy``
+copy of its records, sorted by column, and an index of the range of records
+belonging to each column. Conversions are validated against the
+modification time of the row file and the most recently used rows are kept
+open, so a pixel lookup is a slice of a memory-mapped array.
+
+Converted results intentionally keep the row structure of the saved record
+array rather than splitting it into one array per field. Fields such as
+``coef`` and ``rmse`` are subarrays for each segment and a pixel has a
+variable number of segments, so one array sorted by column keeps all of a
+pixel's segments contiguous. A lookup is then a single slice that is
+already the ``record`` drivers expect, without reassembling fields.
+"""
+import hashlib
+import logging
+import os
+import threading
+
+import numpy as np
+
+from .ts_utils import LRUCache
+
+logger = logging.getLogger('tstools')
+
+#: int: version of converted results, incremented if format changes
+INDEX_VERSION = 1
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_results_index(folder, index_folder=None, maxsize=8):
+    """ Return index of saved results shared by all drivers for a folder
+
+    Args:
+        folder (str): folder containing saved results
+        index_folder (str): folder to store converted results and indexes,
+            or None to keep indexes in memory only (default: None)
+        maxsize (int): number of row results to keep open (default: 8)
+
+    Returns:
+        SavedResultsIndex: index of saved results within `folder`
+
+    """
+    key = (os.path.abspath(folder), index_folder)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = SavedResultsIndex(index_folder, maxsize=maxsize)
+        return _indexes[key]
+
+
+def _load(filename):
+    """ Load a NumPy file containing pickled objects, such as ``metadata``
+    """
+    try:
+        return np.load(filename, allow_pickle=True)
+    except TypeError:
+        # NumPy < 1.10 always allows pickles
+        return np.load(filename)
+
+
+def index_row(filename, row):
+    """ Read a saved row result and index its records by column
+
+    Args:
+        filename (str): saved YATSM result for a row
+        row (int): row of result
+
+    Returns:
+        tuple: records sorted by column (np.ndarray), offsets of the records
+            of each column (np.ndarray), and metadata (dict)
+
+    Raises:
+        KeyError: if result is missing "record" or "metadata", or metadata
+            is missing the "design"
+
+    """
+    z = _load(filename)
+    if 'record' not in z.files:
+        raise KeyError('Cannot find "record" within saved result ({})'
+                       .format(filename))
+    if 'metadata' not in z.files:
+        raise KeyError('Cannot find "metadata" within saved result ({})'
+                       .format(filename))
+    metadata = z['metadata'].item()
+    if 'design' not in metadata['YATSM']:
+        raise KeyError('Cannot find "design" within saved result metadata '
+                       '({})'.format(filename))
+
+    rec = z['record']
+    rec = rec[rec['py'] == row]
+    rec = rec[np.argsort(rec['px'], kind='mergesort')]
+
+    n_px = rec['px'][-1] + 1 if rec.size else 0
+    offsets = np.searchsorted(rec['px'], np.arange(n_px + 1)).astype(np.int64)
+
+    return rec, offsets, metadata
+
+
+class RowResults(object):
+    """ Records of a saved row result sorted by column, with an index
+
+    Args:
+        mtime (float): modification time of row result when indexed
+        record (np.ndarray): records sorted by column, possibly
+            memory-mapped
+        offsets (np.ndarray): offsets of records for each column, such that
+            records of column ``px`` are
+            ``record[offsets[px]:offsets[px + 1]]``
+        metadata (dict): metadata saved with result
+
+    """
+    def __init__(self, mtime, record, offsets, metadata):
+        self.mtime = mtime
+        self.record = record
+        self.offsets = offsets
+        self.metadata = metadata
+
+    def get(self, col):
+        """ Return records for a column
+
+        Args:
+            col (int): column of pixel
+
+        Returns:
+            np.ndarray: records for pixel, which may be empty
+
+        """
+        if col < 0 or col >= self.offsets.size - 1:
+            return self.record[:0]
+        return self.record[self.offsets[col]:self.offsets[col + 1]]
+
+
+class SavedResultsIndex(object):
+    """ Index of YATSM results saved by row
+
+    Args:
+        index_folder (str): folder to store converted results and indexes,
+            or None to keep indexes in memory only
+        maxsize (int): number of row results to keep open (default: 8)
+
+    """
+    def __init__(self, index_folder=None, maxsize=8):
+        self.index_folder = index_folder
+        self._rows = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, filename, row, col):
+        """ Return records and metadata for a pixel from a saved row result
+
+        Args:
+            filename (str): saved YATSM result for `row`
+            row (int): row of pixel
+            col (int): column of pixel
+
+        Returns:
+            tuple: records for pixel (np.ndarray) and metadata (dict) of
+                result, or None if there is no saved result for the row
+
+        """
+        try:
+            mtime = os.path.getmtime(filename)
+        except OSError:
+            return
+
+        with self._lock:
+            row_results = self._rows.get(filename)
+            if row_results is None or row_results.mtime != mtime:
+                row_results = self._open(filename, row, mtime)
+                self._rows.set(filename, row_results)
+
+        return row_results.get(col), row_results.metadata
+
+    def _paths(self, filename):
+        """ Return filenames of converted records and index for a result
+
+        Results of different folders may share an index folder, so names
+        include a hash of the absolute path of the result.
+        """
+        path = os.path.abspath(filename)
+        digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        base = os.path.join(self.index_folder, '{name}_{digest}'.format(
+            name=os.path.splitext(os.path.basename(filename))[0],
+            digest=digest))
+        return base + '.record.npy', base + '.index.npz'
+
+    def _open(self, filename, row, mtime):
+        """ Open converted row result, converting it if needed
+        """
+        if self.index_folder is None:
+            return RowResults(mtime, *index_row(filename, row))
+
+        try:
+            return self._read(filename, mtime)
+        except (IOError, OSError, KeyError, ValueError):
+            logger.debug('Indexing saved result {}'.format(filename))
+
+        rec, offsets, metadata = index_row(filename, row)
+        try:
+            self._write(filename, mtime, rec, offsets, metadata)
+            return self._read(filename, mtime)
+        except (IOError, OSError, ValueError) as e:
+            logger.warning('Could not store index of saved result {f}: {e}'
+                           .format(f=filename, e=e))
+            return RowResults(mtime, rec, offsets, metadata)
+
+    def _read(self, filename, mtime):
+        """ Read converted row result if it is current
+
+        Raises:
+            ValueError: if converted row result is out of date
+
+        """
+        record_path, index_path = self._paths(filename)
+        with _load(index_path) as index:
+            if (int(index['version']) != INDEX_VERSION or
+                    float(index['mtime']) != mtime):
+                raise ValueError('Index of saved result is out of date')
+            offsets = index['offsets']
+            metadata = index['metadata'].item()
+        record = np.load(record_path, mmap_mode='r')
+
+        return RowResults(mtime, record, offsets, metadata)
+
+    def _write(self, filename, mtime, rec, offsets, metadata):
+        """ Write converted row result and its index
+        """
+        if not os.path.isdir(self.index_folder):
+            os.makedirs(self.index_folder)
+        record_path, index_path = self._paths(filename)
+
+        # Index is written last so it is only valid once records are written
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        np.save(record_path, rec)
+        np.savez(index_path,
+                 version=INDEX_VERSION,
+                 mtime=mtime,
+                 offsets=offsets,
+                 metadata=np.array(metadata, dtype=object))
@@ -26,6 +26,8 @@ class Series(object):
         date_index (tuple): start and end index of an image filename or ID
             that contains the image's date
         date_format (str): format of date in an image's filename or ID
+        bands (iterable): indices of bands to use from each image, or None to
+            use all bands (default: None)
 
     Attributes:
         description (str): description of timeseries series
@@ -34,6 +36,8 @@ class Series(object):
             "filename" (str), "path" (str), "id" (str), "date" (dt.Date), and
             "ordinal" (int).
         band_names (iterable): list of names describing each band
+        bands (list): indices of bands used from each image, or None if all
+            bands are used
 
         symbology_hint_indices (tuple): three band indices (RGB) used for
             default symbology
@@ -47,6 +51,9 @@ class Series(object):
             "Controls" tab
         metadata_names (iterable): list of names of variables used for plot and
             image table metadata
+        metadata_labels (dict): optional labels for metadata variables
+            stored as integer codes, mapping variable to a sequence of labels
+            indexed by code
 
         cache_prefix (str): cache filename prefix
         cache_suffix (str): cache filename suffix
@@ -55,6 +62,8 @@ class Series(object):
         fetch_data: read data for a given X/Y, yielding progress as percentage
         get_geometry: return Well Known Text (Wkt) of geometry and projection
             of query specified by X/Y coordinate
+        prepare_image: return path to an image, creating it first if the
+            Series creates images on demand
 
     """
     description = 'Stacked Time Series'
@@ -77,17 +86,23 @@ class Series(object):
     metadata = []
     metadata_table = []
     metadata_names = []
+    metadata_labels = {}
 
     cache_prefix = ''
     cache_suffix = ''
 
     px, py = 0, 0
+    bands = None
 
     def __init__(self, filenames, date_index=(9, 16), date_format='%Y%j',
-                 config=None):
+                 config=None, bands=None):
         self.date_index = date_index
         self.date_format = date_format
         self._init_images(filenames, date_index, date_format)
+        if bands is not None:
+            self.bands = list(bands)
+            self.band_names = [self.band_names[b] for b in self.bands]
+            self.count = len(self.bands)
         self.data = np.zeros((self.count, self.n), dtype=np.float)
         self._scratch_data = np.zeros_like(self.data)
         self.mask = np.ones(self.n, dtype=np.bool)
@@ -97,7 +112,8 @@ class Series(object):
 
     def fetch_data(self, mx, my, crs_wkt,
                    cache_folder='',
-                   read_cache=False, write_cache=False):
+                   read_cache=False, write_cache=False,
+                   pixel=None, reads=None):
         """ Read data for a given x, y coordinate in a given CRS
 
         Args:
@@ -108,6 +124,10 @@ class Series(object):
             cache_folder (str): path to cache folder
             read_cache (bool): allow reading from cache
             write_cache (bool): allow writing to cache
+            pixel (tuple): column and row of (x, y) if already calculated for
+                a Series on the same grid, or None to calculate it
+            reads (reader.PixelReads): pixels read during this fetch shared
+                with other Series, or None to read pixels directly
 
         Yields:
             float: current retrieval progress (1 to n)
@@ -117,8 +137,10 @@ class Series(object):
                 dataset
 
         """
-        mx, my = geo_utils.reproject_point(mx, my, crs_wkt, self.crs)
-        self.px, self.py = geo_utils.point2pixel(mx, my, self.gt)
+        if pixel is None:
+            mx, my = geo_utils.reproject_point(mx, my, crs_wkt, self.crs)
+            pixel = geo_utils.point2pixel(mx, my, self.gt)
+        self.px, self.py = pixel
 
         if (self.px < 0 or self.py < 0 or
                 self.px > self.width or self.py > self.height):
@@ -169,10 +191,12 @@ class Series(object):
 
         # Last resort -- read from images
         if not got_cache:
+            read = reads.read if reads is not None else read_pixel_GDAL
             for i_img in range(self.n):
-                self._scratch_data[:, i_img] = (read_pixel_GDAL(
-                    self.images['path'][i_img], self.px, self.py)
-                    .astype(np.float))
+                dat = read(self.images['path'][i_img], self.px, self.py)
+                if self.bands is not None:
+                    dat = dat[self.bands]
+                self._scratch_data[:, i_img] = dat.astype(np.float)
                 i += 1
                 yield float(i)
 
@@ -198,6 +222,21 @@ class Series(object):
 
         return geom.ExportToWkt(), self.crs
 
+    def prepare_image(self, i_image):
+        """ Return path to an image, creating it first if needed
+
+        Series whose images do not exist until needed (e.g., VRTs of other
+        datasets) should override this method to create them.
+
+        Args:
+            i_image (int): index of image
+
+        Returns:
+            str: path to image
+
+        """
+        return self.images['path'][i_image]
+
     def _init_images(self, images, date_index=[9, 16], date_format='%Y%j'):
         n = len(images)
         if n == 0:
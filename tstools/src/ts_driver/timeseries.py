@@ -5,7 +5,10 @@ of a timeseries driver for auto-detection and use within the TSTools plugin.
 """
 import abc
 
+import numpy as np
+
 from . import ts_utils
+from .prediction import EPOCH_ORDINAL, datenum2ordinal
 from .series import Series
 
 
@@ -37,7 +40,8 @@ class AbstractTimeSeriesDriver(object):
 
     Required Methods:
         fetch_data: read data for a given X/Y, yielding progress as percentage
-        fetch_results: read in or calculate timeseries fetch_results
+        fetch_results: read in or calculate timeseries results, returning
+            them as an immutable result object
         update_mask: update data mask
         get_data: return data (x, y) for a specified band
         get_prediction: return prediction for a specified band
@@ -51,6 +55,10 @@ class AbstractTimeSeriesDriver(object):
     Extra Methods:
         set_custom_controls(values): setter for custom control variables
             defined in `controls`. Required to enable custom controls
+        set_results(result): store result returned by `fetch_results`. Called
+            from the GUI thread once results are finished
+        prefetch_data(points, crs_wkt): read data of many points at once
+            before each is fetched (e.g., when rendering plots of many points)
 
     """
 
@@ -65,6 +73,9 @@ class AbstractTimeSeriesDriver(object):
     controls_title = ''
     controls_names = []
 
+    # No results until `set_results`
+    result = None
+
     def __init__(self, location, config=None):
         self.location = location
         if config:
@@ -119,7 +130,46 @@ class AbstractTimeSeriesDriver(object):
 
     @abc.abstractmethod
     def fetch_results(self):
-        """ Read or calculate results for current pixel """
+        """ Read or calculate results for current pixel
+
+        Note:
+            This method is run in a worker thread after `fetch_data`. It
+            should not modify any state used for plotting, but instead return
+            the results so they can be handed to `set_results` within the GUI
+            thread.
+
+        Returns:
+            object: immutable results for the current pixel, or None if the
+                driver has no results
+
+        """
+        pass
+
+    def set_results(self, result):
+        """ Store results returned from `fetch_results`
+
+        Called from the GUI thread once `fetch_results` has finished.
+
+        Args:
+            result (object): results returned from `fetch_results`
+
+        """
+        self.result = result
+
+    def prefetch_data(self, points, crs_wkt):
+        """ Read data of many points at once before each is fetched
+
+        Drivers able to read many points at once faster than one at a time
+        may override this so that `fetch_data` of these points uses the data
+        already read, until `prefetch_data` is called again. Does nothing by
+        default.
+
+        Args:
+            points (list[tuple]): X and Y coordinates of points
+            crs_wkt (str): Well Known Text (Wkt) Coordinate reference system
+                string describing points
+
+        """
         pass
 
     @abc.abstractmethod
@@ -199,6 +249,41 @@ class AbstractTimeSeriesDriver(object):
         """
         pass
 
+    def get_residual_arrays(self, series, band):
+        """ Return model residuals for a band with the image of each residual
+
+        By default, residuals from `get_residuals` are joined to images of
+        the Series by their ordinal dates. Drivers may override this method
+        to return cached arrays directly.
+
+        Args:
+            series (int): index of Series for residuals
+            band (int): index of band to return
+
+        Returns:
+            tuple: two 1D NumPy arrays containing the index of the image of
+                each residual and residual values, or None if no residuals
+
+        """
+        residuals = self.get_residuals(series, band)
+        if not residuals or not len(residuals[0]):
+            return
+        rx = np.concatenate([np.asarray(_rx) for _rx in residuals[0]])
+        ry = np.concatenate([np.asarray(_ry) for _ry in residuals[1]])
+
+        if rx.dtype.kind == 'M':
+            ordinal = (rx.astype('datetime64[D]').astype(np.int64) +
+                       EPOCH_ORDINAL)
+        elif rx.dtype.kind == 'f':
+            ordinal = datenum2ordinal(rx)
+        else:
+            ordinal = np.array([_rx.toordinal() for _rx in rx])
+        images = self.series[series].images['ordinal']
+        index = np.clip(np.searchsorted(images, ordinal), 0, images.size - 1)
+        found = images[index] == ordinal
+
+        return index[found], ry[found]
+
     @abc.abstractproperty
     def get_geometry(self):
         """ Return geometry and projection for data queried
@@ -4,11 +4,13 @@ Timeseries drivers must be enumerated in tstools.ts_drivers.drivers.DRIVERS
 or be a part of the TSTools.drivers entry point to be detected.
 """
 import importlib
+import logging
 from pkg_resources import iter_entry_points
 import sys
 
 from .drivers import DRIVERS
-from ..logger import logger
+
+logger = logging.getLogger('tstools')
 
 
 class BrokenModule(object):
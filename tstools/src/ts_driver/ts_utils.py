@@ -1,10 +1,13 @@
 """ Various utilities useful for timeseries drivers
 """
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 import datetime as dt
 import fnmatch
 import logging
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 import os
+import threading
 
 import numpy as np
 
@@ -12,9 +15,20 @@ try:
     from scandir import walk
 except ImportError:
     from os import walk
+try:
+    import Queue as queue
+except ImportError:
+    import queue
 
 logger = logging.getLogger('tstools')
 
+#: int: number of threads in pool shared by drivers for reading data
+IO_THREADS = 8
+
+_io_pool = None
+_io_pool_pid = None
+_io_pool_lock = threading.Lock()
+
 
 # READ/WRITE DATA
 def check_cache(cache_folder):
@@ -200,6 +214,168 @@ def find_files(location, pattern, ignore_dirs=[], maxdepth=float('inf')):
 
     return results
 
+# CACHING
+class LRUCache(object):
+    """ A small, thread safe, least recently used cache
+
+    Args:
+        maxsize (int): maximum number of items to keep in cache
+
+    """
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, key, default=None):
+        """ Return item for `key`, marking it as most recently used
+
+        Args:
+            key (hashable): key of item
+            default (object): value to return if `key` is not in cache
+
+        Returns:
+            object: item for `key`, or `default`
+
+        """
+        with self._lock:
+            try:
+                value = self._cache.pop(key)
+            except KeyError:
+                return default
+            self._cache[key] = value
+            return value
+
+    def set(self, key, value):
+        """ Add item to cache, removing least recently used items if full
+
+        Args:
+            key (hashable): key of item
+            value (object): item
+
+        """
+        with self._lock:
+            self._cache.pop(key, None)
+            self._cache[key] = value
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        """ Remove all items from cache """
+        with self._lock:
+            self._cache.clear()
+
+
+# CONCURRENCY
+def get_io_pool():
+    """ Return the thread pool shared by drivers for reading data
+
+    Returns:
+        multiprocessing.pool.ThreadPool: pool of `IO_THREADS` threads,
+            created when first needed in each process
+
+    """
+    global _io_pool, _io_pool_pid
+    with _io_pool_lock:
+        # Threads are not copied into processes forked after pool started
+        if _io_pool is None or _io_pool_pid != os.getpid():
+            _io_pool = ThreadPool(processes=IO_THREADS)
+            _io_pool_pid = os.getpid()
+        return _io_pool
+
+
+def get_process_pool(processes, initializer=None, initargs=()):
+    """ Return a new pool of processes that do not share state with this one
+
+    Processes are started as new interpreters where supported (Python 3).
+    Otherwise, they are forked while holding the lock of the thread pool
+    shared by drivers, so no process is copied while another thread holds
+    it, and each process starts its own thread pool when needed. Processes
+    should not use objects copied from this process, such as the current
+    time series driver, but create their own using `initializer`.
+
+    Args:
+        processes (int): number of processes
+        initializer (callable): function called by each process when it
+            starts (default: None)
+        initargs (tuple): arguments to `initializer`, which are pickled
+            where processes are not forked (default: ())
+
+    Returns:
+        multiprocessing.pool.Pool: pool of processes
+
+    """
+    if hasattr(multiprocessing, 'get_context'):
+        return multiprocessing.get_context('spawn').Pool(
+            processes, initializer, initargs)
+    with _io_pool_lock:
+        return multiprocessing.Pool(processes, initializer, initargs)
+
+
+def iter_concurrent(generators, pool=None):
+    """ Consume generators concurrently, yielding progress as it is made
+
+    Each generator is consumed within a thread of `pool`. If iteration stops
+    early, or any generator raises an exception, the remaining generators
+    are closed at their next step.
+
+    Args:
+        generators (list): generators to consume
+        pool (multiprocessing.pool.ThreadPool): pool to consume generators
+            within, or None to use :func:`get_io_pool` (default: None)
+
+    Yields:
+        tuple: index of generator and the value it yielded
+
+    Raises:
+        Exception: the first exception raised by any generator
+
+    """
+    if len(generators) == 1:
+        for value in generators[0]:
+            yield 0, value
+        return
+
+    pool = pool or get_io_pool()
+    results = queue.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def consume(i, generator):
+        try:
+            for value in generator:
+                if stop.is_set():
+                    generator.close()
+                    break
+                results.put((i, value, None))
+        except Exception as e:
+            results.put((i, None, e))
+        else:
+            results.put((i, done, None))
+
+    for i, generator in enumerate(generators):
+        pool.apply_async(consume, (i, generator))
+
+    remaining = len(generators)
+    try:
+        while remaining:
+            i, value, exc = results.get()
+            if exc is not None:
+                raise exc
+            if value is done:
+                remaining -= 1
+                continue
+            yield i, value
+    finally:
+        stop.set()
+
+
 # CONFIGURATION
 
 # namedtuple storing a description and value for a configuration entry
@@ -33,6 +33,7 @@ logger = logging.getLogger('tstools')
 class TSTools(QtCore.QObject):
 
     controls = None
+    controller = None
     plots = []
 
     def __init__(self, iface):
@@ -87,7 +88,7 @@ class TSTools(QtCore.QObject):
         self.plot_dock.setObjectName('TSTools Plots')
 
         settings.plot_dirty = []
-        for plot in plots.plots:
+        for plot in plots.get_plots():
             self.plots.append(plot(self.iface))
             settings.plot_dirty.append(False)
 
@@ -97,7 +98,9 @@ class TSTools(QtCore.QObject):
         def tab_changed(idx):
             """ Updates current tab index & re-plots if needed """
             settings.plot_current = idx
-            if settings.plot_dirty[idx]:
+            if self.controller is not None:
+                self.controller.show_plot(idx)
+            elif settings.plot_dirty[idx]:
                 self.plots[idx].plot()
                 settings.plot_dirty[idx] = False
         self.plot_tabs.currentChanged.connect(tab_changed)
@@ -1,7 +1,14 @@
 """ Utility functions to deal with spatial data coordinates/etc
 """
+import threading
+
+import numpy as np
 from osgeo import osr, ogr
 
+# Coordinate transformations are not thread safe, so each thread keeps its
+# own cache of transformations keyed by (from WKT, to WKT)
+_transforms = threading.local()
+
 
 def point2pixel(x, y, gt):
     """ Convert a coordinate x/y pair to pixel coordinates
@@ -25,6 +32,38 @@ def point2pixel(x, y, gt):
     return px, py
 
 
+def get_transform(from_crs_wkt, to_crs_wkt):
+    """ Return a cached coordinate transformation between two CRS
+
+    Transformations are created once per thread for each pair of CRS.
+
+    Args:
+        from_crs_wkt (str): input Coordinate Reference System as
+            Well-Known-Text
+        to_crs_wkt (str): output Coordinate Reference System as Well-Known-Text
+
+    Returns:
+        osr.CoordinateTransformation: transformation from `from_crs_wkt` to
+            `to_crs_wkt`
+
+    """
+    cache = getattr(_transforms, 'cache', None)
+    if cache is None:
+        cache = _transforms.cache = {}
+
+    key = (from_crs_wkt, to_crs_wkt)
+    transform = cache.get(key)
+    if transform is None:
+        to_srs = osr.SpatialReference()
+        to_srs.ImportFromWkt(to_crs_wkt)
+        from_srs = osr.SpatialReference()
+        from_srs.ImportFromWkt(from_crs_wkt)
+
+        transform = osr.CoordinateTransformation(from_srs, to_srs)
+        cache[key] = transform
+    return transform
+
+
 def reproject_point(x, y, from_crs_wkt, to_crs_wkt):
     """ Reproject a point to another coordinate reference system
 
@@ -39,18 +78,42 @@ def reproject_point(x, y, from_crs_wkt, to_crs_wkt):
         tuple: reprojected (x, y) coordinates
 
     """
+    if from_crs_wkt == to_crs_wkt:
+        return x, y
+
     point = ogr.Geometry(ogr.wkbPoint)
     point.AddPoint(x, y)
+    point.Transform(get_transform(from_crs_wkt, to_crs_wkt))
 
-    to_srs = osr.SpatialReference()
-    to_srs.ImportFromWkt(to_crs_wkt)
-    from_srs = osr.SpatialReference()
-    from_srs.ImportFromWkt(from_crs_wkt)
+    return point.GetX(), point.GetY()
 
-    transform = osr.CoordinateTransformation(from_srs, to_srs)
-    point.Transform(transform)
 
-    return point.GetX(), point.GetY()
+def reproject_points(xs, ys, from_crs_wkt, to_crs_wkt):
+    """ Reproject many points to another coordinate reference system at once
+
+    Args:
+        xs (np.ndarray): X coordinates in `from_crs_wkt` reference system
+        ys (np.ndarray): Y coordinates in `from_crs_wkt` reference system
+        from_crs_wkt (str): input Coordinate Reference System as
+            Well-Known-Text
+        to_crs_wkt (str): output Coordinate Reference System as Well-Known-Text
+
+    Returns:
+        tuple: reprojected X and Y coordinates (np.ndarray)
+
+    """
+    xs = np.asarray(xs, dtype=np.float64).ravel()
+    ys = np.asarray(ys, dtype=np.float64).ravel()
+    if xs.shape != ys.shape:
+        raise ValueError('Must provide same number of X and Y coordinates')
+    if from_crs_wkt == to_crs_wkt or xs.size == 0:
+        return xs.copy(), ys.copy()
+
+    transform = get_transform(from_crs_wkt, to_crs_wkt)
+    points = np.asarray(transform.TransformPoints(
+        np.column_stack((xs, ys)).tolist()), dtype=np.float64)
+
+    return points[:, 0], points[:, 1]
 
 
 def pixel_geometry(gt, px, py):
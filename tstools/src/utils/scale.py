@@ -0,0 +1,53 @@
+""" Scaling of plot axes to the data plotted, without requiring QGIS
+"""
+import logging
+
+import numpy as np
+
+from .. import settings
+from ..ts_driver.ts_manager import tsm
+
+logger = logging.getLogger('tstools')
+
+
+def calculate_scale(axis):
+    """ Calculate sane min and max values for plot
+
+    Args:
+        axis (int): axis to scale (either 0 or 1)
+
+    """
+    # What data are added?
+    bands = (settings.plot['y_axis_1_band'] if axis == 0
+             else settings.plot['y_axis_2_band'])
+
+    added = np.where(bands)[0]
+    if added.size == 0:
+        # No bands added to axis
+        logger.debug('Cannot autoscale axis {n}: no bands plotted'.format(
+            n=axis))
+        return
+
+    logger.debug('Auto-scaling plot Y-axis {n} min/max'.format(n=axis))
+    # Iterate through data, finding new min and max
+    _min, _max = float('inf'), float('-inf')
+    for _added in added:
+        # Series --> band
+        _series = settings.plot_series[_added]
+        _band = settings.plot_band_indices[_added]
+
+        _data = tsm.ts.get_data(_series, _band, mask=True)[1]  # get Y values
+        if len(_data) == 0:
+            logger.warning('Cannot autoscale axis %i: plotted bands contain '
+                           'no unmasked data' % axis)
+            return
+        _data_min = np.nanpercentile(_data, 2) - 500
+        _data_max = np.nanpercentile(_data, 98) + 500
+
+        if _min > _data_min:
+            _min = _data_min
+        if _max < _data_max:
+            _max = _data_max
+
+    settings.plot['y_min'][axis] = _min
+    settings.plot['y_max'][axis] = _max